@@ -0,0 +1,198 @@
+"""Docker backends for the Workflow Manager
+
+Both backends expose the same coroutine interface to the manager.
+AsyncDockerClient talks to the Docker Engine API directly over the unix
+socket with aiohttp, so no call ever leaves the event loop. SDKDockerClient
+wraps the blocking docker SDK in run_sync and is kept as a fallback.
+"""
+import asyncio
+import json
+
+import aiohttp
+from quart.utils import run_sync
+
+__author__ = "Carla Vazquez"
+__version__ = "1.0.0"
+__maintainer__ = "Carla Vazquez"
+__email__ = "cpv150030@utdallas.edu"
+__status__ = "Development"
+
+DOCKER_SOCKET = "/var/run/docker.sock"
+
+
+class DockerAPIError(Exception):
+    """Raised when the Docker Engine API answers with an error status"""
+
+    def __init__(self, status, message):
+        super().__init__(
+            "Docker API error " + str(status) + ": " + message)
+        self.status = status
+
+
+class AsyncDockerClient:
+    """Native asyncio client for the Docker Engine API"""
+
+    def __init__(self, socket_path=DOCKER_SOCKET):
+        self.socket_path = socket_path
+        self._session = None
+
+    def _get_session(self):
+        # the session has to be created inside the running event loop
+        if self._session is None or self._session.closed:
+            self._session = aiohttp.ClientSession(
+                connector=aiohttp.UnixConnector(path=self.socket_path)
+            )
+        return self._session
+
+    async def _request(self, method, path, params=None, body=None):
+        async with self._get_session().request(
+            method, "http://docker" + path, params=params, json=body
+        ) as resp:
+            text = await resp.text()
+            if resp.status >= 400:
+                raise DockerAPIError(resp.status, text)
+            return json.loads(text) if text else None
+
+    async def list_services(self, name=None):
+        if name is None:
+            return await self._request("GET", "/services")
+        # the daemon matches names by prefix, cass1 would also find cass10
+        services = await self._request(
+            "GET", "/services",
+            params={"filters": json.dumps({"name": [name]})}
+        )
+        return [s for s in services if s["Spec"]["Name"] == name]
+
+    async def create_service(self, image, name, ports, env=None,
+                             networks=None):
+        spec = {
+            "Name": name,
+            "TaskTemplate": {
+                "ContainerSpec": {"Image": image, "Env": env or []},
+                "Networks": [{"Target": net} for net in networks or []]
+            },
+            "EndpointSpec": {
+                "Mode": "vip",
+                "Ports": [
+                    {
+                        "Protocol": "tcp",
+                        "PublishedPort": published,
+                        "TargetPort": target
+                    } for published, target in ports.items()
+                ]
+            }
+        }
+        result = await self._request("POST", "/services/create", body=spec)
+        return result["ID"]
+
+    async def remove_service(self, service):
+        await self._request("DELETE", "/services/" + service)
+
+    async def service_tasks(self, name):
+        return await self._request(
+            "GET", "/tasks",
+            params={"filters": json.dumps({"service": [name]})}
+        )
+
+    async def inspect_task(self, task_id):
+        return await self._request("GET", "/tasks/" + task_id)
+
+    async def events(self, filters):
+        """Yields events from the daemon's event stream as they happen"""
+        async with self._get_session().get(
+            "http://docker/events",
+            params={"filters": json.dumps(filters)},
+            timeout=aiohttp.ClientTimeout(total=None)
+        ) as resp:
+            if resp.status >= 400:
+                raise DockerAPIError(resp.status, await resp.text())
+            async for line in resp.content:
+                if line.strip():
+                    yield json.loads(line)
+
+    async def close(self):
+        if self._session is not None:
+            await self._session.close()
+
+
+class SDKDockerClient:
+    """The blocking docker SDK behind the same coroutine interface"""
+
+    def __init__(self, socket_path=DOCKER_SOCKET):
+        import docker
+
+        self._docker = docker
+        self._client = docker.DockerClient(base_url="unix:/" + socket_path)
+        self._api = self._client.api
+
+    async def list_services(self, name=None):
+        if name is None:
+            services = await run_sync(self._client.services.list)()
+            return [service.attrs for service in services]
+        services = await run_sync(
+            lambda: self._client.services.list(filters={"name": name}))()
+        return [
+            service.attrs for service in services if service.name == name
+        ]
+
+    async def create_service(self, image, name, ports, env=None,
+                             networks=None):
+        def create():
+            return self._client.services.create(
+                image,
+                name=name,
+                endpoint_spec=self._docker.types.EndpointSpec(
+                    mode="vip", ports=ports
+                ),
+                env=env,
+                networks=networks
+            )
+
+        service = await run_sync(create)()
+        return service.id
+
+    async def remove_service(self, service):
+        await run_sync(lambda: self._api.remove_service(service))()
+
+    async def service_tasks(self, name):
+        return await run_sync(
+            lambda: self._api.tasks(filters={"service": name}))()
+
+    async def inspect_task(self, task_id):
+        return await run_sync(lambda: self._api.inspect_task(task_id))()
+
+    async def events(self, filters):
+        """Yields events from the daemon's event stream as they happen"""
+        loop = asyncio.get_running_loop()
+        queue = asyncio.Queue()
+        stream = await run_sync(
+            lambda: self._api.events(decode=True, filters=filters))()
+
+        # the SDK stream blocks, so drain it on a worker thread
+        def pump():
+            try:
+                for event in stream:
+                    loop.call_soon_threadsafe(queue.put_nowait, event)
+            except Exception:
+                pass
+            finally:
+                loop.call_soon_threadsafe(queue.put_nowait, None)
+
+        loop.run_in_executor(None, pump)
+        try:
+            while True:
+                event = await queue.get()
+                if event is None:
+                    raise DockerAPIError(0, "event stream closed")
+                yield event
+        finally:
+            stream.close()
+
+    async def close(self):
+        await run_sync(self._client.close)()
+
+
+backends = {
+    "async": AsyncDockerClient,
+    "sdk": SDKDockerClient
+}
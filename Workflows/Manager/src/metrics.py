@@ -0,0 +1,42 @@
+"""Metrics kept by the Workflow Manager
+
+Histograms are cumulative, in the same shape Prometheus uses, so they can be
+scraped from GET /metrics and compared between deployments.
+"""
+import bisect
+
+__author__ = "Carla Vazquez"
+__version__ = "1.0.0"
+__maintainer__ = "Carla Vazquez"
+__email__ = "cpv150030@utdallas.edu"
+__status__ = "Development"
+
+# upper bounds, in seconds, of the time-to-ready buckets
+READY_BUCKETS = (0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 20.0, 30.0, 60.0)
+
+
+class Histogram:
+    """Counts observations into fixed buckets"""
+
+    def __init__(self, buckets=READY_BUCKETS):
+        self.buckets = tuple(sorted(buckets))
+        self.counts = [0] * (len(self.buckets) + 1)
+        self.count = 0
+        self.sum = 0.0
+
+    def observe(self, value):
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.count += 1
+        self.sum += value
+
+    def to_dict(self):
+        cumulative = 0
+        buckets = {}
+        for bound, count in zip(self.buckets + ("+Inf",), self.counts):
+            cumulative += count
+            buckets[str(bound)] = cumulative
+        return {
+            "buckets": buckets,
+            "count": self.count,
+            "sum": round(self.sum, 3)
+        }
@@ -0,0 +1,96 @@
+"""Readiness detection for the services the Workflow Manager spins up
+
+A single watcher follows the Docker event stream and wakes whoever is waiting
+on a service as soon as one of its containers starts or reports healthy. The
+waiter then confirms readiness with its own probe. Containers scheduled on
+other swarm nodes do not show up in the manager's event stream, and the
+stream itself may be unavailable, so between events the waiter keeps probing
+with exponential backoff and jitter.
+"""
+import asyncio
+import logging
+import random
+from time import monotonic
+
+__author__ = "Carla Vazquez"
+__version__ = "1.0.0"
+__maintainer__ = "Carla Vazquez"
+__email__ = "cpv150030@utdallas.edu"
+__status__ = "Development"
+
+# container events that can mean a service just became ready
+EVENT_FILTERS = {"type": ["container"], "event": ["start", "health_status"]}
+SERVICE_LABEL = "com.docker.swarm.service.name"
+
+
+class ReadinessWatcher:
+    """Waits for services to become ready"""
+
+    def __init__(self, docker_client, initial_delay=0.1, max_delay=5.0):
+        self.docker_client = docker_client
+        self.initial_delay = initial_delay
+        self.max_delay = max_delay
+        self.events_available = False
+        self._waiters = dict()
+        self._task = None
+
+    def start(self):
+        self._task = asyncio.ensure_future(self._watch())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+
+    async def _watch(self):
+        # keep the event stream open, reconnecting with backoff if it drops
+        delay = self.initial_delay
+        while True:
+            try:
+                async for event in self.docker_client.events(EVENT_FILTERS):
+                    self.events_available = True
+                    delay = self.initial_delay
+                    attributes = event.get("Actor", {}).get("Attributes", {})
+                    self._wake(attributes.get(SERVICE_LABEL))
+            except asyncio.CancelledError:
+                raise
+            except Exception as ex:
+                logging.debug("docker event stream unavailable: " + str(ex))
+            self.events_available = False
+            await asyncio.sleep(delay)
+            delay = min(delay * 2, 30.0)
+
+    def _wake(self, service_name):
+        for waiter in self._waiters.get(service_name, ()):
+            waiter.set()
+
+    async def wait(self, service_name, probe, timeout):
+        """Returns the seconds service_name took to pass probe, or None if
+        it did not pass within timeout seconds"""
+        start = monotonic()
+        deadline = start + timeout
+        delay = self.initial_delay
+        waiter = asyncio.Event()
+        self._waiters.setdefault(service_name, set()).add(waiter)
+        try:
+            while True:
+                waiter.clear()
+                if await probe():
+                    return monotonic() - start
+                remaining = deadline - monotonic()
+                if remaining <= 0:
+                    return None
+                # equal jitter keeps concurrent rollouts from probing in step
+                pause = delay / 2 + random.uniform(0, delay / 2)
+                try:
+                    await asyncio.wait_for(
+                        waiter.wait(), min(pause, remaining))
+                except asyncio.TimeoutError:
+                    delay = min(delay * 2, self.max_delay)
+        finally:
+            self._waiters[service_name].discard(waiter)
+            if not self._waiters[service_name]:
+                del self._waiters[service_name]
@@ -0,0 +1,162 @@
+"""Workflow registry for the Workflow Manager
+
+Keeps the deployed workflow-requests, the next workflow-offset, and the
+offsets of the claimed warm pool slots. Reads are served from memory and
+every change is written through to the backend, so a restarted manager can
+pick up where it left off.
+"""
+import json
+import os
+import sqlite3
+from collections.abc import MutableMapping
+
+__author__ = "Carla Vazquez"
+__version__ = "1.0.0"
+__maintainer__ = "Carla Vazquez"
+__email__ = "cpv150030@utdallas.edu"
+__status__ = "Development"
+
+
+class MemoryBackend:
+    """Keeps nothing across restarts"""
+
+    def __init__(self):
+        self._offset = 1
+
+    def load_workflows(self):
+        return {}
+
+    def save_workflow(self, storeId, data):
+        pass
+
+    def delete_workflow(self, storeId):
+        pass
+
+    def load_pooled(self):
+        return set()
+
+    def save_pooled(self, offsets):
+        pass
+
+    def next_offset(self):
+        offset = self._offset
+        self._offset += 1
+        return offset
+
+    def reserve_offsets(self, offset):
+        self._offset = max(self._offset, offset)
+
+
+class SQLiteBackend:
+    """Embedded SQLite file in write-ahead logging mode"""
+
+    def __init__(self, path):
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._db = sqlite3.connect(path, isolation_level=None)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("PRAGMA synchronous=NORMAL")
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS workflows "
+            "(storeId TEXT PRIMARY KEY, data TEXT NOT NULL)"
+        )
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS meta "
+            "(name TEXT PRIMARY KEY, value TEXT NOT NULL)"
+        )
+        self._db.execute(
+            "INSERT OR IGNORE INTO meta VALUES ('workflow-offset', '1')")
+        self._db.execute(
+            "INSERT OR IGNORE INTO meta VALUES ('pooled-offsets', '[]')")
+
+    def _get_meta(self, name):
+        row = self._db.execute(
+            "SELECT value FROM meta WHERE name=?", (name,)).fetchone()
+        return json.loads(row[0])
+
+    def _set_meta(self, name, value):
+        self._db.execute(
+            "UPDATE meta SET value=? WHERE name=?", (json.dumps(value), name))
+
+    def load_workflows(self):
+        rows = self._db.execute("SELECT storeId, data FROM workflows")
+        return {storeId: json.loads(data) for storeId, data in rows}
+
+    def save_workflow(self, storeId, data):
+        self._db.execute(
+            "INSERT OR REPLACE INTO workflows VALUES (?, ?)",
+            (storeId, json.dumps(data))
+        )
+
+    def delete_workflow(self, storeId):
+        self._db.execute("DELETE FROM workflows WHERE storeId=?", (storeId,))
+
+    def load_pooled(self):
+        return set(self._get_meta("pooled-offsets"))
+
+    def save_pooled(self, offsets):
+        self._set_meta("pooled-offsets", sorted(offsets))
+
+    def next_offset(self):
+        with self._db:
+            self._db.execute("BEGIN IMMEDIATE")
+            offset = self._get_meta("workflow-offset")
+            self._set_meta("workflow-offset", offset + 1)
+        return offset
+
+    def reserve_offsets(self, offset):
+        with self._db:
+            self._db.execute("BEGIN IMMEDIATE")
+            if self._get_meta("workflow-offset") < offset:
+                self._set_meta("workflow-offset", offset)
+
+
+class WorkflowRegistry(MutableMapping):
+    """The workflows dict, written through to a backend"""
+
+    def __init__(self, backend):
+        self.backend = backend
+        self._cache = backend.load_workflows()
+        self.pooled_offsets = backend.load_pooled()
+
+    def __getitem__(self, storeId):
+        return self._cache[storeId]
+
+    def __setitem__(self, storeId, data):
+        self.backend.save_workflow(storeId, data)
+        self._cache[storeId] = data
+
+    def __delitem__(self, storeId):
+        self.backend.delete_workflow(storeId)
+        del self._cache[storeId]
+
+    def __iter__(self):
+        return iter(self._cache)
+
+    def __len__(self):
+        return len(self._cache)
+
+    def next_offset(self):
+        """Reserves the next workflow-offset"""
+        return self.backend.next_offset()
+
+    def reserve_offsets(self, offset):
+        """Makes sure no offset below the given one is handed out again"""
+        self.backend.reserve_offsets(offset)
+
+    def mark_pooled(self, offset):
+        self.pooled_offsets.add(offset)
+        self.backend.save_pooled(self.pooled_offsets)
+
+    def unmark_pooled(self, offset):
+        self.pooled_offsets.discard(offset)
+        self.backend.save_pooled(self.pooled_offsets)
+
+
+def open_registry(backend, path):
+    if backend == "sqlite":
+        return WorkflowRegistry(SQLiteBackend(path))
+    if backend == "memory":
+        return WorkflowRegistry(MemoryBackend())
+    raise ValueError("Unknown REGISTRY_BACKEND " + backend)
@@ -0,0 +1,92 @@
+"""Warm pool of pre-started edge deployments
+
+An edge workflow gets its own copy of every component, named and published
+by its workflow-offset. The pool creates those services ahead of time, one
+slot per offset, and waits for all of them (cass included, with the
+pizza_grocery keyspace loaded) to become healthy. Deploying an edge workflow
+then only claims a slot and registers the store with its components.
+Tearing it down hands the slot back to the pool instead of removing it.
+"""
+import asyncio
+import logging
+from collections import deque
+
+__author__ = "Carla Vazquez"
+__version__ = "1.0.0"
+__maintainer__ = "Carla Vazquez"
+__email__ = "cpv150030@utdallas.edu"
+__status__ = "Development"
+
+
+class WarmPool:
+    """Keeps up to size healthy slots ready to be claimed
+
+    allocate_offset() reserves a new workflow-offset, create_slot(offset)
+    starts every service of a slot and returns whether all became healthy,
+    and destroy_slot(offset) removes them.
+    """
+
+    def __init__(self, size, allocate_offset, create_slot, destroy_slot):
+        self.size = size
+        self.allocate_offset = allocate_offset
+        self.create_slot = create_slot
+        self.destroy_slot = destroy_slot
+        self.ready = deque()
+        self.filling = 0
+        self._fill_task = None
+
+    def claim(self):
+        """Returns the offset of a ready slot, or None if there is none"""
+        if not self.ready:
+            # a failed warm-up may have left the pool empty, try again
+            self.refill()
+            return None
+        offset = self.ready.popleft()
+        self.refill()
+        return offset
+
+    def release(self, offset, healthy=True):
+        """Takes back a slot once its workflow is torn down"""
+        if healthy and len(self.ready) + self.filling < self.size:
+            logging.info("slot " + str(offset) + " returned to warm pool")
+            self.ready.append(offset)
+        else:
+            asyncio.ensure_future(self.destroy_slot(offset))
+        self.refill()
+
+    def refill(self):
+        if self.size > 0 and (
+                self._fill_task is None or self._fill_task.done()):
+            self._fill_task = asyncio.ensure_future(self._fill())
+
+    async def _fill(self):
+        while len(self.ready) + self.filling < self.size:
+            offset = self.allocate_offset()
+            logging.info("warming up slot " + str(offset))
+            self.filling += 1
+            try:
+                healthy = await self.create_slot(offset)
+            except Exception as ex:
+                logging.info("could not warm up slot " + str(offset) +
+                             ": " + str(ex))
+                healthy = False
+            finally:
+                self.filling -= 1
+            if not healthy:
+                # stop here rather than retry in a tight loop, the next
+                # claim or release refills the pool again
+                await self.destroy_slot(offset)
+                return
+            self.ready.append(offset)
+            logging.info("slot " + str(offset) + " is warm")
+
+    async def stop(self):
+        if self._fill_task is not None:
+            self._fill_task.cancel()
+
+    def to_dict(self):
+        return {
+            "size": self.size,
+            "ready": list(self.ready),
+            "filling": self.filling
+        }
@@ -3,15 +3,21 @@
 
 Creates and destroys specified workflows
 """
+import asyncio
 import logging
 import json
-from time import sleep
+import os
+from time import monotonic
 
-import requests
-import docker
-import jsonschema
+import aiohttp
 from quart import Quart, request, Response
-from quart.utils import run_sync
+
+from src.docker_backend import backends
+from src.metrics import Histogram
+from src.readiness import ReadinessWatcher
+from src.registry import open_registry
+from src.validation import SchemaValidator
+from src.warm_pool import WarmPool
 
 __author__ = "Carla Vazquez"
 __version__ = "2.0.0"
@@ -25,13 +31,25 @@ logging.basicConfig(
     format="%(asctime)s - %(levelname)s - %(message)s"
 )
 logging.getLogger('docker').setLevel(logging.WARNING)
-logging.getLogger('requests').setLevel(logging.WARNING)
+logging.getLogger('aiohttp').setLevel(logging.WARNING)
 logging.getLogger('quart.app').setLevel(logging.WARNING)
 logging.getLogger('quart.serving').setLevel(logging.WARNING)
 
-# # set up necessary docker clients
-client = docker.from_env()
-APIclient = docker.APIClient(base_url='unix://var/run/docker.sock')
+# docker backend to use, either "async" (Engine API over the unix socket)
+# or "sdk" (the blocking docker SDK run in threads)
+dockerBackendName = os.environ.get("DOCKER_BACKEND", "async")
+if dockerBackendName not in backends:
+    raise ValueError("Unknown DOCKER_BACKEND " + dockerBackendName)
+
+# set up in before_serving, once the event loop is running
+dockerClient = None
+httpSession = None
+readiness = None
+warmPool = None
+
+# seconds to wait for a component, or the cass database, to become ready
+COMPONENT_TIMEOUT = float(os.environ.get("COMPONENT_TIMEOUT", "20"))
+CASS_TIMEOUT = float(os.environ.get("CASS_TIMEOUT", "45"))
 
 # set up flask app
 app = Quart(__name__)
@@ -46,14 +64,25 @@ portDict = {
     "order-processor": 6000
 }
 
-workflowOffset = 1
+# number of edge slots to keep warm and the components each slot runs
+warmPoolSize = int(os.environ.get("WARM_POOL_SIZE", "0"))
+warmPoolComponents = os.environ.get(
+    "WARM_POOL_COMPONENTS", " ".join(portDict)).split()
+
+# set up workflow registry, "sqlite" keeps it across restarts
+workflows = open_registry(
+    os.environ.get("REGISTRY_BACKEND", "sqlite"),
+    os.environ.get("REGISTRY_PATH", "data/registry.db")
+)
 
-# set up workflow dict
-workflows = dict()
+# wall-clock seconds each workflow took to deploy, keyed by storeId
+deployLatency = dict()
 
-# open workflow-request specification
-with open("src/workflow-request.schema.json", "r") as schema:
-    schema = json.loads(schema.read())
+# time-to-ready histogram of each component
+timeToReady = dict()
+
+# compile workflow-request specification
+validator = SchemaValidator("src/workflow-request.schema.json")
 
 
 ###############################################################################
@@ -62,33 +91,40 @@ with open("src/workflow-request.schema.json", "r") as schema:
 
 # check that the workflow specification json is valid
 async def verify_workflow(data):
-    global schema
-    valid = True
-    mess = None
-    try:
-        jsonschema.validate(instance=data, schema=schema)
-    except Exception as inst:
-        valid = False
+    valid, mess = validator.validate(data)
+    if not valid:
         logging.debug("workflow-request rejected:\n" + json.dumps(data))
         logging.debug("Request rejected due to failed validation.")
-        valid = False
-        mess = inst.args[0]
     return valid, mess
 
 
-async def start_component(component, storeId, data, response_list):
-    timeOut = False
-    # check if service exists
-    comp_name = component +\
-        (str(data["workflow-offset"]) if data["method"] == "edge" else "")
-    pubPort = portDict[component] +\
-        (data["workflow-offset"] if data["method"] == "edge" else 0)
-    service_filter = client.services.list(filters={'name': comp_name})
-    origin_url = "http://" + data["origin"] + ":8080/results"
-    cass_name = "cass" +\
-        (str(data["workflow-offset"]) if data["method"] == "edge" else "")
+# send a status message to the restaurant owner
+async def send_message(origin_url, message):
+    try:
+        async with httpSession.post(
+            origin_url, json=json.dumps({"message": message})
+        ):
+            pass
+    except Exception as ex:
+        logging.debug("could not reach " + origin_url + ": " + str(ex))
+
+
+# name of a component's service, edge services carry the workflow-offset
+def service_name(component, offset):
+    return component + (str(offset) if offset is not None else "")
+
+
+def workflow_offset(data):
+    return data["workflow-offset"] if data["method"] == "edge" else None
 
-    component_service = None
+
+# create the service for component if it doesn't exist and wait for it to
+# become ready, returns whether it is ready
+async def launch_component(component, offset):
+    comp_name = service_name(component, offset)
+    cass_name = service_name("cass", offset)
+    pubPort = portDict[component] + (offset or 0)
+    service_filter = await dockerClient.list_services(comp_name)
 
     # if not exists
     if len(service_filter) == 0:
@@ -97,38 +133,42 @@ async def start_component(component, storeId, data, response_list):
 
         if component != "cass":
             # create the service
-            component_service = client.services.create(
+            await dockerClient.create_service(
                 "trishaire/" + component + ":async",  # the name of the image
-                name=comp_name,  # name of service
-                endpoint_spec=docker.types.EndpointSpec(
-                    mode="vip", ports={pubPort: portDict[component]}
-                ),
+                comp_name,  # name of service
+                {pubPort: portDict[component]},  # published ports
                 env=["CASS_DB="+cass_name],  # set environment var
                 networks=['myNet'])  # set network
         else:
-            portCass = 9042 +\
-                (data["workflow-offset"] if data["method"] == "edge" else 0)
-            component_service = client.services.create(
+            portCass = 9042 + (offset or 0)
+            await dockerClient.create_service(
                 "trishaire/" + component + ":async",  # the name of the image
-                name=comp_name,  # name of service
-                endpoint_spec=docker.types.EndpointSpec(
-                    mode="vip", ports={pubPort: portDict[component],
-                                       portCass: 9042}
-                ),
+                comp_name,  # name of service
+                {pubPort: portDict[component], portCass: 9042},
                 networks=['myNet'])  # set network
 
     if component == "cass":
-        count = await spinup_cass(component, component_service, cass_name)
-        if count < 9:
-            count = await spinup_component(
-                component, data, origin_url, component_service
-            )
+        ready = await spinup_cass(comp_name)
+        if ready:
+            ready = await spinup_component(component, comp_name)
     else:
-        count = await spinup_component(
-            component, data, origin_url, component_service
-        )
+        ready = await spinup_component(component, comp_name)
+
+    # only remove the service if this call created it
+    if not ready and len(service_filter) == 0:
+        await dockerClient.remove_service(comp_name)
+
+    return ready
+
+
+async def start_component(component, storeId, data, response_list):
+    timeOut = False
+    comp_name = service_name(component, workflow_offset(data))
+    origin_url = "http://" + data["origin"] + ":8080/results"
 
-    if count < 4:
+    await send_message(origin_url, "Attempting to spin up " + comp_name)
+
+    if await launch_component(component, workflow_offset(data)):
         logging.info("SUCCESS: " + comp_name + " is healthy")
         # send update to the restaurant owner
         message = "Component " + comp_name +\
@@ -140,117 +180,86 @@ async def start_component(component, storeId, data, response_list):
         response_list.append(component)
         timeOut = True
 
-    def send_message():
-        return requests.post(origin_url, json=json.dumps({"message": message}))
-
-    await run_sync(send_message)()
+    await send_message(origin_url, message)
 
     return timeOut
 
 
-async def spinup_component(component, data, origin_url, component_service):
-    count = 0
-    comp_name = component +\
-        (str(data["workflow-offset"]) if data["method"] == "edge" else "")
-    service_url = "http://" + comp_name + ":" + str(portDict[component])
+# start every pooled component of an edge slot, cass first
+async def warm_slot(offset):
+    if "cass" in warmPoolComponents:
+        if not await launch_component("cass", offset):
+            return False
+    results = await asyncio.gather(*[
+        launch_component(component, offset)
+        for component in warmPoolComponents if component != "cass"
+    ])
+    return all(results)
 
-    def gethealth():
-        return requests.get(service_url+"/health")
 
-    def sleepfor5():
-        sleep(5)
+# remove every service of an edge slot
+async def destroy_slot(offset):
+    logging.info("removing slot " + str(offset))
+    for component in portDict:
+        comp_name = service_name(component, offset)
+        if await dockerClient.list_services(comp_name):
+            await dockerClient.remove_service(comp_name)
 
-    def send_message():
-        return requests.post(origin_url, json=json.dumps(message_dict))
 
-    # wait for component to spin up
-    while True:
+# record how long a component took to become ready
+def observe_ready(component, comp_name, seconds):
+    if seconds is None:
+        return False
+    logging.info(comp_name + " ready after " + str(round(seconds, 3)) + "s")
+    if component not in timeToReady:
+        timeToReady[component] = Histogram()
+    timeToReady[component].observe(seconds)
+    return True
+
+
+async def spinup_component(component, comp_name):
+    service_url = "http://" + comp_name + ":" + str(portDict[component])
+
+    async def is_healthy():
         try:
-            logging.debug(service_url)
-            await run_sync(gethealth)()
+            async with httpSession.get(
+                service_url + "/health",
+                timeout=aiohttp.ClientTimeout(total=5)
+            ) as resp:
+                return resp.status == 200
         except Exception as ex:
-            logging.debug(type(ex))
-            logging.debug(ex)
-            if count < 4:
-                logging.info(
-                    "Attempt " + str(count) + ", component " + comp_name +
-                    " is not ready"
-                )
-                message = "Attempting to spin up " + comp_name
-                message_dict = {"message": message}
-                await run_sync(send_message)()
-                await run_sync(sleepfor5)()
-                count += 1
-            else:
-                component_service.remove()
-                break
-        else:
-            break
-    return count
-
-
-async def spinup_cass(component, component_service, cass_name):
-    healthy = False
-    count = 0
-
-    def sleepfor5():
-        sleep(5)
-
-    # keep pinging the service
-    while not healthy:
-        # retrieve the tasks of the cass servcie
-        tasks = client.services.get(cass_name).tasks()
-
-        # see if at least one of the tasks is healthy
-        for task in tasks:
-            tID = task['ID']
-            result = APIclient.inspect_task(tID)['Status']['Message']
-            if result == 'started':
-                healthy = True
-
-        # if none of the tasks are healthy, wait a bit before
-        # trying again
-        if not healthy:
-            if count < 9:  # request has not timed out
-                logging.info(
-                    "Attempt " + str(count) + ", " + cass_name +
-                    " database is not ready"
-                )
-                await run_sync(sleepfor5)()
-                count += 1
-            else:  # request timed out
-                component_service.remove()
-                break
-    return count
+            logging.debug(comp_name + " is not ready: " + str(ex))
+            return False
 
+    # wait for component to spin up
+    seconds = await readiness.wait(comp_name, is_healthy, COMPONENT_TIMEOUT)
+    return observe_ready(component, comp_name, seconds)
 
-async def comp_action(action, component, storeId, data, response_list=None):
 
-    def requestPUT():
-        return requests.put(
-            service_url + "/workflow-requests/" + storeId,
-            json=json.dumps(data)
-        )
+async def spinup_cass(cass_name):
 
-    def requestUPDATE():
-        return requests.put(
-            service_url + "/workflow-update/" + storeId,
-            json=json.dumps(data)
+    async def is_started():
+        # see if at least one of the tasks of the cass service has started
+        tasks = await dockerClient.service_tasks(cass_name)
+        return any(
+            task.get('Status', {}).get('Message') == 'started'
+            for task in tasks
         )
 
-    def requestDELETE():
-        return requests.delete(
-            service_url + "/workflow-requests/" + storeId)
+    # wait for the database to start before health checking its wrapper
+    seconds = await readiness.wait(cass_name, is_started, CASS_TIMEOUT)
+    return observe_ready("cass-database", cass_name, seconds)
+
 
+async def comp_action(action, component, storeId, data, response_list=None):
     # check if service exists
-    comp_name = component +\
-        (str(data["workflow-offset"]) if data["method"] == "edge" else "")
+    comp_name = service_name(component, workflow_offset(data))
     service_url = "http://" + comp_name + ":" + str(portDict[component])
     service_filter = None
 
     if action == "teardown":
         # check if service exists
-        service_filter = client.services.list(filters={'name': comp_name})
+        service_filter = await dockerClient.list_services(comp_name)
         if len(service_filter) == 0:
             return
 
@@ -263,13 +272,26 @@ async def comp_action(action, component, storeId, data, response_list=None):
     # send workflow_request to component
     logging.info("sent workflow " + action + " to " + component)
     if action == "start":
-        comp_response = await run_sync(requestPUT)()
+        method = "PUT"
+        url = service_url + "/workflow-requests/" + storeId
     elif action == "update":
-        comp_response = await run_sync(requestUPDATE)()
+        method = "PUT"
+        url = service_url + "/workflow-update/" + storeId
     else:
-        comp_response = await run_sync(requestDELETE)()
+        method = "DELETE"
+        url = service_url + "/workflow-requests/" + storeId
+
+    async with httpSession.request(
+        method, url, json=json.dumps(data) if method == "PUT" else None
+    ) as comp_response:
+        status_code = comp_response.status
+        text = await comp_response.text()
+
+    if action == "teardown":
         if data["method"] == "edge":
-            service_filter[0].remove()
+            # services of a warm pool slot are kept for the next workflow
+            if workflow_offset(data) not in workflows.pooled_offsets:
+                await dockerClient.remove_service(service_filter[0]["ID"])
         else:  # if no other workflow is using it, remove it.
             canTearDown = True
             for store in workflows:
@@ -278,15 +300,15 @@ async def comp_action(action, component, storeId, data, response_list=None):
                         canTearDown = False
                         break
             if canTearDown:
-                service_filter[0].remove()
+                await dockerClient.remove_service(service_filter[0]["ID"])
 
     logging.info(
-        "recieved response " + str(comp_response.status_code) +
-        " " + comp_response.text + " from " + component
+        "recieved response " + str(status_code) +
+        " " + text + " from " + component
     )
 
-    if (action == "update" and comp_response.status_code != 200) or\
-       (action == "start" and comp_response.status_code != 201):
+    if (action == "update" and status_code != 200) or\
+       (action == "start" and status_code != 201):
         response_list.append(component)
 
 
@@ -301,23 +323,110 @@ async def start_threads(action, storeId, component_list, data):
             component_list.remove("cass")
             # startup cass first and foremost
             await comp_action("start", "cass", storeId, data, response_list)
+            # every other component depends on cass, so there is no point
+            # in starting them if it failed
+            if response_list:
+                return response_list
 
-    # start threads for the rest of the components
-    for comp in component_list:
-        if response_list:
-            break
-        await comp_action(action, comp, storeId, data, response_list)
+    # act on the rest of the components concurrently
+    await asyncio.gather(*[
+        comp_action(action, comp, storeId, data, response_list)
+        for comp in component_list
+    ])
 
     return response_list
 
 
+# split a service name into its component and edge offset
+def parse_service_name(name):
+    for component in portDict:
+        suffix = name[len(component):]
+        if name.startswith(component) and (suffix == "" or suffix.isdigit()):
+            return component, (int(suffix) if suffix else None)
+    return None, None
+
+
+# bring the registry in line with the services that are actually running
+async def reconcile():
+    running = set()
+    offsets = set()
+    for service in await dockerClient.list_services():
+        component, offset = parse_service_name(service["Spec"]["Name"])
+        if component is not None:
+            running.add(service["Spec"]["Name"])
+            if offset is not None:
+                offsets.add(offset)
+
+    # never hand out an offset that is still in use
+    if offsets:
+        workflows.reserve_offsets(max(offsets) + 1)
+
+    # resume registered workflows, restarting components that went missing
+    for storeId, data in list(workflows.items()):
+        offset = workflow_offset(data)
+        offsets.discard(offset)
+        missing = [
+            component for component in data["component-list"]
+            if service_name(component, offset) not in running
+        ]
+        if missing:
+            logging.info("restarting " + " ".join(missing) +
+                         " for workflow " + storeId)
+            asyncio.ensure_future(
+                start_threads("start", storeId, missing, data))
+        else:
+            logging.info("resumed workflow " + storeId)
+
+    # the rest are warm pool slots from before the restart, keep the
+    # complete ones and remove the others
+    for offset in sorted(offsets):
+        complete = all(
+            service_name(component, offset) in running
+            for component in warmPoolComponents
+        )
+        if offset in workflows.pooled_offsets:
+            workflows.unmark_pooled(offset)
+        if complete and len(warmPool.ready) < warmPool.size:
+            logging.info("adopted slot " + str(offset) + " into warm pool")
+            warmPool.ready.append(offset)
+        else:
+            await destroy_slot(offset)
+
+
+###############################################################################
+#                           Startup and Shutdown
+###############################################################################
+
+# open the docker client and the pooled http session
+@app.before_serving
+async def open_clients():
+    global dockerClient, httpSession, readiness, warmPool
+    logging.info("using the " + dockerBackendName + " docker backend")
+    dockerClient = backends[dockerBackendName]()
+    httpSession = aiohttp.ClientSession(
+        timeout=aiohttp.ClientTimeout(total=30)
+    )
+    readiness = ReadinessWatcher(dockerClient)
+    readiness.start()
+    warmPool = WarmPool(
+        warmPoolSize, workflows.next_offset, warm_slot, destroy_slot)
+    await reconcile()
+    warmPool.refill()
+
+
+@app.after_serving
+async def close_clients():
+    await warmPool.stop()
+    await readiness.stop()
+    await httpSession.close()
+    await dockerClient.close()
+
+
 ###############################################################################
 #                           API Endpoints
 ###############################################################################
 @app.route("/workflow-requests/<storeId>", methods=["PUT"])
 async def setup_workflow(storeId):
-    global workflowOffset
-
     logging.info("{:*^74}".format(
         " PUT /workflow-requests/"
         + storeId + " "
@@ -348,15 +457,27 @@ async def setup_workflow(storeId):
         )
 
     if data["method"] == "edge":
-        data["workflow-offset"] = workflowOffset
-        workflowOffset += 1
+        # claim a warm slot if one is ready, otherwise start from scratch
+        offset = warmPool.claim()
+        if offset is not None:
+            logging.info("claimed warm pool slot " + str(offset))
+            workflows.mark_pooled(offset)
+        else:
+            offset = workflows.next_offset()
+        data["workflow-offset"] = offset
     workflows[storeId] = data
 
     # get the list of components for the workflow
     component_list = data["component-list"].copy()
+    deployStart = monotonic()
     failed_list = await start_threads("start", storeId, component_list, data)
 
     if len(failed_list) == 0:
+        deployLatency[storeId] = round(monotonic() - deployStart, 3)
+        logging.info(
+            "workflow for " + storeId + " deployed in " +
+            str(deployLatency[storeId]) + " seconds"
+        )
         logging.info("{:*^74}".format(" Request SUCCEEDED "))
         return Response(
             status=201, response="success"
@@ -365,6 +486,10 @@ async def setup_workflow(storeId):
         component_list = data["component-list"].copy()
         await start_threads("teardown", storeId, component_list, data)
         del workflows[storeId]
+        # a slot that failed to deploy is not worth keeping
+        if workflow_offset(data) in workflows.pooled_offsets:
+            workflows.unmark_pooled(data["workflow-offset"])
+            warmPool.release(data["workflow-offset"], healthy=False)
         logging.info("{:*^74}".format(" Request FAILED "))
         return Response(
             status=403,
@@ -475,10 +600,14 @@ async def teardown_workflow(storeId):
     # get the list of components for the workflow
     component_list = workflows[storeId]["component-list"].copy()
     # teardown components
-    await start_threads(
-        "teardown", storeId, component_list, workflows[storeId])
+    data = workflows[storeId]
+    await start_threads("teardown", storeId, component_list, data)
     # delete the given workflow from the dictionary
     del workflows[storeId]
+    # hand a warm pool slot back to the pool
+    if workflow_offset(data) in workflows.pooled_offsets:
+        workflows.unmark_pooled(data["workflow-offset"])
+        warmPool.release(data["workflow-offset"])
 
     logging.info("{:*^74}".format(" Request SUCCEEDED "))
     return Response(status=204, response="success")
@@ -510,7 +639,25 @@ async def retrieve_workflows():
     logging.info("{:*^74}".format(" Request SUCCEEDED "))
     return Response(
         status=200,
-        response=json.dumps(workflows)
+        response=json.dumps(dict(workflows))
+    )
+
+
+# retrieve the manager's metrics
+@app.route("/metrics", methods=["GET"])
+async def retrieve_metrics():
+    logging.info("{:*^74}".format(" GET /metrics "))
+    logging.info("{:*^74}".format(" Request SUCCEEDED "))
+    return Response(
+        status=200,
+        response=json.dumps({
+            "deploy-latency": deployLatency,
+            "warm-pool": warmPool.to_dict(),
+            "time-to-ready": {
+                component: histogram.to_dict()
+                for component, histogram in timeToReady.items()
+            }
+        })
     )
 
 
@@ -0,0 +1,151 @@
+#!/usr/bin/env python
+"""Tests the async docker backend against a fake Docker Engine API served
+over a unix socket
+
+run from the Manager folder with `pipenv run python -m pytest tests` or
+`pipenv run python tests/docker_backend_test.py`
+"""
+import asyncio
+import json
+import os
+import sys
+import tempfile
+
+from aiohttp import web
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from src.docker_backend import AsyncDockerClient, DockerAPIError  # noqa: E402
+
+__author__ = "Carla Vazquez"
+__version__ = "1.0.0"
+__maintainer__ = "Carla Vazquez"
+__email__ = "cpv150030@utdallas.edu"
+__status__ = "Development"
+
+
+class FakeDocker:
+    """In memory stand in for the swarm endpoints the manager uses"""
+
+    def __init__(self):
+        self.services = {}
+        self.tasks = {}
+        self.app = web.Application()
+        self.app.add_routes([
+            web.get("/services", self.list_services),
+            web.post("/services/create", self.create_service),
+            web.delete("/services/{id}", self.remove_service),
+            web.get("/tasks", self.list_tasks),
+            web.get("/tasks/{id}", self.inspect_task),
+        ])
+
+    async def list_services(self, request):
+        if "filters" not in request.query:
+            return web.json_response(list(self.services.values()))
+        names = json.loads(request.query["filters"])["name"]
+        return web.json_response([
+            s for s in self.services.values()
+            if any(s["Spec"]["Name"].startswith(n) for n in names)
+        ])
+
+    async def create_service(self, request):
+        spec = await request.json()
+        service_id = "svc" + str(len(self.services) + 1)
+        self.services[service_id] = {"ID": service_id, "Spec": spec}
+        task_id = "task" + service_id
+        self.tasks[task_id] = {
+            "ID": task_id,
+            "ServiceID": service_id,
+            "Status": {"State": "running", "Message": "started"}
+        }
+        return web.json_response({"ID": service_id}, status=201)
+
+    async def remove_service(self, request):
+        service_id = request.match_info["id"]
+        for sid, service in list(self.services.items()):
+            if service_id in (sid, service["Spec"]["Name"]):
+                del self.services[sid]
+                return web.Response(status=200)
+        return web.json_response(
+            {"message": "service " + service_id + " not found"}, status=404)
+
+    async def list_tasks(self, request):
+        names = json.loads(request.query["filters"])["service"]
+        ids = [
+            sid for sid, s in self.services.items()
+            if s["Spec"]["Name"] in names
+        ]
+        return web.json_response([
+            t for t in self.tasks.values() if t["ServiceID"] in ids
+        ])
+
+    async def inspect_task(self, request):
+        return web.json_response(self.tasks[request.match_info["id"]])
+
+
+async def run_backend_roundtrip(socket_path):
+    fake = FakeDocker()
+    runner = web.AppRunner(fake.app)
+    await runner.setup()
+    await web.UnixSite(runner, socket_path).start()
+
+    client = AsyncDockerClient(socket_path)
+    try:
+        assert await client.list_services("order-verifier1") == []
+
+        service_id = await client.create_service(
+            "trishaire/order-verifier:async", "order-verifier1",
+            {1001: 1000}, env=["CASS_DB=cass1"], networks=["myNet"]
+        )
+        spec = fake.services[service_id]["Spec"]
+        assert spec["Name"] == "order-verifier1"
+        assert spec["TaskTemplate"]["ContainerSpec"]["Env"] == \
+            ["CASS_DB=cass1"]
+        assert spec["TaskTemplate"]["Networks"] == [{"Target": "myNet"}]
+        assert spec["EndpointSpec"]["Ports"] == [
+            {"Protocol": "tcp", "PublishedPort": 1001, "TargetPort": 1000}
+        ]
+
+        services = await client.list_services("order-verifier1")
+        assert [s["ID"] for s in services] == [service_id]
+
+        tasks = await client.service_tasks("order-verifier1")
+        assert len(tasks) == 1
+        task = await client.inspect_task(tasks[0]["ID"])
+        assert task["Status"]["Message"] == "started"
+
+        # the manager removes by name and by ID
+        await client.remove_service("order-verifier1")
+        assert await client.list_services("order-verifier1") == []
+
+        try:
+            await client.remove_service(service_id)
+        except DockerAPIError as err:
+            assert err.status == 404
+        else:
+            raise AssertionError("removing a missing service must fail")
+
+        # many concurrent calls share the one pooled connector
+        await asyncio.gather(*[
+            client.create_service(
+                "trishaire/restocker:async", "restocker" + str(i),
+                {5000 + i: 5000}
+            ) for i in range(1, 21)
+        ])
+        assert len(await client.list_services()) == 20
+        # names are matched exactly, not by prefix
+        services = await client.list_services("restocker1")
+        assert [s["Spec"]["Name"] for s in services] == ["restocker1"]
+    finally:
+        await client.close()
+        await runner.cleanup()
+
+
+def test_async_backend():
+    with tempfile.TemporaryDirectory() as tmp:
+        asyncio.run(run_backend_roundtrip(os.path.join(tmp, "docker.sock")))
+
+
+if __name__ == "__main__":
+    test_async_backend()
+    print("well done")
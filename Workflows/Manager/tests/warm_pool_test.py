@@ -0,0 +1,92 @@
+#!/usr/bin/env python
+"""Tests the warm pool refills after a slot fails to warm up
+
+run from the Manager folder with `pipenv run python -m pytest tests` or
+`pipenv run python tests/warm_pool_test.py`
+"""
+import asyncio
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from src.warm_pool import WarmPool  # noqa: E402
+
+__author__ = "Carla Vazquez"
+__version__ = "1.0.0"
+__maintainer__ = "Carla Vazquez"
+__email__ = "cpv150030@utdallas.edu"
+__status__ = "Development"
+
+
+class FakeSlots:
+    """Hands out offsets and reports the first warm-ups as unhealthy"""
+
+    def __init__(self, failures):
+        self.failures = failures
+        self.offset = 0
+        self.destroyed = []
+
+    def allocate_offset(self):
+        self.offset += 1
+        return self.offset
+
+    async def create_slot(self, offset):
+        await asyncio.sleep(0)
+        if self.failures > 0:
+            self.failures -= 1
+            return False
+        return True
+
+    async def destroy_slot(self, offset):
+        self.destroyed.append(offset)
+
+
+def make_pool(size, failures):
+    slots = FakeSlots(failures)
+    pool = WarmPool(size, slots.allocate_offset, slots.create_slot,
+                    slots.destroy_slot)
+    return pool, slots
+
+
+async def settle(pool):
+    while pool._fill_task is not None and not pool._fill_task.done():
+        await asyncio.sleep(0)
+
+
+def test_claim_refills_after_failed_warm_up():
+    async def run():
+        pool, slots = make_pool(1, failures=1)
+        pool.refill()
+        await settle(pool)
+        assert pool.to_dict() == {"size": 1, "ready": [], "filling": 0}
+        assert slots.destroyed == [1]
+        # the empty claim falls back to a cold start, but refills the pool
+        assert pool.claim() is None
+        await settle(pool)
+        assert pool.claim() == 2
+        await settle(pool)
+        assert list(pool.ready) == [3]
+
+    asyncio.run(run())
+
+
+def test_release_refills_after_failed_warm_up():
+    async def run():
+        pool, slots = make_pool(2, failures=1)
+        pool.refill()
+        await settle(pool)
+        assert list(pool.ready) == []
+        # a torn down workflow that is not healthy is removed, and the pool
+        # warms up new slots in its place
+        pool.release(7, healthy=False)
+        await settle(pool)
+        assert list(pool.ready) == [2, 3]
+        assert 7 in slots.destroyed
+
+    asyncio.run(run())
+
+
+if __name__ == "__main__":
+    test_claim_refills_after_failed_warm_up()
+    test_release_refills_after_failed_warm_up()
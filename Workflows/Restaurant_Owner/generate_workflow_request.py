@@ -38,6 +38,7 @@ app = Flask(__name__)
 # create global var storeSelect
 storeSelect = None
 method = None
+pipeline_mode = "synchronous"
 workflow_offset = 0
 
 
@@ -60,7 +61,8 @@ def update_workflow():
     workflow_dict = {
         "method": method,
         "component-list": component_list,
-        "origin": ip_address
+        "origin": ip_address,
+        "pipeline-mode": pipeline_mode
     }
 
     # send the workflow-request to the workflow manager
@@ -190,7 +192,7 @@ def request_prediction():
 
 # create a workflow-request
 def issue_workflow_request():
-    global storeSelect, method
+    global storeSelect, method, pipeline_mode
 
     # get deployment method
     method = input("What deployment method do you want to use "
@@ -199,6 +201,13 @@ def issue_workflow_request():
     while method != "persistent" and method != "edge":
         method = input("Invalid selection. Pick persistent or edge: ")
 
+    # get pipeline mode
+    pipeline_mode = input("What pipeline mode do you want to use "
+                          "(synchronous or queued): ")
+
+    while pipeline_mode != "synchronous" and pipeline_mode != "queued":
+        pipeline_mode = input("Invalid selection. Pick synchronous or queued: ")
+
     # get component-list
     component_list = getCompList()
 
@@ -210,7 +219,8 @@ def issue_workflow_request():
     workflow_dict = {
         "method": method,
         "component-list": component_list,
-        "origin": ip_address
+        "origin": ip_address,
+        "pipeline-mode": pipeline_mode
     }
 
     # send the workflow-request to the workflow manager
@@ -7,16 +7,20 @@ if one exists. If the request is determined to be invalid, then the request is r
 by this component and removed from the workflow.
 """
 
+import asyncio
 import copy
 import json
 import logging
 import os
 import uuid
 
-import jsonschema
-import requests
 from quart import Quart, Response, request
-from quart.utils import run_sync
+
+from src.batch import (accepted, forward_batch, merge_results, parse_batch,
+                       rejected, split_by_store)
+from src.http_client import ForwardingClient
+from src.order_queue import OrderQueue, is_queued
+from src.validation import SchemaValidator
 
 __author__ = "Chris Scott"
 __version__ = "3.0.0"
@@ -27,26 +31,27 @@ __status__ = "Development"
 # Create Quart app
 app = Quart(__name__)
 
-# Open jsonschema for pizza-order
-with open("src/pizza-order.schema.json", "r") as pizza_schema:
-    pizza_schema = json.loads(pizza_schema.read())
+# Compile jsonschema for pizza-order
+pizza_validator = SchemaValidator("src/pizza-order.schema.json")
 
-# Open jsonschema for workflow-request
-with open("src/workflow-request.schema.json", "r") as workflow_schema:
-    workflow_schema = json.loads(workflow_schema.read())
+# Compile jsonschema for workflow-request
+workflow_validator = SchemaValidator("src/workflow-request.schema.json")
 
 # Logging
 logging.basicConfig(
     level=logging.INFO, 
     format='%(asctime)s - %(levelname)s - %(message)s'
 )
-logging.getLogger('requests').setLevel(logging.WARNING)
+logging.getLogger('aiohttp').setLevel(logging.WARNING)
 logging.getLogger('quart.app').setLevel(logging.WARNING)
 logging.getLogger('quart.serving').setLevel(logging.WARNING)
 
 # Global workflows dict
 workflows = dict()
 
+# Pooled HTTP client for forwarding orders
+http_client = ForwardingClient.from_env()
+
 
 ###############################################################################
 #                           Helper Functions
@@ -61,55 +66,83 @@ async def get_next_component(store_id):
     return comp_list[next_comp_index]
 
 
-async def get_component_url(component, store_id):
+async def get_component_url(component, store_id, endpoint="order"):
     comp_name = component +\
         (str(workflows[store_id]["workflow-offset"]) if workflows[store_id]["method"] == "edge" else "")
     url = "http://" + comp_name + ":"
     if component == "delivery-assigner":
-        url += "3000/order"
+        url += "3000/"
     elif component == "stock-analyzer":
-        url += "4000/order"
+        url += "4000/"
     elif component == "restocker":
-        url += "5000/order"
+        url += "5000/"
     elif component == "order-processor":
-        url += "6000/order"
-    return url
+        url += "6000/"
+    return url + endpoint
 
 
 async def send_order_to_next_component(url, order):
     # send order to next component
-    def request_post():
-        return requests.post(url, json=json.dumps(order))
-    
-    r = await run_sync(request_post)()
-        
-    return Response(status=r.status_code, response=r.text)
+    status_code, text = await http_client.post(url, order)
+
+    return Response(status=status_code, response=text)
+
+
+# validate and forward the orders of one store, returns their results
+async def process_store_batch(store_id, orders):
+    results = [None] * len(orders)
+    forward = []
+    for index, order in enumerate(orders):
+        valid, mess = await verify_order(order["pizza-order"])
+        if not valid:
+            results[index] = rejected(
+                400, "Request rejected, pizza-order is malformed:  " + mess)
+            continue
+        order.update({"valid": valid})
+        forward.append(index)
+
+    logging.info("Store " + store_id + ": " + str(len(forward)) + " of " +
+                 str(len(orders)) + " orders are valid.")
+
+    next_comp = await get_next_component(store_id)
+
+    if next_comp is None:
+        merge_results(results, forward, [accepted(orders[i]) for i in forward])
+        return results
+
+    forwarded = await forward_batch(
+        http_client.post,
+        await get_component_url(next_comp, store_id, "orders/batch"),
+        await get_component_url(next_comp, store_id),
+        [orders[index] for index in forward]
+    )
+    merge_results(results, forward, forwarded)
+    return results
 
 
 # validate pizza-order against schema
 async def verify_order(data):
-    global pizza_schema
-    valid = True
-    mess = None
-    try:
-        jsonschema.validate(instance=data, schema=pizza_schema)
-    except Exception as inst:
-        valid = False
-        mess = inst.args[0]
-    return valid, mess
+    return pizza_validator.validate(data)
+
+
+# status URL of an order at the next component, once it is forwarded there
+async def get_status_url(store_id, order_id):
+    next_comp = await get_next_component(store_id)
+    if next_comp is None:
+        return None
+    return await get_component_url(next_comp, store_id, "orders/" + order_id + "/status")
 
 
 # validate workflow-request against schema
 async def verify_workflow(data):
-    global workflow_schema
-    valid = True
-    mess = None
-    try:
-        jsonschema.validate(instance=data, schema=workflow_schema)
-    except Exception as inst:
-        valid = False
-        mess = inst.args[0]
-    return valid, mess
+    return workflow_validator.validate(data)
+
+
+# Queue of the orders of queued workflows
+order_queue = OrderQueue(
+    os.environ.get("QUEUE_PATH", "data/order-queue.db"),
+    workflows, process_store_batch, get_status_url, http_client.get
+)
 
 
 ###############################################################################
@@ -128,6 +161,14 @@ async def order_funct():
         logging.info(message)
         return Response(status=422, response=message)
 
+    if is_queued(workflows[order["pizza-order"]["storeId"]]):
+        await order_queue.put(order["pizza-order"]["storeId"], [order])
+        logging.info("Order " + order["orderId"] + " queued.")
+        return Response(
+            status=202,
+            response=json.dumps({"orderId": order["orderId"], "status": "queued"})
+        )
+
     store_id = order["pizza-order"]["storeId"]
     cust_name = order["pizza-order"]["custName"]
 
@@ -174,6 +215,63 @@ async def order_funct():
     return Response(status=200, response=json.dumps(order))
 
 
+# validate a batch of pizza-orders and forward them by store
+@app.route('/orders/batch', methods=['POST'])
+async def batch_funct():
+    logging.info("{:*^74}".format(" POST /orders/batch "))
+    try:
+        orders = parse_batch(
+            await request.get_data(),
+            request.mimetype == "application/x-ndjson"
+        )
+    except ValueError as inst:
+        # json.JSONDecodeError is a ValueError too
+        error_mess = "Request rejected, batch is malformed:  " + str(inst)
+        logging.info(error_mess)
+        return Response(status=400, response=error_mess)
+
+    logging.info("Verifying " + str(len(orders)) + " orders.")
+
+    results, stores = split_by_store(orders, workflows)
+    store_ids = list(stores)
+    store_results = await asyncio.gather(*[
+        order_queue.submit(
+            workflows[store_id], store_id, [orders[i] for i in stores[store_id]])
+        for store_id in store_ids
+    ])
+    for store_id, partial in zip(store_ids, store_results):
+        merge_results(results, stores[store_id], partial)
+
+    return Response(status=200, response=json.dumps({"results": results}))
+
+
+# status of an order of a queued workflow
+@app.route("/orders/<orderId>/status", methods=["GET"])
+async def order_status(orderId):
+    logging.info("{:*^74}".format(" GET /orders/" + orderId + "/status "))
+    status = await order_queue.lookup(orderId)
+    if status is None:
+        return Response(
+            status=404,
+            response="Order was not queued by the order verifier.\n"
+        )
+    return Response(status=200, response=json.dumps(status))
+
+
+# open the http client and start the consumer of the order queue with the
+# server, and stop both with it
+@app.before_serving
+async def startup():
+    await http_client.start()
+    order_queue.start()
+
+
+@app.after_serving
+async def shutdown():
+    await order_queue.stop()
+    await http_client.close()
+
+
 # if workflow-request is valid and does not exist, create it
 @app.route("/workflow-requests/<storeId>", methods=['PUT'])
 async def setup_workflow(storeId):
@@ -0,0 +1,151 @@
+#!/usr/bin/env python
+"""Load test of the hop between two components
+
+Sends pizza-orders at a fixed rate to a stand-in next component served on
+localhost and reports the latency of each hop, once through the pooled
+ForwardingClient and, if requests is installed, once through a new
+requests.post per order, the way components used to forward orders.
+
+run from the C1 folder with `pipenv run python tests/forwarding_load_test.py`
+(optionally followed by the rate and duration, 500 orders/s for 10 seconds
+by default) or run the short check with `pipenv run python -m pytest tests`
+"""
+import asyncio
+import json
+import os
+import sys
+from time import perf_counter
+
+from aiohttp import web
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from src.http_client import ForwardingClient  # noqa: E402
+from tests.validation_benchmark import make_order  # noqa: E402
+
+__author__ = "Chris Scott"
+__version__ = "1.0.0"
+__maintainer__ = "Chris Scott"
+__email__ = "cms190009@utdallas.edu"
+__status__ = "Development"
+
+# time the stand-in component spends on an order
+SERVICE_TIME = 0.002
+
+
+class NextComponent:
+    """Answers POST /order like the last component of a workflow"""
+
+    def __init__(self):
+        self.connections = set()
+        self.app = web.Application()
+        self.app.add_routes([web.post("/order", self.order)])
+
+    async def order(self, request):
+        self.connections.add(id(request.transport))
+        order = json.loads(await request.json())
+        await asyncio.sleep(SERVICE_TIME)
+        return web.Response(status=200, text=json.dumps(order))
+
+    async def start(self):
+        self.runner = web.AppRunner(self.app)
+        await self.runner.setup()
+        site = web.TCPSite(self.runner, "127.0.0.1", 0)
+        await site.start()
+        port = site._server.sockets[0].getsockname()[1]
+        return "http://127.0.0.1:" + str(port) + "/order"
+
+    async def stop(self):
+        await self.runner.cleanup()
+
+
+def requests_post():
+    import requests
+
+    def post(url, data):
+        r = requests.post(url, json=json.dumps(data))
+        return r.status_code, r.text
+
+    async def post_in_thread(url, data):
+        return await asyncio.get_event_loop().run_in_executor(
+            None, post, url, data)
+
+    return post_in_thread
+
+
+async def run_load(post, url, rate, duration):
+    """Sends rate orders a second for duration seconds, returns the status
+    codes and latencies of the hops and the achieved rate"""
+    orders = [{"pizza-order": make_order()} for _ in range(int(rate * duration))]
+    latencies = []
+    statuses = []
+
+    async def send(order):
+        start = perf_counter()
+        status_code, text = await post(url, order)
+        latencies.append(perf_counter() - start)
+        statuses.append(status_code)
+
+    start = perf_counter()
+    tasks = []
+    for index, order in enumerate(orders):
+        # open loop, orders are sent on schedule whether or not earlier
+        # orders have been answered
+        delay = start + index / rate - perf_counter()
+        if delay > 0:
+            await asyncio.sleep(delay)
+        tasks.append(asyncio.ensure_future(send(order)))
+    await asyncio.gather(*tasks)
+    return statuses, sorted(latencies), len(orders) / (perf_counter() - start)
+
+
+def percentile(latencies, fraction):
+    return latencies[min(len(latencies) - 1, int(len(latencies) * fraction))]
+
+
+async def measure(label, post, rate, duration):
+    next_component = NextComponent()
+    url = await next_component.start()
+    try:
+        statuses, latencies, achieved = await run_load(post, url, rate, duration)
+    finally:
+        await next_component.stop()
+    print("{:<18} {:>6.0f} orders/s   p50 {:>7.2f} ms   p95 {:>7.2f} ms   "
+          "p99 {:>7.2f} ms   {:>5} connections   {:>4} errors".format(
+              label, achieved,
+              percentile(latencies, 0.50) * 1000,
+              percentile(latencies, 0.95) * 1000,
+              percentile(latencies, 0.99) * 1000,
+              len(next_component.connections),
+              sum(status != 200 for status in statuses)))
+    return statuses, latencies, next_component.connections
+
+
+async def pooled(rate, duration):
+    client = ForwardingClient(pool_size=20)
+    await client.start()
+    try:
+        return await measure("ForwardingClient", client.post, rate, duration)
+    finally:
+        await client.close()
+
+
+def test_pooled_client_reuses_connections():
+    statuses, latencies, connections = asyncio.run(pooled(500, 1))
+    assert statuses == [200] * 500
+    assert len(connections) <= 20
+
+
+async def main(rate, duration):
+    await pooled(rate, duration)
+    try:
+        post = requests_post()
+    except ImportError:
+        print("requests is not installed, skipping the requests.post baseline")
+        return
+    await measure("requests.post", post, rate, duration)
+
+
+if __name__ == "__main__":
+    arguments = [float(argument) for argument in sys.argv[1:3]]
+    asyncio.run(main(*(arguments + [500, 10][len(arguments):])))
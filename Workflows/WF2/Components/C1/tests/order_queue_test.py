@@ -0,0 +1,76 @@
+#!/usr/bin/env python
+"""Tests the order queue gives up on a batch that keeps failing
+
+run from the C1 folder with `pipenv run python -m pytest tests`
+"""
+import asyncio
+import os
+import sys
+import tempfile
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from src.order_queue import OrderQueue  # noqa: E402
+
+__author__ = "Chris Scott"
+__version__ = "1.0.0"
+__maintainer__ = "Chris Scott"
+__email__ = "cms190009@utdallas.edu"
+__status__ = "Development"
+
+
+class FailingStore:
+    """Processes the orders of a batch, raising on any batch that holds
+    the poison order"""
+
+    def __init__(self):
+        self.attempts = 0
+        self.processed = []
+
+    async def process(self, store_id, orders):
+        if any(order.get("poison") for order in orders):
+            self.attempts += 1
+            raise RuntimeError("cass is down")
+        self.processed.extend(order["orderId"] for order in orders)
+        return [{"status-code": 200, "order": order} for order in orders]
+
+
+async def no_status_url(store_id, order_id):
+    return None
+
+
+async def no_get(url):
+    return 404, ""
+
+
+async def wait_for(condition):
+    for _ in range(1000):
+        if condition():
+            return
+        await asyncio.sleep(0.01)
+    assert False, "condition never met"
+
+
+def test_failing_batch_is_marked_failed():
+    async def run():
+        store = FailingStore()
+        with tempfile.TemporaryDirectory() as directory:
+            queue = OrderQueue(
+                os.path.join(directory, "queue.db"), {"7": {}}, store.process,
+                no_status_url, no_get, batch_size=1, max_attempts=3,
+                retry_delay=0
+            )
+            queue.start()
+            poison = {"orderId": "poison", "poison": True}
+            await queue.put("7", [poison, {"orderId": "behind"}])
+            await wait_for(lambda: store.processed == ["behind"])
+            await queue.stop()
+            status = await queue.lookup("poison")
+            assert store.attempts == 3
+            assert status["status"] == "failed"
+            assert status["attempts"] == 3
+            assert status["error"]["text"] == "cass is down"
+            assert (await queue.lookup("behind"))["status"] == "completed"
+            assert await queue.lookup("unknown") is None
+
+    asyncio.run(run())
@@ -0,0 +1,106 @@
+#!/usr/bin/env python
+"""Compares pizza-order validation throughput of jsonschema.validate, as
+order-verifier used to call it, with the compiled SchemaValidator
+
+run from the C1 folder with `pipenv run python tests/validation_benchmark.py`
+or check the validators agree with `pipenv run python -m pytest tests`
+"""
+import json
+import os
+import random
+import sys
+import uuid
+from time import perf_counter
+
+import jsonschema
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from src.validation import SchemaValidator  # noqa: E402
+
+__author__ = "Chris Scott"
+__version__ = "1.0.0"
+__maintainer__ = "Chris Scott"
+__email__ = "cms190009@utdallas.edu"
+__status__ = "Development"
+
+SCHEMA_PATH = os.path.join(
+    os.path.dirname(__file__), "..", "src", "pizza-order.schema.json")
+
+TOPPINGS = ["Pepperoni", "Sausage", "Beef", "Onion", "Chicken", "Peppers",
+            "Olives", "Bacon", "Pineapple", "Mushrooms"]
+
+
+def make_order():
+    pizzas = []
+    for _ in range(random.randint(1, 5)):
+        pizzas.append({
+            "crustType": random.choice(["Thin", "Traditional"]),
+            "sauceType": random.choice(["Spicy", "Traditional"]),
+            "cheeseAmt": random.choice(["None", "Light", "Normal", "Extra"]),
+            "toppingList": random.sample(TOPPINGS, random.randint(0, 9))
+        })
+    # the contents of "pizza-order", which is what verify_order checks
+    return {
+        "storeId": str(uuid.uuid4()),
+        "custName": "Jane Doe",
+        "paymentToken": str(uuid.uuid4()),
+        "paymentTokenType": random.choice(["PayPal", "Visa", "AMEX"]),
+        "custLocation": {
+            "lat": round(random.uniform(32.9, 33.1), 6),
+            "lon": round(random.uniform(-96.8, -96.6), 6)
+        },
+        "orderDate": "2020-11-01T12:00:00",
+        "pizzaList": pizzas
+    }
+
+
+def make_invalid_order():
+    order = make_order()
+    order["pizzaList"][0]["crustType"] = "Deep Dish"
+    return order
+
+
+def validate_uncompiled(schema, data):
+    try:
+        jsonschema.validate(instance=data, schema=schema)
+    except Exception as inst:
+        return False, inst.args[0]
+    return True, None
+
+
+def test_validators_agree():
+    with open(SCHEMA_PATH, "r") as schema_file:
+        schema = json.loads(schema_file.read())
+    validator = SchemaValidator(SCHEMA_PATH)
+    for order in [make_order() for _ in range(50)]:
+        assert validator.validate(order) == (True, None)
+    for order in [make_invalid_order() for _ in range(50)]:
+        valid, mess = validator.validate(order)
+        assert not valid
+        assert mess == validate_uncompiled(schema, order)[1]
+
+
+def rate(validate, orders):
+    start = perf_counter()
+    for order in orders:
+        validate(order)
+    return len(orders) / (perf_counter() - start)
+
+
+def main(count=2000):
+    with open(SCHEMA_PATH, "r") as schema_file:
+        schema = json.loads(schema_file.read())
+    validator = SchemaValidator(SCHEMA_PATH)
+    for label, orders in [
+            ("valid", [make_order() for _ in range(count)]),
+            ("invalid", [make_invalid_order() for _ in range(count)])]:
+        before = rate(lambda order: validate_uncompiled(schema, order), orders)
+        after = rate(validator.validate, orders)
+        print("{:<8} jsonschema.validate {:>9.0f} orders/s   "
+              "SchemaValidator {:>9.0f} orders/s   {:>5.1f}x".format(
+                  label, before, after, after / before))
+
+
+if __name__ == "__main__":
+    main()
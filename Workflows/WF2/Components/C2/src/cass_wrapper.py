@@ -10,10 +10,11 @@ import json
 from time import sleep
 
 import logging
-import jsonschema
 from cassandra.cluster import Cluster
 from flask import Flask, request, Response
 
+from validation import SchemaValidator
+
 __author__ = "Carla Vazquez"
 __version__ = "1.0.0"
 __maintainer__ = "Carla Vazquez"
@@ -69,22 +70,13 @@ workflows = dict()
 # Create Flask app
 app = Flask(__name__)
 
-# Open jsonschema for workflow-request
-with open("src/workflow-request.schema.json", "r") as workflow_schema:
-    workflow_schema = json.loads(workflow_schema.read())
+# Compile jsonschema for workflow-request
+workflow_validator = SchemaValidator("src/workflow-request.schema.json")
 
 
 # validate workflow-request against schema
 def verify_workflow(data):
-    global workflow_schema
-    valid = True
-    mess = None
-    try:
-        jsonschema.validate(instance=data, schema=workflow_schema)
-    except Exception as inst:
-        valid = False
-        mess = inst.args[0]
-    return valid, mess
+    return workflow_validator.validate(data)
 
 
 # get coords
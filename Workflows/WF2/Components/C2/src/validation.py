@@ -0,0 +1,73 @@
+"""Workflow-request validation for Cass_wrapper
+
+Cass_wrapper checks every workflow-request it receives against
+workflow-request.schema.json. jsonschema.validate would build a new validator
+and check the schema against its meta-schema on every request, so a
+SchemaValidator does both once, when the component starts. If fastjsonschema
+is installed, a request is first run through a generated validator, and the
+full jsonschema validator only runs on a request that fails it, to produce
+the usual error message.
+"""
+import json
+
+import jsonschema
+
+try:
+    import fastjsonschema
+except ImportError:
+    fastjsonschema = None
+
+__author__ = "Carla Vazquez"
+__version__ = "1.0.0"
+__maintainer__ = "Carla Vazquez"
+__email__ = "cpv150030@utdallas.edu"
+__status__ = "Development"
+
+
+def _formats(schema):
+    # every format named anywhere in the schema
+    found = set()
+    if isinstance(schema, dict):
+        if isinstance(schema.get("format"), str):
+            found.add(schema["format"])
+        for value in schema.values():
+            found |= _formats(value)
+    elif isinstance(schema, list):
+        for value in schema:
+            found |= _formats(value)
+    return found
+
+
+def _any_value(value):
+    return True
+
+
+class SchemaValidator(object):
+    """Validates data against the jsonschema stored at path"""
+
+    def __init__(self, path):
+        with open(path, "r") as schema_file:
+            self.schema = json.loads(schema_file.read())
+        validator_class = jsonschema.validators.validator_for(self.schema)
+        validator_class.check_schema(self.schema)
+        self._validator = validator_class(self.schema)
+        self._fast = None
+        if fastjsonschema is not None:
+            # jsonschema.validate never checked formats, so neither do we
+            formats = dict(
+                (name, _any_value) for name in _formats(self.schema))
+            self._fast = fastjsonschema.compile(self.schema, formats=formats)
+
+    def validate(self, data):
+        """Returns whether data is valid and, if not, the error message"""
+        if self._fast is not None:
+            try:
+                self._fast(data)
+                return True, None
+            except fastjsonschema.JsonSchemaException:
+                pass
+        error = jsonschema.exceptions.best_match(
+            self._validator.iter_errors(data))
+        if error is None:
+            return True, None
+        return False, error.message
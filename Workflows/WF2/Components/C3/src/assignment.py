@@ -0,0 +1,47 @@
+import asyncio
+import os
+
+__author__ = "Randeep Ahlawat"
+__version__ = "1.0.0"
+__maintainer__ = "Randeep Ahlawat"
+__email__ = "randeep.ahalwat@utdallas.edu"
+__status__ = "Development"
+
+'''Micro-batching of the orders the delivery assigner assigns entities to'''
+
+
+class MicroBatcher(object):
+    '''Collects the items submitted for a key over window seconds and hands
+       them to process(key, items) together, which returns one result per
+       item.'''
+
+    def __init__(self, process, window=0.2):
+        self.process = process
+        self.window = window
+        self._batches = {}
+
+    @classmethod
+    def from_env(cls, process):
+        return cls(process, float(os.environ.get("ASSIGNMENT_WINDOW", "0")))
+
+    async def submit(self, key, item):
+        '''Returns the result of item, once its batch is processed'''
+
+        if key not in self._batches:
+            self._batches[key] = []
+            asyncio.ensure_future(self._flush(key))
+        future = asyncio.get_event_loop().create_future()
+        self._batches[key].append((item, future))
+        return await future
+
+    async def _flush(self, key):
+        await asyncio.sleep(self.window)
+        batch = self._batches.pop(key)
+        try:
+            results = await self.process(key, [item for item, future in batch])
+        except Exception as inst:
+            for item, future in batch:
+                future.set_exception(inst)
+        else:
+            for (item, future), result in zip(batch, results):
+                future.set_result(result)
@@ -0,0 +1,104 @@
+"""Batch protocol between workflow components
+
+POST /orders/batch takes a list of pizza-orders, encoded the same way as the
+body of POST /order, and answers 200 with one result per order, in batch
+order. An order that made it through the component and the rest of the
+workflow comes back as {"status-code": N, "order": {...}}, with N being 200,
+or 208 and an "error" key in the order if a later component failed it, just
+like POST /order. An order the component itself rejected comes back as
+{"status-code": N, "text": "..."}. In a queued workflow, orders are
+acknowledged with {"status-code": 202, "order": {...}} instead, see
+src/order_queue.py.
+"""
+import asyncio
+import json
+
+__author__ = "Chris Scott"
+__version__ = "1.0.0"
+__maintainer__ = "Chris Scott"
+__email__ = "cms190009@utdallas.edu"
+__status__ = "Development"
+
+
+def parse_batch(body, ndjson=False):
+    """Returns the list of orders in the body of a batch request"""
+    if ndjson:
+        return [json.loads(line) for line in body.splitlines() if line.strip()]
+    orders = json.loads(body)
+    # orders may be double encoded, like the body of POST /order
+    if isinstance(orders, str):
+        orders = json.loads(orders)
+    if not isinstance(orders, list):
+        raise ValueError("expected a list of pizza-orders")
+    return orders
+
+
+def accepted(order):
+    return {"status-code": 200, "order": order}
+
+
+def rejected(status_code, text):
+    return {"status-code": status_code, "text": text}
+
+
+def order_result(order, status_code, text):
+    """The result of an order, given the next component's answer to it"""
+    if status_code in (200, 208):
+        return {"status-code": status_code, "order": json.loads(text)}
+    if status_code == 202:
+        # queued by the next component, which only acknowledges the orderId
+        return {"status-code": 202, "order": order}
+    order.update({"error": {"status-code": status_code, "text": text}})
+    return {"status-code": 208, "order": order}
+
+
+def split_by_store(orders, workflows, status_code=422,
+                   text="Workflow does not exist. Request Rejected."):
+    """Rejects orders of unknown stores, returns the results so far and the
+    indexes of the remaining orders by storeId"""
+    results = [None] * len(orders)
+    stores = dict()
+    for index, order in enumerate(orders):
+        if not (isinstance(order, dict) and
+                isinstance(order.get("pizza-order"), dict)):
+            results[index] = rejected(400, "Request rejected, not a pizza-order")
+            continue
+        store_id = order["pizza-order"].get("storeId")
+        if not isinstance(store_id, str) or store_id not in workflows:
+            results[index] = rejected(status_code, text)
+            continue
+        stores.setdefault(store_id, []).append(index)
+    return results, stores
+
+
+def merge_results(results, indexes, partial):
+    """Puts the results of the orders at indexes back into results"""
+    for index, result in zip(indexes, partial):
+        results[index] = result
+
+
+async def forward_batch(post, batch_url, order_url, orders):
+    """Sends orders to the next component and returns their results
+
+    post(url, data) sends data to url and returns the status code and text
+    of the response. If the next component has no batch endpoint, the orders
+    are sent to order_url one by one, concurrently.
+    """
+    if not orders:
+        return []
+
+    status_code, text = await post(batch_url, orders)
+
+    if status_code == 200:
+        return json.loads(text)["results"]
+
+    if status_code == 404:
+        responses = await asyncio.gather(*[
+            post(order_url, order) for order in orders
+        ])
+        return [
+            order_result(order, status_code, text)
+            for order, (status_code, text) in zip(orders, responses)
+        ]
+
+    return [order_result(order, status_code, text) for order in orders]
@@ -0,0 +1,60 @@
+"""Cassandra queries as asyncio futures
+
+session.execute blocks until its round trip is over, so statements run
+through run_sync one after the other cost the sum of their round trips.
+The driver's execute_async returns at once with a ResponseFuture, completed
+on the driver's event thread; execute bridges it to an asyncio future, so
+the statements of an order can be sent together and awaited in the time of
+the slowest one.
+"""
+import asyncio
+
+__author__ = "Chris Scott"
+__version__ = "1.0.0"
+__maintainer__ = "Chris Scott"
+__email__ = "cms190009@utdallas.edu"
+__status__ = "Development"
+
+
+def _set_result(future, rows):
+    if not future.done():
+        future.set_result(rows)
+
+
+def _set_exception(future, exc):
+    if not future.done():
+        future.set_exception(exc)
+
+
+def execute(session, query, parameters=None):
+    """Sends a query without waiting for it, and returns an asyncio future
+    of its rows"""
+    loop = asyncio.get_event_loop()
+    future = loop.create_future()
+
+    def done(rows):
+        loop.call_soon_threadsafe(_set_result, future, rows)
+
+    def failed(exc):
+        loop.call_soon_threadsafe(_set_exception, future, exc)
+
+    session.execute_async(query, parameters).add_callbacks(done, failed)
+    return future
+
+
+async def execute_all(session, statements, concurrency=100):
+    """Executes (query, parameters) statements concurrently, at most
+    concurrency at a time. Returns a (success, rows or exception) tuple per
+    statement, in order, like cassandra.concurrent.execute_concurrent with
+    raise_on_first_error=False"""
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def execute_one(query, parameters):
+        async with semaphore:
+            return await execute(session, query, parameters)
+
+    results = await asyncio.gather(
+        *[execute_one(query, parameters) for query, parameters in statements],
+        return_exceptions=True
+    )
+    return [(not isinstance(result, Exception), result) for result in results]
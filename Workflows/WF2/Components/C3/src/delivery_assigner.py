@@ -1,17 +1,29 @@
+import asyncio
 import os
 import logging
 import uuid
 import json
-import requests
 from datetime import datetime
 import time
 
 from cassandra.query import dict_factory
 from cassandra.cluster import Cluster
+from cassandra.concurrent import execute_concurrent_with_args
 from cassandra.policies import RoundRobinPolicy
 from quart import Quart, Response, request
-from quart.utils import run_sync
 
+from src.assignment import MicroBatcher
+from src.batch import (accepted, forward_batch, merge_results, parse_batch,
+                       rejected, split_by_store)
+from src.directions import GoogleDirections
+from src.fleet import Fleet
+from src.travel_cache import TravelTimeCache
+from src.http_client import ForwardingClient
+from src.order_queue import OrderQueue, is_queued
+from src.recipe import encode, ingredient_set, pizza_costs
+from src.reference_cache import ReferenceCache
+from src.routing import Router
+from src.spatial_index import EntityIndex
 from src.config import API_KEY
 
 __author__ = "Randeep Ahlawat"
@@ -31,15 +43,23 @@ logging.basicConfig(level=logging.INFO,
 
 logger = logging.getLogger(__name__)
 logging.getLogger('docker').setLevel(logging.INFO)
-logging.getLogger('requests').setLevel(logging.INFO)
+logging.getLogger('aiohttp').setLevel(logging.INFO)
 logging.getLogger('cassandra.cluster').setLevel(logging.ERROR)
 logging.getLogger('quart.app').setLevel(logging.WARNING)
 logging.getLogger('quart.serving').setLevel(logging.WARNING)
 
 workflows = {}
 
-#Google API URL
-URL = "https://maps.googleapis.com/maps/api/directions/json?origin={}, " + "{}&destination={},{}&key={}"
+#Pooled HTTP client for forwarding orders
+http_client = ForwardingClient.from_env()
+
+#Google Directions lookups, over the same pool, and the travel times
+#already looked up
+travel_cache = TravelTimeCache.from_env()
+directions = GoogleDirections.from_env(http_client.get, API_KEY, travel_cache)
+
+#Delivery times, from Google or the local routing engine
+router = Router.from_env(directions)
 
 #Connecting to Cassandra Cluster
     
@@ -60,6 +80,7 @@ while True:
         update_order_query = session.prepare("Update orderTable set deliveredBy=?, " + 
             "estimatedDeliveryTime=? where orderID=?")
         select_items_query = session.prepare('Select * from items where name=?')
+        select_all_items_query = session.prepare('Select * from items')
         insert_pizzas_query = session.prepare("Insert into pizzas " + 
             "(pizzaID, toppings, cost) values (?, ?, ?)")
         insert_customers_query = session.prepare("Insert into customers " +
@@ -86,53 +107,6 @@ while True:
 
 
 
-async def _convert_time_str(time):
-    time = time.split()        
-    if len(time) > 2:
-        mins = int(time[2])
-        hours = int(time[0])
-    else:
-        mins = int(time[0])
-        hours = 0
-    return hours * 60 + mins    
-
-async def _get_time(origin, destination):
-    url = URL.format(origin[0], origin[1], destination[0],
-        destination[1], API_KEY)  
-    def request_get():
-        return requests.get(url)
-    
-    response = await run_sync(request_get)()      
-    
-    content = json.loads(response.content.decode())            
-    if len(content['routes']) == 0:
-        return 0 
-    time = (content['routes'][0]['legs'][0]['duration']['text'])        
-    return await _convert_time_str(time)
-       
-
-async def _get_delivery_time(delivery_entities, customer, store):    
-    store = (store['latitude'], store['longitude'])    
-    delivery_entities = [(entity['name'], (entity['latitude'],
-        entity['longitude'])) for entity in delivery_entities]        
-    best_time = float('inf')
-    best_entity = None
-    for delivery_entity in delivery_entities:        
-        coordinates = delivery_entity[1]
-        name = delivery_entity[0]	
-        time = await _get_time(coordinates, store)                
-
-        if time < best_time:
-            best_time = time
-            best_entity = name 
-   	
-    store_to_cust = await _get_time(store, customer)
-     
-    time = store_to_cust + best_time
-
-    return time, best_entity
-    
-
 async def _get_entities(store_id):
     entities = []
     rows = session.execute(entity_query, (store_id,))
@@ -142,51 +116,53 @@ async def _get_entities(store_id):
     return entities
 
 
+#Available delivery entities of each store, by location. Only the
+#ROUTING_CANDIDATES entities closest to the store are routed.
+entity_index = EntityIndex.from_env(_get_entities)
+candidates = int(os.environ.get("ROUTING_CANDIDATES", "5"))
+
+
+#Delivery entities out on a delivery
+fleet = Fleet.from_env(session)
+
+
+async def _select_store_info(store_id):
+    return session.execute(store_info_query, (store_id,)).one()
+
+async def _select_item_price(name):
+    row = session.execute(select_items_query, (name,)).one()
+    return None if row is None else row['price']
+
+async def _select_item_prices():
+    return dict((row['name'], row['price']) for row in session.execute(select_all_items_query))
+
+#Store locations and item prices, read once and kept
+store_cache = ReferenceCache.from_env(_select_store_info)
+item_cache = ReferenceCache.from_env(_select_item_price, _select_item_prices)
+
+
 async def _get_store_info(store_id):    
-    row = session.execute(store_info_query, (store_id,)).one()
-    return row
+    return await store_cache.get(store_id)
 
 async def _update_order(order_id, entity, time):
     session.execute(update_order_query, (entity, time, order_id))
 
-async def _calc_pizza_cost(ingredient_set):
-    cost = 0.0
-    for ingredient in ingredient_set:
-        result = session.execute(select_items_query, (ingredient[0],))
-        for row in result:
-            cost += row['price'] * ingredient[1] 
-    return cost
+async def _dispatch(store_id, order):
+    placed_at = datetime.strptime(order['pizza-order']['orderDate'], '%Y-%m-%dT%H:%M:%S')
+    await fleet.dispatch(store_id, order['assignment']['deliveredBy'],
+        uuid.UUID(str(order['pizza-order']['orderId'])), placed_at,
+        order['assignment']['estimatedTime'])
 
 async def _insert_pizzas(pizza_list):
     pizza_uuid_set = set()
 
-    for pizza in pizza_list:
+    counts, _ = encode([pizza_list])
+    costs = pizza_costs(counts, await item_cache.all())
+
+    for row, cost in zip(counts, costs.tolist()):
         pizza_uuid = uuid.uuid4()
         pizza_uuid_set.add(pizza_uuid)
-        ingredient_set = set()
-
-        if pizza["crustType"] == "Thin":
-            ingredient_set.add(("Dough", 1))
-        elif pizza["crustType"] == "Traditional":
-            ingredient_set.add(("Dough", 2))
-
-        if pizza["sauceType"] == "Spicy":
-            ingredient_set.add(("SpicySauce", 1))
-        elif pizza["sauceType"] == "Traditional":
-            ingredient_set.add(("TraditionalSauce", 1))
-
-        if pizza["cheeseAmt"] == "Light":
-            ingredient_set.add(("Cheese", 1))
-        elif pizza["cheeseAmt"] == "Normal":
-            ingredient_set.add(("Cheese", 2))
-        elif pizza["cheeseAmt"] == "Extra":
-            ingredient_set.add(("Cheese", 3))
-
-        for topping in pizza["toppingList"]:
-            ingredient_set.add((topping, 1))
-         
-        cost = await _calc_pizza_cost(ingredient_set)
-        session.execute(insert_pizzas_query, (pizza_uuid, ingredient_set, cost))
+        session.execute(insert_pizzas_query, (pizza_uuid, ingredient_set(row), cost))
     
     return pizza_uuid_set
 
@@ -227,38 +203,183 @@ async def _get_next_component(store_id):
     return comp_list[next_comp_index]
 
 
-async def _get_component_url(component, store_id):
+async def _get_component_url(component, store_id, endpoint="order"):
     comp_name = component +\
         (str(workflows[store_id]["workflow-offset"]) if workflows[store_id]["method"] == "edge" else "")
     url = "http://" + comp_name + ":"
     if component == "order-verifier":
-        url += "1000/order"
+        url += "1000/"
     elif component == "stock-analyzer":
-        url += "4000/order"
+        url += "4000/"
     elif component == "restocker":
-        url += "5000/order"
+        url += "5000/"
     elif component == "order-processor":
-        url += "6000/order"
-    return url
+        url += "6000/"
+    return url + endpoint
 
 
 async def _send_order_to_next_component(url, order):
     cust_name = order["pizza-order"]["custName"]
     entity = order["assignment"]["deliveredBy"]
     eta = order["assignment"]["estimatedTime"]
-    def request_post():
-        return requests.post(url, json=json.dumps(order))
-    
-    response = await run_sync(request_post)()
+    status_code, text = await http_client.post(url, order)
     
-    if response.status_code == 200:
+    if status_code == 200:
         logging.info("{} assigned to order from {} with time of delivery {} seconds.\
             Order sent to next component.".format(entity, cust_name, eta))
     else:
         logging.info("{} assigned to order from {} with time of delivery {} seconds.\
             Issue sending order to next component:".format(entity, cust_name, eta))
-        logging.info(response.text)
-    return Response(status=response.status_code, response=response.text)
+        logging.info(text)
+    return Response(status=status_code, response=text)
+
+
+async def assign_entities(store_id, orders):
+    '''Assigns the best available delivery entity to each order of a batch
+       of one store, taking each entity out of the fleet until its delivery
+       is done. The store and its entities are read, and the entity to store
+       times fetched, once for the whole batch.
+
+           Parameters:
+               store_id(UUID): Store ID of workflow.
+               orders(list): Order dictionaries.
+           Returns:
+               results (list): None for each assigned order, or the result
+                   of the rejected order.
+    '''
+
+    if not orders:
+        return []
+
+    try:
+        store_info = await _get_store_info(store_id)
+    except:
+        return [rejected(409, "Store ID not found in Database!\n" +
+                         "Please request with valid store ID.")] * len(orders)
+    try:
+        store = (store_info['latitude'], store_info['longitude'])
+        # the candidates of a single order, and one more per other order
+        entities = await entity_index.nearest(store_id, store,
+            candidates + len(orders) - 1, fleet.busy(store_id))
+        if len(entities) == 0:
+            return [rejected(204, "No Avaiblabe delivery entities for storeID::" +
+                             str(store_id) + "\n" +
+                             "Please update delivery entities or " +
+                             "wait for entities to finish active deliveries!")] * len(orders)
+    except:
+        return [rejected(502, "Entities table in database corrupted!\n" +
+                         "Please recreate delivery entities table.")] * len(orders)
+
+    google_error = rejected(502, "Error in Google API!\n" + "Please contact admin.")
+    no_entity = rejected(204, "No Avaiblabe delivery entities for storeID::" +
+        str(store_id) + "\n" +
+        "Please update delivery entities or " +
+        "wait for entities to finish active deliveries!")
+
+    try:
+        ranked = await router.entity_times(entities, store, store_id)
+    except Exception as inst:
+        logger.info("Routing failed for store::{}: {!r}".format(store_id, inst))
+        return [google_error] * len(orders)
+
+    customers = [(order['pizza-order']['custLocation']['lat'],
+        order['pizza-order']['custLocation']['lon']) for order in orders]
+    times = await asyncio.gather(*[router.customer_time(store, customer, store_id)
+        for customer in customers], return_exceptions=True)
+
+    # every delivery goes through the store, so an order's delivery time is
+    # its entity's time to the store plus the store's time to the customer,
+    # and giving each order in turn the fastest entity left is as good as
+    # any other matching of the batch
+    names = [name for time, name in ranked]
+    entity_times = dict((name, time) for time, name in ranked)
+    results = []
+    for order, store_to_cust in zip(orders, times):
+        if isinstance(store_to_cust, Exception):
+            results.append(google_error)
+            continue
+        entity = await fleet.reserve(store_id, names)
+        if entity is None:
+            results.append(no_entity)
+            continue
+        order['assignment'] = {}
+        order['assignment']['deliveredBy'] = entity
+        order['assignment']['estimatedTime'] = store_to_cust + entity_times[entity]
+        await _dispatch(store_id, order)
+        results.append(None)
+
+    return results
+
+
+async def _process_store_batch(storeId, orders):
+    '''Creates, assigns and forwards the orders of one store.
+
+           Parameters:
+               storeId(string): Store ID of workflow.
+               orders(list): Order dictionaries of the store.
+           Returns:
+               results (list): Result of each order.
+    '''
+
+    results = [None] * len(orders)
+    created = []
+    for index, order in enumerate(orders):
+        try:
+            if 'orderId' not in order['pizza-order']:
+                order['pizza-order']['orderId'] = str(uuid.uuid4())
+                await _create_order(order['pizza-order'])
+        except Exception as inst:
+            results[index] = rejected(400, "Order could not be created!\n" + str(inst))
+        else:
+            created.append(index)
+
+    assigned = await assign_entities(uuid.UUID(storeId), [orders[i] for i in created])
+    merge_results(results, created, assigned)
+    forward = [index for index, result in enumerate(results) if result is None]
+
+    try:
+        execute_concurrent_with_args(session, update_order_query, [
+            (orders[index]['assignment']['deliveredBy'],
+                orders[index]['assignment']['estimatedTime'],
+                uuid.UUID(orders[index]['pizza-order']['orderId']))
+            for index in forward
+        ])
+    except:
+        pass
+
+    logger.info("{} of {} orders assigned for store::{}".format(
+        len(forward), len(orders), storeId))
+
+    component = await _get_next_component(storeId)
+    if component is None:
+        merge_results(results, forward, [accepted(orders[i]) for i in forward])
+        return results
+
+    forwarded = await forward_batch(
+        http_client.post,
+        await _get_component_url(component, storeId, "orders/batch"),
+        await _get_component_url(component, storeId),
+        [orders[index] for index in forward]
+    )
+    merge_results(results, forward, forwarded)
+    return results
+
+
+async def _get_status_url(store_id, order_id):
+    component = await _get_next_component(store_id)
+    if component is None:
+        return None
+    return await _get_component_url(component, store_id, "orders/" + order_id + "/status")
+
+
+#Queue of the orders of queued workflows
+order_queue = OrderQueue(os.environ.get("QUEUE_PATH", "data/order-queue.db"),
+    workflows, _process_store_batch, _get_status_url, http_client.get)
+
+
+#Orders of a store arriving within ASSIGNMENT_WINDOW seconds of each other
+#are assigned together
+batcher = MicroBatcher.from_env(assign_entities)
 
 
 async def assign_entity(store_id, order):
@@ -270,6 +391,15 @@ async def assign_entity(store_id, order):
            Returns:
                Response (object): Response object for POST Request.
     '''
+
+    if batcher.window > 0:
+        result = await batcher.submit(store_id, order)
+        if result is not None:
+            return Response(status=result['status-code'], response=result['text'])
+        return Response(
+            status=200,
+            response=json.dumps(order)
+        )
       
     try:
         store_info = await _get_store_info(store_id)
@@ -280,12 +410,14 @@ async def assign_entity(store_id, order):
                      "Please request with valid store ID."   
         )
     try:	
-        entities = await _get_entities(store_id)    
+        store = (store_info['latitude'], store_info['longitude'])
+        entities = await entity_index.nearest(store_id, store, candidates,
+            fleet.busy(store_id))
         if len(entities) == 0:
             return Response(
                 status=204,
                 response="No Avaiblabe delivery entities for storeID::" + 
-                         str(storeID) + "\n" +
+                         str(store_id) + "\n" +
                          "Please update delivery entities or " + 
                          "wait for entities to finish active deliveries!"            
             )
@@ -299,18 +431,29 @@ async def assign_entity(store_id, order):
     customer_info = (order['pizza-order']['custLocation']['lat'], order['pizza-order']['custLocation']['lon'])
    
     try:
-        time, entity = await _get_delivery_time(entities, customer_info, store_info)
-    except:
-    
+        ranked = await router.delivery_times(entities, customer_info, store, store_id)
+    except Exception as inst:
+        logger.info("Routing failed for store::{}: {!r}".format(store_id, inst))
         return Response(
             status=502,
             response="Error in Google API!\n" +
                      "Please contact admin."
             )
+
+    entity = await fleet.reserve(store_id, [name for time, name in ranked])
+    if entity is None:
+        return Response(
+            status=204,
+            response="No Avaiblabe delivery entities for storeID::" +
+                     str(store_id) + "\n" +
+                     "Please update delivery entities or " +
+                     "wait for entities to finish active deliveries!"
+        )
     
     order['assignment'] = {}
     order['assignment']['deliveredBy'] = entity
-    order['assignment']['estimatedTime'] = time
+    order['assignment']['estimatedTime'] = dict((name, time) for time, name in ranked)[entity]
+    await _dispatch(store_id, order)
         
     return Response(
         status=200,        
@@ -340,6 +483,20 @@ async def register_workflow(storeId):
     
     workflows[storeId] = data
 
+    #Read the store and the item prices in bulk, before the first order
+    try:
+        await store_cache.refresh(uuid.UUID(storeId))
+        await item_cache.load()
+    except Exception as inst:
+        logger.info("Could not load store::{} and item prices: {!r}".format(
+            storeId, inst))
+
+    try:
+        await fleet.release_stale(uuid.UUID(storeId))
+    except Exception as inst:
+        logger.info("Could not release stale deliveries of store::{}: {!r}".format(
+            storeId, inst))
+
     logger.info("Workflow request for store::{} accepted\n".format(storeId))
     return Response(
         status=201,
@@ -418,8 +575,15 @@ async def assign():
                      "create the workflow if it doesnt exist."
 	)
 
+    if is_queued(workflows[storeId]):
+        await order_queue.put(storeId, [order])
+        logger.info("Order {} queued.".format(order['orderId']))
+        return Response(
+            status=202,
+            response=json.dumps({"orderId": order['orderId'], "status": "queued"})
+        )
 
-    if 'orderId' not in order:
+    if 'orderId' not in order['pizza-order']:
        order['pizza-order']['orderId'] = str(uuid.uuid4())
        await _create_order(order['pizza-order'])
     else:
@@ -452,6 +616,73 @@ async def assign():
     return res
 
 
+@app.route('/orders/batch', methods=['POST'])
+async def assign_batch():
+    '''REST API for assigning best delivery entities to a batch of orders.'''
+
+    try:
+        orders = parse_batch(await request.get_data())
+    except ValueError as inst:
+        logger.info("Batch rejected, {}".format(inst))
+        return Response(
+            status=400,
+            response="Request rejected, batch is malformed:  " + str(inst)
+        )
+
+    logger.info("Request for assignment of delivery entities to {} orders".format(
+        len(orders)))
+
+    results, stores = split_by_store(orders, workflows, 404,
+        "Workflow ID does not seem to exist for delivery assigner!\n" +
+        "Please add delivery assigner to the Workflow or " +
+        "create the workflow if it doesnt exist.")
+    store_ids = list(stores)
+    store_results = await asyncio.gather(*[
+        order_queue.submit(workflows[store_id], store_id,
+            [orders[i] for i in stores[store_id]])
+        for store_id in store_ids
+    ])
+    for store_id, partial in zip(store_ids, store_results):
+        merge_results(results, stores[store_id], partial)
+
+    return Response(
+        status=200,
+        response=json.dumps({"results": results})
+    )
+
+
+@app.route('/orders/<orderId>/status', methods=['GET'])
+async def order_status(orderId):
+    '''REST API for the status of an order of a queued workflow.'''
+
+    status = await order_queue.lookup(orderId)
+    if status is None:
+        logger.info("Order {} was not queued by delivery assigner".format(orderId))
+        return Response(
+            status=404,
+            response="Order was not queued by delivery assigner!\n"
+        )
+    return Response(
+        status=200,
+        response=json.dumps(status)
+    )
+
+
+@app.before_serving
+async def startup():
+    await http_client.start()
+    order_queue.start()
+    fleet.wheel.start()
+
+
+@app.after_serving
+async def shutdown():
+    await fleet.wheel.stop()
+    await order_queue.stop()
+    await http_client.close()
+    travel_cache.save()
+
+
 @app.route("/workflow-update/<storeId>", methods=['PUT'])
 async def update_workflow(storeId):
     '''REST API for updating registered workflow'''
@@ -466,12 +697,33 @@ async def update_workflow(storeId):
         return Response(status=422, response="workflow-request rejected, cass is a required workflow component\n")
 
     workflows[storeId] = data
+    store_cache.invalidate(uuid.UUID(storeId))
+    item_cache.invalidate()
 
     logging.info("Workflow updated for {}\n".format(storeId))
 
     return Response(status=200, response="Delivery Assigner updated for {}\n".format(storeId))
 
 
+@app.route('/fleet', methods=['GET'])
+async def fleet_stats():
+    '''REST API for the entities on a delivery and the orders delivered
+       per hour of every store.'''
+    return Response(
+        status=200,
+        response=json.dumps(fleet.stats())
+    )
+
+
+@app.route('/travel-cache', methods=['GET'])
+async def travel_cache_stats():
+    '''REST API for the hit and miss counts of the travel time cache.'''
+    return Response(
+        status=200,
+        response=json.dumps(travel_cache.stats())
+    )
+
+
 @app.route('/health', methods=['GET'])
 async def health_check():
     '''REST API for checking health of task.'''
@@ -0,0 +1,105 @@
+import asyncio
+import functools
+import json
+import os
+
+__author__ = "Randeep Ahlawat"
+__version__ = "1.0.0"
+__maintainer__ = "Randeep Ahlawat"
+__email__ = "randeep.ahalwat@utdallas.edu"
+__status__ = "Development"
+
+'''Travel times from the Google Directions API for the delivery assigner'''
+
+#Google API URL
+URL = "https://maps.googleapis.com/maps/api/directions/json?origin={}, " + "{}&destination={},{}&key={}"
+
+
+class DirectionsError(Exception):
+    '''Raised when the Directions API does not answer a lookup'''
+
+
+def _convert_time_str(time):
+    time = time.split()
+    if len(time) > 2:
+        mins = int(time[2])
+        hours = int(time[0])
+    else:
+        mins = int(time[0])
+        hours = 0
+    return hours * 60 + mins
+
+
+class GoogleDirections(object):
+    '''Travel time provider looking up routes over the component's pooled
+       HTTP client. At most concurrency lookups of a store are in flight at
+       once. Travel times are kept in cache, a TravelTimeCache, if one is
+       given.'''
+
+    def __init__(self, get, api_key, url=URL, concurrency=10, cache=None):
+        self.get = get
+        self.api_key = api_key
+        self.url = url
+        self.concurrency = concurrency
+        self.cache = cache
+        self._limits = {}
+        self._pending = {}
+
+    @classmethod
+    def from_env(cls, get, api_key, cache=None):
+        return cls(
+            get,
+            api_key,
+            cache=cache,
+            url=os.environ.get("DIRECTIONS_URL", URL),
+            concurrency=int(os.environ.get("ROUTING_CONCURRENCY", "10"))
+        )
+
+    def _limit(self, store_id):
+        if store_id not in self._limits:
+            self._limits[store_id] = asyncio.Semaphore(self.concurrency)
+        return self._limits[store_id]
+
+    async def travel_time(self, origin, destination, store_id=None):
+        '''Returns the travel time from origin to destination in minutes.
+
+               Parameters:
+                   origin(tuple): Latitude and longitude.
+                   destination(tuple): Latitude and longitude.
+                   store_id: Store whose concurrency cap the lookup counts against.
+        '''
+
+        if self.cache is None:
+            return await self._fetch(origin, destination, store_id)
+
+        key = self.cache.key(origin, destination)
+        minutes = self.cache.get(key)
+        if minutes is not None:
+            return minutes
+        if key not in self._pending:
+            # a route asked for again while it is being looked up waits for
+            # that lookup instead of making its own
+            future = asyncio.ensure_future(self._fetch(origin, destination, store_id))
+            future.add_done_callback(functools.partial(self._fetched, key))
+            self._pending[key] = future
+        return await asyncio.shield(self._pending[key])
+
+    def _fetched(self, key, future):
+        del self._pending[key]
+        if not future.cancelled() and future.exception() is None:
+            self.cache.put(key, future.result())
+
+    async def _fetch(self, origin, destination, store_id):
+        url = self.url.format(origin[0], origin[1], destination[0],
+            destination[1], self.api_key)
+
+        async with self._limit(store_id):
+            status_code, text = await self.get(url)
+
+        if status_code != 200:
+            raise DirectionsError(text)
+        content = json.loads(text)
+        if len(content['routes']) == 0:
+            return 0
+        time = (content['routes'][0]['legs'][0]['duration']['text'])
+        return _convert_time_str(time)
@@ -0,0 +1,187 @@
+import asyncio
+import logging
+import os
+import time
+
+from src import cass_async
+
+__author__ = "Randeep Ahlawat"
+__version__ = "1.0.0"
+__maintainer__ = "Randeep Ahlawat"
+__email__ = "randeep.ahalwat@utdallas.edu"
+__status__ = "Development"
+
+'''Fleet state of the delivery assigner: which delivery entities are out on a
+delivery, and when they come back.'''
+
+logger = logging.getLogger(__name__)
+
+
+class TimerWheel(object):
+    '''Hashed timer wheel. A timer goes into the slot it expires in, and the
+       wheel advances one slot every tick seconds, firing the timers of the
+       slot that are due, so scheduling and expiring a timer take constant
+       time however many deliveries are out.'''
+
+    def __init__(self, tick=1.0, slots=512):
+        self.tick = tick
+        self._slots = [[] for _ in range(slots)]
+        self._position = 0
+        self._task = None
+
+    def __len__(self):
+        return sum(len(slot) for slot in self._slots)
+
+    def schedule(self, delay, callback, *args):
+        '''Calls callback(*args) once delay seconds have passed'''
+
+        ticks = max(1, int(-(-delay // self.tick)))
+        slot = (self._position + ticks) % len(self._slots)
+        # full turns of the wheel to wait before the timer is due
+        rounds = (ticks - 1) // len(self._slots)
+        self._slots[slot].append([rounds, callback, args])
+
+    def advance(self):
+        self._position = (self._position + 1) % len(self._slots)
+        due = []
+        waiting = []
+        for timer in self._slots[self._position]:
+            if timer[0] == 0:
+                due.append(timer)
+            else:
+                timer[0] -= 1
+                waiting.append(timer)
+        self._slots[self._position] = waiting
+        for rounds, callback, args in due:
+            try:
+                callback(*args)
+            except Exception as inst:
+                logger.info("Timer {} failed: {!r}".format(callback, inst))
+
+    async def _run(self):
+        loop = asyncio.get_event_loop()
+        next_tick = loop.time()
+        while True:
+            next_tick += self.tick
+            await asyncio.sleep(max(0, next_tick - loop.time()))
+            self.advance()
+
+    def start(self):
+        self._task = asyncio.ensure_future(self._run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+
+
+class Fleet(object):
+    '''Reserves delivery entities for orders with a lightweight transaction
+       on deliveryEntitiesByStore, so an entity is only ever out on one
+       delivery, and releases them once the estimated delivery time has
+       passed. An estimated minute lasts scale seconds. Every query goes
+       through execute_async, so a Paxos round trip never blocks the loop.'''
+
+    def __init__(self, session, wheel, scale=60.0):
+        self.session = session
+        self.wheel = wheel
+        self.scale = scale
+        self._busy = {}
+        self._stats = {}
+        self.reserve_query = session.prepare("Update deliveryEntitiesByStore " +
+            "set onDelivery=True, status='DELIVERING' where storeID=? and name=? " +
+            "if onDelivery=False")
+        self.release_query = session.prepare("Update deliveryEntitiesByStore " +
+            "set onDelivery=False, status='AVAILABLE' where storeID=? and name=? " +
+            "if onDelivery=True")
+        self.on_delivery_query = session.prepare("Select name from " +
+            "deliveryEntitiesByStore where storeID=? and onDelivery=True ALLOW FILTERING")
+        self.insert_order_by_entity_query = session.prepare("Insert into " +
+            "orderByDeliveryEntity (deliveredBy, placedAt, orderID) values (?, ?, ?)")
+
+    @classmethod
+    def from_env(cls, session):
+        wheel = TimerWheel(float(os.environ.get("FLEET_TICK", "1")))
+        return cls(session, wheel, float(os.environ.get("FLEET_TIME_SCALE", "60")))
+
+    def busy(self, store_id):
+        '''Names of the store's entities out on a delivery'''
+
+        return self._busy.setdefault(store_id, set())
+
+    def _store_stats(self, store_id):
+        if store_id not in self._stats:
+            self._stats[store_id] = {"since": time.time(), "assigned": 0, "delivered": 0}
+        return self._stats[store_id]
+
+    async def reserve(self, store_id, names):
+        '''Reserves the first entity of names that is still available and
+           returns its name, or None if they are all out.'''
+
+        busy = self.busy(store_id)
+        for name in names:
+            if name in busy:
+                continue
+            rows = await cass_async.execute(self.session, self.reserve_query, (store_id, name))
+            # the row of a lightweight transaction says whether it was applied
+            if rows[0]['[applied]']:
+                busy.add(name)
+                return name
+            # reserved elsewhere since the entities were read
+            logger.info("{} of store::{} is already on a delivery".format(name, store_id))
+        return None
+
+    async def dispatch(self, store_id, name, order_id, placed_at, minutes):
+        '''Records the delivery of an order by a reserved entity and releases
+           the entity once it is done.'''
+
+        self.wheel.schedule(minutes * self.scale, self._release_delivered, store_id, name)
+        self._store_stats(store_id)["assigned"] += 1
+        await cass_async.execute(self.session, self.insert_order_by_entity_query,
+            (name, placed_at, order_id))
+
+    def _release_delivered(self, store_id, name):
+        #the timer wheel calls back synchronously, release in the background
+        asyncio.ensure_future(self._release_logged(store_id, name))
+
+    async def _release_logged(self, store_id, name):
+        try:
+            await self.release(store_id, name)
+        except Exception as inst:
+            logger.info("Could not release {} of store::{}: {!r}".format(name, store_id, inst))
+
+    async def release(self, store_id, name, delivered=True):
+        try:
+            await cass_async.execute(self.session, self.release_query, (store_id, name))
+        finally:
+            self.busy(store_id).discard(name)
+        if delivered:
+            self._store_stats(store_id)["delivered"] += 1
+        logger.info("{} of store::{} is available".format(name, store_id))
+
+    async def release_stale(self, store_id):
+        '''Releases the store's entities marked as on a delivery that this
+           component is not timing, left over from before a restart.'''
+
+        busy = self.busy(store_id)
+        rows = await cass_async.execute(self.session, self.on_delivery_query, (store_id,))
+        await asyncio.gather(*[self.release(store_id, row['name'], delivered=False)
+            for row in rows if row['name'] not in busy])
+
+    def stats(self):
+        '''Entities out, orders assigned and delivered, and orders delivered
+           per hour, of every store'''
+
+        stats = {}
+        for store_id, store_stats in self._stats.items():
+            hours = max(time.time() - store_stats["since"], 1.0) / 3600
+            stats[str(store_id)] = {
+                "on-delivery": len(self.busy(store_id)),
+                "assigned": store_stats["assigned"],
+                "delivered": store_stats["delivered"],
+                "delivered-per-hour": store_stats["delivered"] / hours
+            }
+        return stats
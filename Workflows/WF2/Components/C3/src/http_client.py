@@ -0,0 +1,111 @@
+"""Pooled HTTP client for forwarding orders between components
+
+requests.post opens a new connection for every order and blocks a thread
+while the next component works on it. A ForwardingClient keeps one aiohttp
+session for the whole component, so every downstream service gets its own
+pool of keep-alive connections that are reused from order to order.
+
+Configured from the environment:
+
+HTTP_TIMEOUT            seconds a request may take in total (default 60)
+HTTP_CONNECT_TIMEOUT    seconds to wait for a connection (default 5)
+HTTP_RETRIES            extra attempts after a connection failure (default 2)
+HTTP_POOL_SIZE          connections kept per downstream service (default 100)
+HTTP_KEEPALIVE          seconds an idle connection is kept open (default 4)
+
+Only failures that happen before the next component could have read the
+request are retried, so an order is never processed twice because of a
+retry. A connection the next component drops may have carried a request it
+already processed, so only a GET is retried after one. Idle connections
+are kept for less than the 5 seconds the components' server keeps them, so
+this side closes them first and an order is not sent on a connection the
+server is closing.
+"""
+import asyncio
+import json
+import logging
+import os
+
+import aiohttp
+
+__author__ = "Chris Scott"
+__version__ = "1.0.0"
+__maintainer__ = "Chris Scott"
+__email__ = "cms190009@utdallas.edu"
+__status__ = "Development"
+
+# the connection could not be opened, so the request was never sent
+RETRY_ERRORS = (aiohttp.ClientConnectorError,)
+# a GET changes nothing, so it is also retried after a dropped connection
+RETRY_GET_ERRORS = RETRY_ERRORS + (aiohttp.ServerDisconnectedError,)
+
+
+class ForwardingClient(object):
+    """Sends orders to other components over pooled connections"""
+
+    def __init__(self, timeout=60.0, connect_timeout=5.0, retries=2,
+                 pool_size=100, keepalive=4.0, backoff=0.1):
+        self.timeout = aiohttp.ClientTimeout(
+            total=timeout, connect=connect_timeout)
+        self.retries = retries
+        self.pool_size = pool_size
+        self.keepalive = keepalive
+        self.backoff = backoff
+        self._session = None
+
+    @classmethod
+    def from_env(cls):
+        return cls(
+            timeout=float(os.environ.get("HTTP_TIMEOUT", "60")),
+            connect_timeout=float(os.environ.get("HTTP_CONNECT_TIMEOUT", "5")),
+            retries=int(os.environ.get("HTTP_RETRIES", "2")),
+            pool_size=int(os.environ.get("HTTP_POOL_SIZE", "100")),
+            keepalive=float(os.environ.get("HTTP_KEEPALIVE", "4"))
+        )
+
+    async def start(self):
+        connector = aiohttp.TCPConnector(
+            limit=0,
+            limit_per_host=self.pool_size,
+            keepalive_timeout=self.keepalive,
+            ttl_dns_cache=300
+        )
+        self._session = aiohttp.ClientSession(
+            connector=connector, timeout=self.timeout)
+
+    async def close(self):
+        if self._session is not None:
+            await self._session.close()
+            self._session = None
+
+    async def request(self, method, url, **kwargs):
+        """Returns the status code and text of the response"""
+        retry_errors = RETRY_GET_ERRORS if method == "GET" else RETRY_ERRORS
+        attempt = 0
+        while True:
+            try:
+                async with self._session.request(
+                        method, url, **kwargs) as response:
+                    return response.status, await response.text()
+            except retry_errors as ex:
+                if attempt >= self.retries:
+                    raise
+                attempt += 1
+                logging.info("Retrying " + method + " " + url + " after: " +
+                             str(ex))
+                await asyncio.sleep(self.backoff * 2 ** (attempt - 1))
+
+    async def post(self, url, data):
+        """Sends an order, or a list of orders, the way POST /order expects"""
+        try:
+            return await self.request("POST", url, json=json.dumps(data))
+        except (aiohttp.ClientError, asyncio.TimeoutError) as ex:
+            # answer like a failing component, so callers report the order
+            # with the usual error semantics
+            return 503, "Could not reach " + url + ": " + repr(ex)
+
+    async def get(self, url):
+        try:
+            return await self.request("GET", url)
+        except (aiohttp.ClientError, asyncio.TimeoutError) as ex:
+            return 503, "Could not reach " + url + ": " + repr(ex)
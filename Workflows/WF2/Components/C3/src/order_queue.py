@@ -0,0 +1,254 @@
+"""Durable order queue for queued workflows
+
+In a workflow whose pipeline-mode is "queued", a component does not hold the
+request open while the order goes through the rest of the workflow. It writes
+the order to a local SQLite log, answers 202 with the order's orderId, and a
+consumer loop later takes the orders off the log, processes them as a batch
+per store and forwards them to the next component, which queues them in turn.
+
+Orders only leave the log once they have been processed, so orders accepted
+before a restart are picked up again when the component comes back. A batch
+that cannot be processed is tried again a few times, after which its orders
+are marked failed and leave the log, so they do not hold up the orders queued
+behind them. SQLite blocks, so the log is read and written in the loop's
+executor.
+
+Every component keeps the status of the orders it queued. An order it has
+forwarded is looked up at the next component, so asking the first component
+of a workflow for an order's status follows the order through the workflow.
+"""
+import asyncio
+import json
+import logging
+import os
+import sqlite3
+import threading
+import uuid
+from time import time
+
+__author__ = "Chris Scott"
+__version__ = "1.0.0"
+__maintainer__ = "Chris Scott"
+__email__ = "cms190009@utdallas.edu"
+__status__ = "Development"
+
+
+def is_queued(workflow):
+    return workflow.get("pipeline-mode", "synchronous") == "queued"
+
+
+class OrderQueue(object):
+    """Orders waiting to be processed, and the status of every queued order
+
+    workflows is the component's workflows dict. process(store_id, orders)
+    processes and forwards a batch of orders of one store and returns their
+    results, as described in src/batch.py.
+    status_url(store_id, order_id) returns the status URL of the order at
+    the next component of the store's workflow, or None if there is none,
+    and get(url) fetches it, returning the status code and text.
+    A batch is tried max_attempts times, retry_delay seconds apart.
+    """
+
+    def __init__(self, path, workflows, process, status_url, get,
+                 batch_size=50, max_attempts=5, retry_delay=5):
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._db = sqlite3.connect(
+            path, isolation_level=None, check_same_thread=False)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("PRAGMA synchronous=FULL")
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS queue (seq INTEGER PRIMARY KEY "
+            "AUTOINCREMENT, storeId TEXT NOT NULL, data TEXT NOT NULL, "
+            "attempts INTEGER NOT NULL DEFAULT 0)"
+        )
+        columns = [row[1] for row in
+                   self._db.execute("PRAGMA table_info(queue)").fetchall()]
+        if "attempts" not in columns:
+            # a log written before the attempts were counted
+            self._db.execute("ALTER TABLE queue ADD COLUMN "
+                             "attempts INTEGER NOT NULL DEFAULT 0")
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS status "
+            "(orderId TEXT PRIMARY KEY, data TEXT NOT NULL)"
+        )
+        self.workflows = workflows
+        self.process = process
+        self.status_url = status_url
+        self.get = get
+        self.batch_size = batch_size
+        self.max_attempts = max_attempts
+        self.retry_delay = retry_delay
+        # the executor threads share the connection, one at a time
+        self._lock = threading.Lock()
+        self._wake = None
+        self._task = None
+
+    async def _run_blocking(self, func, *args):
+        return await asyncio.get_event_loop().run_in_executor(None, func, *args)
+
+    def _insert(self, store_id, orders):
+        with self._lock, self._db:
+            self._db.execute("BEGIN IMMEDIATE")
+            for order in orders:
+                self._db.execute(
+                    "INSERT INTO queue (storeId, data) VALUES (?, ?)",
+                    (store_id, json.dumps(order))
+                )
+                self._set_status(order["orderId"], {"status": "queued"})
+
+    async def put(self, store_id, orders):
+        """Queues the orders of a store, giving each an orderId"""
+        for order in orders:
+            order.setdefault("orderId", str(uuid.uuid4()))
+        await self._run_blocking(self._insert, store_id, orders)
+        if self._wake is not None:
+            self._wake.set()
+
+    async def submit(self, workflow, store_id, orders):
+        """Processes the orders of a store and returns their results, or
+        queues them if the store's workflow is queued"""
+        if not is_queued(workflow):
+            return await self.process(store_id, orders)
+        await self.put(store_id, orders)
+        return [{"status-code": 202, "order": order} for order in orders]
+
+    def _set_status(self, order_id, status):
+        status["updated"] = time()
+        self._db.execute(
+            "INSERT OR REPLACE INTO status VALUES (?, ?)",
+            (order_id, json.dumps(status))
+        )
+
+    def _read_status(self, order_id):
+        with self._lock:
+            row = self._db.execute(
+                "SELECT data FROM status WHERE orderId=?",
+                (order_id,)).fetchone()
+        return None if row is None else json.loads(row[0])
+
+    async def status(self, order_id):
+        return await self._run_blocking(self._read_status, order_id)
+
+    async def lookup(self, order_id):
+        """Returns the status of order_id, following it to the component it
+        was forwarded to, or None if it was never queued here"""
+        status = await self.status(order_id)
+        if status is None or status["status"] != "forwarded":
+            return status
+
+        status_code, text = await self.get(status["next"])
+        if status_code != 200:
+            logging.info("Order " + order_id + " status lookup failed: " +
+                         text)
+            return status
+        return json.loads(text)
+
+    def start(self):
+        self._wake = asyncio.Event()
+        self._task = asyncio.ensure_future(self._consume())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+
+    def _read_batch(self):
+        with self._lock:
+            return self._db.execute(
+                "SELECT seq, storeId, data FROM queue ORDER BY seq LIMIT ?",
+                (self.batch_size,)
+            ).fetchall()
+
+    def _finish(self, entries, statuses):
+        with self._lock, self._db:
+            self._db.execute("BEGIN IMMEDIATE")
+            for (seq, order), status in zip(entries, statuses):
+                self._set_status(order["orderId"], status)
+                self._db.execute("DELETE FROM queue WHERE seq=?", (seq,))
+
+    def _fail(self, entries, error):
+        """Counts a failed attempt at the orders of entries, and marks the
+        ones out of attempts failed. Returns how many are left to retry."""
+        retry = 0
+        with self._lock, self._db:
+            self._db.execute("BEGIN IMMEDIATE")
+            for seq, order in entries:
+                self._db.execute(
+                    "UPDATE queue SET attempts=attempts+1 WHERE seq=?", (seq,))
+                attempts = self._db.execute(
+                    "SELECT attempts FROM queue WHERE seq=?",
+                    (seq,)).fetchone()[0]
+                if attempts < self.max_attempts:
+                    retry += 1
+                    continue
+                self._set_status(order["orderId"], {
+                    "status": "failed",
+                    "attempts": attempts,
+                    "error": {"status-code": 500, "text": error}
+                })
+                self._db.execute("DELETE FROM queue WHERE seq=?", (seq,))
+        return retry
+
+    async def _consume(self):
+        while True:
+            self._wake.clear()
+            rows = await self._run_blocking(self._read_batch)
+            if not rows:
+                await self._wake.wait()
+                continue
+            stores = dict()
+            for seq, store_id, data in rows:
+                stores.setdefault(store_id, []).append((seq, json.loads(data)))
+            for store_id, entries in stores.items():
+                try:
+                    await self._process_store(store_id, entries)
+                except asyncio.CancelledError:
+                    raise
+                except Exception as ex:
+                    logging.info("Store " + store_id + ": queued orders "
+                                 "could not be processed: " + str(ex))
+                    # leave the orders on the log and try again later, unless
+                    # they are out of attempts
+                    if await self._run_blocking(self._fail, entries, str(ex)):
+                        await asyncio.sleep(self.retry_delay)
+
+    async def _process_store(self, store_id, entries):
+        orders = [order for seq, order in entries]
+        if store_id in self.workflows:
+            results = await self.process(store_id, orders)
+        else:
+            # torn down while its orders were waiting
+            results = [{
+                "status-code": 422,
+                "text": "Workflow does not exist. Request Rejected."
+            }] * len(orders)
+        statuses = []
+        for order, result in zip(orders, results):
+            statuses.append(
+                await self._result_status(store_id, order["orderId"], result))
+        await self._run_blocking(self._finish, entries, statuses)
+        logging.info("Store " + store_id + ": " + str(len(orders)) +
+                     " queued orders processed.")
+
+    async def _result_status(self, store_id, order_id, result):
+        if result["status-code"] == 202:
+            return {
+                "status": "forwarded",
+                "next": await self.status_url(store_id, order_id)
+            }
+        if result["status-code"] == 200:
+            return {"status": "completed", "order": result["order"]}
+        if "order" in result:
+            return {"status": "failed", "order": result["order"]}
+        return {
+            "status": "failed",
+            "error": {
+                "status-code": result["status-code"],
+                "text": result["text"]
+            }
+        }
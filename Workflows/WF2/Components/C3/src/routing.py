@@ -0,0 +1,148 @@
+import asyncio
+import logging
+import math
+import os
+
+__author__ = "Randeep Ahlawat"
+__version__ = "1.0.0"
+__maintainer__ = "Randeep Ahlawat"
+__email__ = "randeep.ahalwat@utdallas.edu"
+__status__ = "Development"
+
+'''Travel time providers and delivery time estimation for the delivery assigner.
+
+A provider is any object with a coroutine
+travel_time(origin, destination, store_id=None) returning the minutes it
+takes to get from origin to destination, both (latitude, longitude) tuples.
+GoogleDirections in src/directions.py is the remote provider, LocalRouter
+needs no network, and FallbackRouter answers from a second provider when the
+first misses its latency budget or fails.
+'''
+
+logger = logging.getLogger(__name__)
+
+#Mean radius of the earth in km
+EARTH_RADIUS = 6371.0088
+
+
+def haversine(origin, destination):
+    '''Returns the great circle distance between two locations in km'''
+
+    lat1, lon1 = math.radians(origin[0]), math.radians(origin[1])
+    lat2, lon2 = math.radians(destination[0]), math.radians(destination[1])
+    a = (math.sin((lat2 - lat1) / 2) ** 2 +
+         math.cos(lat1) * math.cos(lat2) * math.sin((lon2 - lon1) / 2) ** 2)
+    return 2 * EARTH_RADIUS * math.asin(math.sqrt(a))
+
+
+class LocalRouter(object):
+    '''Estimates travel times from the great circle distance, stretched by
+       detour to account for the road network, at an average speed of
+       speed km/h.'''
+
+    def __init__(self, speed=30.0, detour=1.3):
+        self.speed = speed
+        self.detour = detour
+
+    @classmethod
+    def from_env(cls):
+        return cls(
+            speed=float(os.environ.get("LOCAL_ROUTING_SPEED", "30")),
+            detour=float(os.environ.get("LOCAL_ROUTING_DETOUR", "1.3"))
+        )
+
+    async def travel_time(self, origin, destination, store_id=None):
+        distance = haversine(origin, destination) * self.detour
+        return int(round(distance / self.speed * 60))
+
+
+class FallbackRouter(object):
+    '''Asks primary, and answers from fallback if primary takes longer than
+       budget seconds or fails.'''
+
+    def __init__(self, primary, fallback, budget=2.0):
+        self.primary = primary
+        self.fallback = fallback
+        self.budget = budget
+        self.fallbacks = 0
+
+    async def travel_time(self, origin, destination, store_id=None):
+        try:
+            return await asyncio.wait_for(
+                self.primary.travel_time(origin, destination, store_id), self.budget)
+        except Exception as inst:
+            self.fallbacks += 1
+            logger.info("Travel time from {} to {} estimated locally: {!r}".format(
+                origin, destination, inst))
+        return await self.fallback.travel_time(origin, destination, store_id)
+
+
+class Router(object):
+    '''Finds delivery times with a provider. All the lookups of an order are
+       made at once and must finish within deadline seconds.'''
+
+    def __init__(self, provider, deadline=10.0):
+        self.provider = provider
+        self.deadline = deadline
+
+    @classmethod
+    def from_env(cls, remote):
+        '''Serves travel times from remote, the local engine, or remote with
+           the local engine as fallback, as ROUTING_PROVIDER says.'''
+
+        name = os.environ.get("ROUTING_PROVIDER", "fallback")
+        if name == "google":
+            provider = remote
+        elif name == "local":
+            provider = LocalRouter.from_env()
+        elif name == "fallback":
+            provider = FallbackRouter(remote, LocalRouter.from_env(),
+                float(os.environ.get("ROUTING_BUDGET", "2")))
+        else:
+            raise ValueError("Unknown ROUTING_PROVIDER " + name)
+        return cls(provider, float(os.environ.get("ROUTING_DEADLINE", "10")))
+
+    async def _lookup(self, origins, destinations, store_id):
+        return await asyncio.wait_for(asyncio.gather(*[
+            self.provider.travel_time(origin, destination, store_id)
+            for origin, destination in zip(origins, destinations)
+        ]), self.deadline)
+
+    async def entity_times(self, delivery_entities, store, store_id=None):
+        '''Returns the time to the store and the name of every delivery
+           entity, closest first, looking up every entity at once.'''
+
+        times = await self._lookup(
+            [(entity['latitude'], entity['longitude']) for entity in delivery_entities],
+            [store] * len(delivery_entities), store_id)
+        return sorted(zip(times, [entity['name'] for entity in delivery_entities]))
+
+    async def best_entity(self, delivery_entities, store, store_id=None):
+        '''Returns the time to the store of the closest delivery entity and
+           its name.'''
+
+        ranked = await self.entity_times(delivery_entities, store, store_id)
+        return ranked[0] if ranked else (float('inf'), None)
+
+    async def customer_time(self, store, customer, store_id=None):
+        '''Returns the time from the store to the customer.'''
+
+        return (await self._lookup([store], [customer], store_id))[0]
+
+    async def delivery_times(self, delivery_entities, customer, store, store_id=None):
+        '''Returns the time it takes every delivery entity to get to the
+           store and on to the customer, and its name, best first. The entity
+           to store and store to customer lookups are made concurrently.'''
+
+        times = await self._lookup(
+            [(entity['latitude'], entity['longitude']) for entity in delivery_entities] + [store],
+            [store] * len(delivery_entities) + [customer], store_id)
+        return sorted((time + times[-1], entity['name'])
+            for entity, time in zip(delivery_entities, times[:-1]))
+
+    async def delivery_time(self, delivery_entities, customer, store, store_id=None):
+        '''Returns the time it takes the best delivery entity to get to the
+           store and on to the customer, and the entity's name.'''
+
+        ranked = await self.delivery_times(delivery_entities, customer, store, store_id)
+        return ranked[0] if ranked else (float('inf'), None)
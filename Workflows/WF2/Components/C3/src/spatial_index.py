@@ -0,0 +1,117 @@
+import heapq
+import math
+import os
+import time
+
+__author__ = "Randeep Ahlawat"
+__version__ = "1.0.0"
+__maintainer__ = "Randeep Ahlawat"
+__email__ = "randeep.ahalwat@utdallas.edu"
+__status__ = "Development"
+
+'''In-memory spatial index of the available delivery entities of each store'''
+
+#km per degree of latitude, and of longitude at the equator
+KM_PER_LAT = 110.574
+KM_PER_LON = 111.320
+
+
+class KDTree(object):
+    '''2-d tree over (latitude, longitude) points. Points are projected to
+       km around the mean latitude, which keeps straight-line distances
+       accurate at the scale of a store's delivery area.'''
+
+    def __init__(self, points, items):
+        self.items = items
+        if points:
+            lat0 = sum(point[0] for point in points) / len(points)
+        else:
+            lat0 = 0.0
+        self._lon_scale = KM_PER_LON * math.cos(math.radians(lat0))
+        projected = [self._project(point) for point in points]
+        self._root = self._build(list(range(len(points))), projected, 0)
+
+    def _project(self, point):
+        return (point[0] * KM_PER_LAT, point[1] * self._lon_scale)
+
+    def _build(self, indexes, projected, depth):
+        if not indexes:
+            return None
+        axis = depth % 2
+        indexes.sort(key=lambda index: projected[index][axis])
+        median = len(indexes) // 2
+        return (
+            projected[indexes[median]],
+            indexes[median],
+            axis,
+            self._build(indexes[:median], projected, depth + 1),
+            self._build(indexes[median + 1:], projected, depth + 1)
+        )
+
+    def __len__(self):
+        return len(self.items)
+
+    def nearest(self, point, k):
+        '''Returns the k items closest to point, closest first'''
+
+        target = self._project(point)
+        # max-heap of the k best so far, as (-distance, index)
+        best = []
+
+        def search(node):
+            if node is None:
+                return
+            location, index, axis, left, right = node
+            distance = ((location[0] - target[0]) ** 2 +
+                        (location[1] - target[1]) ** 2)
+            if len(best) < k:
+                heapq.heappush(best, (-distance, index))
+            elif distance < -best[0][0]:
+                heapq.heapreplace(best, (-distance, index))
+            difference = target[axis] - location[axis]
+            near, far = (left, right) if difference < 0 else (right, left)
+            search(near)
+            if len(best) < k or difference ** 2 < -best[0][0]:
+                search(far)
+
+        if k > 0:
+            search(self._root)
+        return [self.items[index] for _, index in sorted(best, reverse=True)]
+
+
+class EntityIndex(object):
+    '''KD-trees of the available delivery entities of every store, rebuilt
+       from load(store_id) once they are older than ttl seconds.'''
+
+    def __init__(self, load, ttl=5.0):
+        self.load = load
+        self.ttl = ttl
+        self._trees = {}
+
+    @classmethod
+    def from_env(cls, load):
+        return cls(load, float(os.environ.get("ENTITY_INDEX_TTL", "5")))
+
+    async def refresh(self, store_id):
+        entities = await self.load(store_id)
+        tree = KDTree([(entity['latitude'], entity['longitude']) for entity in entities],
+            entities)
+        self._trees[store_id] = (time.monotonic() + self.ttl, tree)
+        return tree
+
+    def invalidate(self, store_id):
+        self._trees.pop(store_id, None)
+
+    async def nearest(self, store_id, point, k, exclude=()):
+        '''Returns the k available entities of the store closest to point,
+           leaving out the entities named in exclude'''
+
+        entry = self._trees.get(store_id)
+        if entry is None or entry[0] < time.monotonic():
+            tree = await self.refresh(store_id)
+        else:
+            tree = entry[1]
+        if not exclude:
+            return tree.nearest(point, k)
+        entities = tree.nearest(point, k + len(exclude))
+        return [entity for entity in entities if entity['name'] not in exclude][:k]
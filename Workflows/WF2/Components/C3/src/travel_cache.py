@@ -0,0 +1,136 @@
+import json
+import os
+import time
+from collections import OrderedDict
+
+__author__ = "Randeep Ahlawat"
+__version__ = "1.0.0"
+__maintainer__ = "Randeep Ahlawat"
+__email__ = "randeep.ahalwat@utdallas.edu"
+__status__ = "Development"
+
+'''Cache of travel times between geohash cells for the delivery assigner'''
+
+_BASE32 = "0123456789bcdefghjkmnpqrstuvwxyz"
+
+
+def geohash(latitude, longitude, precision=7):
+    '''Returns the geohash of a location. At precision 7 a cell is about
+       150m on a side, at precision 6 about 1.2km by 0.6km.'''
+
+    lat_range = [-90.0, 90.0]
+    lon_range = [-180.0, 180.0]
+    cell = []
+    bits = 0
+    bit = 0
+    even = True
+    while len(cell) < precision:
+        if even:
+            mid = (lon_range[0] + lon_range[1]) / 2
+            if longitude >= mid:
+                bits = bits * 2 + 1
+                lon_range[0] = mid
+            else:
+                bits = bits * 2
+                lon_range[1] = mid
+        else:
+            mid = (lat_range[0] + lat_range[1]) / 2
+            if latitude >= mid:
+                bits = bits * 2 + 1
+                lat_range[0] = mid
+            else:
+                bits = bits * 2
+                lat_range[1] = mid
+        even = not even
+        bit += 1
+        if bit == 5:
+            cell.append(_BASE32[bits])
+            bits = 0
+            bit = 0
+    return "".join(cell)
+
+
+class TravelTimeCache(object):
+    '''Travel times keyed by the geohash cells of origin and destination.
+       Entries expire ttl seconds after they were fetched, and the least
+       recently used entry is dropped once capacity is reached. If path is
+       given, the cache is loaded from it on creation and written back by
+       save(), so a restarted component starts warm.'''
+
+    def __init__(self, capacity=10000, ttl=3600.0, precision=7, path=None):
+        self.capacity = capacity
+        self.ttl = ttl
+        self.precision = precision
+        self.path = path
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+        if path is not None and os.path.exists(path):
+            self.load()
+
+    @classmethod
+    def from_env(cls):
+        return cls(
+            capacity=int(os.environ.get("TRAVEL_CACHE_SIZE", "10000")),
+            ttl=float(os.environ.get("TRAVEL_CACHE_TTL", "3600")),
+            precision=int(os.environ.get("TRAVEL_CACHE_PRECISION", "7")),
+            path=os.environ.get("TRAVEL_CACHE_PATH")
+        )
+
+    def key(self, origin, destination):
+        return (geohash(origin[0], origin[1], self.precision),
+                geohash(destination[0], destination[1], self.precision))
+
+    def get(self, key):
+        '''Returns the cached travel time, or None'''
+
+        entry = self._entries.get(key)
+        if entry is not None and entry[0] < time.time():
+            del self._entries[key]
+            entry = None
+        if entry is None:
+            self.misses += 1
+            return None
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return entry[1]
+
+    def put(self, key, minutes):
+        self._entries[key] = (time.time() + self.ttl, minutes)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.capacity:
+            self._entries.popitem(last=False)
+
+    def stats(self):
+        lookups = self.hits + self.misses
+        return {
+            "size": len(self._entries),
+            "capacity": self.capacity,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit-ratio": self.hits / lookups if lookups else 0.0
+        }
+
+    def load(self):
+        with open(self.path, "r") as cache_file:
+            entries = json.loads(cache_file.read())
+        now = time.time()
+        for origin, destination, expires, minutes in entries:
+            if expires > now:
+                self._entries[(origin, destination)] = (expires, minutes)
+        while len(self._entries) > self.capacity:
+            self._entries.popitem(last=False)
+
+    def save(self):
+        if self.path is None:
+            return
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        entries = [[origin, destination, expires, minutes]
+                   for (origin, destination), (expires, minutes) in self._entries.items()]
+        # written next to the cache and renamed, so a crash never leaves
+        # half a file behind
+        with open(self.path + ".tmp", "w") as cache_file:
+            cache_file.write(json.dumps(entries))
+        os.replace(self.path + ".tmp", self.path)
@@ -0,0 +1,128 @@
+import asyncio
+import os
+import random
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from src.assignment import MicroBatcher  # noqa: E402
+from src.routing import LocalRouter, Router  # noqa: E402
+
+__author__ = "Randeep Ahlawat"
+__version__ = "1.0.0"
+__maintainer__ = "Randeep Ahlawat"
+__email__ = "randeep.ahalwat@utdallas.edu"
+__status__ = "Development"
+
+'''Benchmark of assigning a burst of orders one by one or as a batch.
+
+Counts the routing lookups and the average delivery time when each order of
+a burst is routed to its own candidate entities, as without micro-batching,
+and when the burst is routed once, every order in turn taking the fastest
+entity left.
+
+run from the C3 folder with `pipenv run python tests/assignment_benchmark.py`
+or run the checks with
+`pipenv run python -m pytest tests/assignment_benchmark.py`
+'''
+
+STORE = (32.95, -96.75)
+CANDIDATES = 5
+
+
+class CountingRouter(LocalRouter):
+    '''Local routing engine counting its lookups'''
+
+    def __init__(self):
+        super().__init__()
+        self.lookups = 0
+
+    async def travel_time(self, origin, destination, store_id=None):
+        self.lookups += 1
+        return await super().travel_time(origin, destination, store_id)
+
+
+def make_location(spread):
+    return (STORE[0] + random.uniform(-spread, spread),
+            STORE[1] + random.uniform(-spread, spread))
+
+
+def make_entities(count):
+    return [dict(zip(("latitude", "longitude"), make_location(0.05)), name="entity" + str(i))
+            for i in range(count)]
+
+
+async def one_by_one(entities, customers):
+    '''Each order routes the candidates left and takes the best'''
+    provider = CountingRouter()
+    router = Router(provider)
+    busy = set()
+    total = 0
+    for customer in customers:
+        available = [entity for entity in entities if entity['name'] not in busy]
+        ranked = await router.delivery_times(available[:CANDIDATES], customer, STORE)
+        time, name = ranked[0]
+        busy.add(name)
+        total += time
+    return provider.lookups, total / len(customers)
+
+
+async def batched(entities, customers):
+    '''The burst routes its candidates once, and each order takes the
+    fastest entity left'''
+    provider = CountingRouter()
+    router = Router(provider)
+    ranked = await router.entity_times(entities[:CANDIDATES + len(customers) - 1], STORE)
+    times = [await router.customer_time(STORE, customer) for customer in customers]
+    total = sum(customer_time + time for customer_time, (time, name) in zip(times, ranked))
+    return provider.lookups, total / len(customers)
+
+
+def test_micro_batcher_groups_by_key():
+    batches = []
+
+    async def process(key, items):
+        batches.append((key, items))
+        return [item * 10 for item in items]
+
+    async def burst():
+        batcher = MicroBatcher(process, window=0.05)
+        return await asyncio.gather(
+            batcher.submit("a", 1), batcher.submit("b", 2), batcher.submit("a", 3))
+
+    assert asyncio.run(burst()) == [10, 20, 30]
+    assert sorted(batches) == [("a", [1, 3]), ("b", [2])]
+
+
+def test_batched_routes_less():
+    entities = make_entities(20)
+    customers = [make_location(0.037) for _ in range(8)]
+    lookups, average = asyncio.run(one_by_one(entities, customers))
+    batched_lookups, batched_average = asyncio.run(batched(entities, customers))
+    assert batched_lookups < lookups
+    # one by one, an order's candidates are the entities left nearest
+    # the store, so the batch can only do as well or better
+    assert batched_average <= average + 1e-9
+
+
+def test_single_order_routes_as_many():
+    entities = make_entities(20)
+    customers = [make_location(0.037)]
+    assert asyncio.run(batched(entities, customers))[0] == asyncio.run(
+        one_by_one(entities, customers))[0] == CANDIDATES + 1
+
+
+def main():
+    entities = make_entities(50)
+    for burst in (1, 5, 10, 20):
+        customers = [make_location(0.037) for _ in range(burst)]
+        lookups, average = asyncio.run(one_by_one(entities, customers))
+        batched_lookups, batched_average = asyncio.run(batched(entities, customers))
+        print("{:>3} orders   one by one {:>5.1f} lookups/order {:>6.1f} min   "
+              "batched {:>5.1f} lookups/order {:>6.1f} min".format(
+                  burst, lookups / burst, average,
+                  batched_lookups / burst, batched_average))
+
+
+if __name__ == "__main__":
+    main()
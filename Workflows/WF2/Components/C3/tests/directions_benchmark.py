@@ -0,0 +1,237 @@
+import asyncio
+import functools
+import json
+import os
+import random
+import sys
+from time import perf_counter
+
+from aiohttp import web
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from src.directions import GoogleDirections  # noqa: E402
+from src.http_client import ForwardingClient  # noqa: E402
+from src.routing import FallbackRouter, LocalRouter, Router  # noqa: E402
+from src.travel_cache import TravelTimeCache, geohash  # noqa: E402
+
+__author__ = "Randeep Ahlawat"
+__version__ = "1.0.0"
+__maintainer__ = "Randeep Ahlawat"
+__email__ = "randeep.ahalwat@utdallas.edu"
+__status__ = "Development"
+
+'''Benchmark of the delivery time lookups against a mock directions server.
+
+Compares looking up the entity to store times and the store to customer time
+one after the other, as the delivery assigner used to, with the concurrent
+lookups of src/routing.py, with the same orders repeated once the travel
+times are in the cache of src/travel_cache.py, and with the local routing
+engine, on its own and as the fallback of a directions server that is too
+slow.
+
+run from the C3 folder with `pipenv run python tests/directions_benchmark.py`
+or run the checks with
+`pipenv run python -m pytest tests/directions_benchmark.py`
+'''
+
+#Round trip of the mock directions server, in seconds
+LATENCY = 0.03
+ENTITIES = 5
+
+
+class MockDirections:
+    '''Answers like the Google Directions API, with the minutes between
+       origin and destination derived from their coordinates.'''
+
+    def __init__(self, latency=LATENCY):
+        self.latency = latency
+        self.requests = 0
+        self.app = web.Application()
+        self.app.add_routes([web.get("/directions", self.directions)])
+
+    async def directions(self, request):
+        self.requests += 1
+        origin = [float(x) for x in request.query["origin"].split(",")]
+        destination = [float(x) for x in request.query["destination"].split(",")]
+        mins = int(abs(origin[0] - destination[0]) * 100 +
+                   abs(origin[1] - destination[1]) * 100)
+        await asyncio.sleep(self.latency)
+        text = ("{} hours {} mins".format(mins // 60, mins % 60) if mins >= 60
+                else "{} mins".format(mins))
+        return web.Response(text=json.dumps(
+            {"routes": [{"legs": [{"duration": {"text": text}}]}]}))
+
+    async def start(self):
+        self.runner = web.AppRunner(self.app)
+        await self.runner.setup()
+        site = web.TCPSite(self.runner, "127.0.0.1", 0)
+        await site.start()
+        port = site._server.sockets[0].getsockname()[1]
+        return ("http://127.0.0.1:" + str(port) +
+                "/directions?origin={},{}&destination={},{}&key={}")
+
+    async def stop(self):
+        await self.runner.cleanup()
+
+
+def make_entities():
+    return [{"name": "entity" + str(i),
+             "latitude": 32.9 + random.random() / 10,
+             "longitude": -96.8 + random.random() / 10}
+            for i in range(ENTITIES)]
+
+
+def make_location():
+    return (32.9 + random.random() / 10, -96.8 + random.random() / 10)
+
+
+async def serial_delivery_time(directions, delivery_entities, customer, store):
+    '''The lookups of an order one after the other'''
+    best_time = float('inf')
+    best_entity = None
+    for entity in delivery_entities:
+        time = await directions.travel_time(
+            (entity['latitude'], entity['longitude']), store)
+        if time < best_time:
+            best_time = time
+            best_entity = entity['name']
+    return await directions.travel_time(store, customer) + best_time, best_entity
+
+
+async def run(orders, latency=LATENCY, deadline=10.0, concurrency=10, budget=0.05):
+    '''Returns the results and latencies of the orders for every way of
+       looking them up'''
+    server = MockDirections(latency)
+    client = ForwardingClient()
+    await client.start()
+    try:
+        directions = GoogleDirections(client.get, "key", await server.start(),
+                                      concurrency)
+        router = Router(directions, deadline)
+        report = {}
+        for label, lookup in (("serial", functools.partial(serial_delivery_time, directions)),
+                              ("concurrent", router.delivery_time),
+                              ("local", Router(LocalRouter(), deadline).delivery_time)):
+            results = []
+            latencies = []
+            for entities, customer, store in orders:
+                start = perf_counter()
+                results.append(await lookup(entities, customer, store))
+                latencies.append(perf_counter() - start)
+            report[label] = results, sorted(latencies)
+
+        cached = Router(GoogleDirections(client.get, "key", directions.url,
+                                         concurrency, TravelTimeCache()), deadline)
+        for entities, customer, store in orders:
+            await cached.delivery_time(entities, customer, store)
+        requests = server.requests
+        results = []
+        latencies = []
+        for entities, customer, store in orders:
+            start = perf_counter()
+            results.append(await cached.delivery_time(entities, customer, store))
+            latencies.append(perf_counter() - start)
+        report["cached"] = results, sorted(latencies)
+        # the repeated orders never reach the server
+        assert server.requests == requests
+
+        # a directions server ten times slower than the budget
+        server.latency = budget * 10
+        fallback = Router(FallbackRouter(directions, LocalRouter(), budget), deadline)
+        results = []
+        latencies = []
+        for entities, customer, store in orders:
+            start = perf_counter()
+            results.append(await fallback.delivery_time(entities, customer, store))
+            latencies.append(perf_counter() - start)
+        report["fallback"] = results, sorted(latencies)
+        return report
+    finally:
+        await client.close()
+        await server.stop()
+
+
+def make_orders(count):
+    return [(make_entities(), make_location(), make_location())
+            for _ in range(count)]
+
+
+def test_concurrent_lookups_agree_with_serial():
+    report = asyncio.run(run(make_orders(5)))
+    assert report["concurrent"][0] == report["serial"][0]
+    # six round trips one after the other against all six at once
+    assert report["concurrent"][1][-1] < 6 * LATENCY
+
+
+def test_cached_lookups_agree():
+    report = asyncio.run(run(make_orders(5)))
+    assert report["cached"][0] == report["serial"][0]
+
+
+def test_cache_expiry_and_eviction():
+    cache = TravelTimeCache(capacity=2, ttl=60)
+    keys = [cache.key(make_location(), make_location()) for _ in range(3)]
+    for minutes, key in enumerate(keys):
+        cache.put(key, minutes)
+    assert cache.get(keys[0]) is None
+    assert cache.get(keys[2]) == 2
+    cache.ttl = -1
+    cache.put(keys[1], 5)
+    assert cache.get(keys[1]) is None
+    assert cache.stats()["hits"] == 1 and cache.stats()["misses"] == 2
+
+
+def test_cache_warm_start(tmp_path):
+    path = str(tmp_path / "travel-cache.json")
+    cache = TravelTimeCache(path=path)
+    key = cache.key((32.9, -96.8), (32.95, -96.75))
+    cache.put(key, 12)
+    cache.save()
+    assert TravelTimeCache(path=path).get(key) == 12
+
+
+def test_geohash():
+    assert geohash(57.64911, 10.40744, 11) == "u4pruydqqvj"
+
+
+def test_local_router_needs_no_network():
+    router = Router(LocalRouter(speed=30, detour=1))
+    entities = [{"name": "near", "latitude": 32.9, "longitude": -96.8},
+                {"name": "far", "latitude": 33.0, "longitude": -96.8}]
+    # 0.05 degrees of latitude is about 5.6km, 11 minutes at 30 km/h
+    time, entity = asyncio.run(
+        router.delivery_time(entities, (32.95, -96.8), (32.9, -96.8)))
+    assert entity == "near" and time == 11
+
+
+def test_fallback_bounds_latency():
+    report = asyncio.run(run(make_orders(3), budget=0.05))
+    assert report["fallback"][0] == report["local"][0]
+    assert report["fallback"][1][-1] < 0.05 * 3
+
+
+def test_deadline():
+    async def slow():
+        try:
+            await run(make_orders(1), latency=0.3, deadline=0.1)
+        except asyncio.TimeoutError:
+            return True
+        return False
+
+    # the serial lookups have no deadline, only the concurrent ones time out
+    assert asyncio.run(slow())
+
+
+def main():
+    report = asyncio.run(run(make_orders(50)))
+    for label, (results, latencies) in report.items():
+        print("{:<11} p50 {:>7.1f} ms   p95 {:>7.1f} ms   max {:>7.1f} ms".format(
+            label,
+            latencies[len(latencies) // 2] * 1000,
+            latencies[int(len(latencies) * 0.95)] * 1000,
+            latencies[-1] * 1000))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,128 @@
+import asyncio
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from src.fleet import Fleet, TimerWheel  # noqa: E402
+
+__author__ = "Randeep Ahlawat"
+__version__ = "1.0.0"
+__maintainer__ = "Randeep Ahlawat"
+__email__ = "randeep.ahalwat@utdallas.edu"
+__status__ = "Development"
+
+'''Checks of the timer wheel and fleet state of src/fleet.py.
+
+run from the C3 folder with `pipenv run python -m pytest tests/fleet_test.py`
+'''
+
+
+class Completed:
+    '''Stands in for a ResponseFuture that completed before its callbacks
+       were added, so they are called right away'''
+
+    def __init__(self, rows):
+        self.rows = rows
+
+    def add_callbacks(self, callback, errback):
+        callback(self.rows)
+
+
+class Entities:
+    '''Stands in for the session, keeping onDelivery of deliveryEntitiesByStore'''
+
+    def __init__(self, names):
+        self.on_delivery = dict((name, False) for name in names)
+        self.orders = []
+
+    def prepare(self, query):
+        return query
+
+    def execute_async(self, query, params):
+        if query.startswith("Update"):
+            name = params[1]
+            reserve = "onDelivery=True," in query
+            applied = self.on_delivery[name] != reserve
+            if applied:
+                self.on_delivery[name] = reserve
+            return Completed([{"[applied]": applied}])
+        if query.startswith("Select"):
+            return Completed([{"name": name} for name, out in self.on_delivery.items() if out])
+        self.orders.append(params)
+        return Completed([])
+
+
+async def settle():
+    # let the releases fired by the timer wheel run
+    for _ in range(5):
+        await asyncio.sleep(0)
+
+
+def test_timer_wheel_fires_in_order():
+    fired = []
+    wheel = TimerWheel(tick=1, slots=8)
+    for delay in (20, 3, 8, 1, 9):
+        wheel.schedule(delay, fired.append, delay)
+    for tick in range(1, 21):
+        wheel.advance()
+        assert fired == sorted(delay for delay in (20, 3, 8, 1, 9) if delay <= tick)
+    assert len(wheel) == 0
+
+
+def test_fleet_spreads_orders_and_releases():
+    async def run():
+        session = Entities(["a", "b"])
+        fleet = Fleet(session, TimerWheel(tick=1, slots=8), scale=1)
+        ranked = ["a", "b"]
+
+        assert await fleet.reserve("store", ranked) == "a"
+        await fleet.dispatch("store", "a", "order1", None, 2)
+        # the best entity is out, the next order goes to the second best
+        assert await fleet.reserve("store", ranked) == "b"
+        await fleet.dispatch("store", "b", "order2", None, 5)
+        assert await fleet.reserve("store", ranked) is None
+
+        fleet.wheel.advance()
+        fleet.wheel.advance()
+        await settle()
+        assert fleet.busy("store") == {"b"}
+        assert not session.on_delivery["a"]
+        assert await fleet.reserve("store", ranked) == "a"
+        assert fleet.stats()["store"]["delivered"] == 1
+        assert len(session.orders) == 2
+
+    asyncio.run(run())
+
+
+def test_reserve_skips_entities_taken_elsewhere():
+    async def run():
+        session = Entities(["a", "b"])
+        # reserved by another assigner since the entities were read
+        session.on_delivery["a"] = True
+        fleet = Fleet(session, TimerWheel())
+        assert await fleet.reserve("store", ["a", "b"]) == "b"
+
+    asyncio.run(run())
+
+
+def test_fleet_releases_stale_entities():
+    session = Entities(["a", "b"])
+    session.on_delivery["b"] = True
+    fleet = Fleet(session, TimerWheel())
+    asyncio.run(fleet.release_stale("store"))
+    assert not any(session.on_delivery.values())
+
+
+def test_timer_wheel_runs():
+    fired = []
+
+    async def run():
+        wheel = TimerWheel(tick=0.01)
+        wheel.start()
+        wheel.schedule(0.03, fired.append, True)
+        await asyncio.sleep(0.1)
+        await wheel.stop()
+
+    asyncio.run(run())
+    assert fired == [True]
@@ -0,0 +1,131 @@
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from src.recipe import (CHEESES, CRUSTS, ITEMS, SAUCES, TOPPINGS, encode,  # noqa: E402
+                        ingredient_set, order_demand, order_totals, pizza_costs)
+
+__author__ = "Randeep Ahlawat"
+__version__ = "1.0.0"
+__maintainer__ = "Randeep Ahlawat"
+__email__ = "randeep.ahalwat@utdallas.edu"
+__status__ = "Development"
+
+'''Benchmark of pricing and aggregating orders with src/recipe.py.
+
+Compares the count matrix engine with the per-ingredient dict updates the
+components used before, for a single order and for batches of thousands,
+and checks that both agree.
+
+run from the C3 folder with `pipenv run python tests/recipe_benchmark.py`
+or run the checks with
+`pipenv run python -m pytest tests/recipe_benchmark.py`
+'''
+
+PRICES = dict((name, round(random.uniform(0.25, 4.0), 2)) for name in ITEMS)
+
+
+def make_pizza():
+    return {
+        "crustType": random.choice(list(CRUSTS)),
+        "sauceType": random.choice(list(SAUCES)),
+        "cheeseAmt": random.choice(list(CHEESES)),
+        "toppingList": random.sample(list(TOPPINGS), random.randint(0, 4))
+    }
+
+
+def make_orders(count):
+    return [[make_pizza() for _ in range(random.randint(1, 5))] for _ in range(count)]
+
+
+def dict_ingredients(pizza):
+    '''Amount of every item of a pizza, the way the components added it up'''
+    ingredients = dict.fromkeys(ITEMS, 0)
+    ingredients[CRUSTS[pizza["crustType"]][0]] += CRUSTS[pizza["crustType"]][1]
+    ingredients[SAUCES[pizza["sauceType"]][0]] += SAUCES[pizza["sauceType"]][1]
+    ingredients[CHEESES[pizza["cheeseAmt"]][0]] += CHEESES[pizza["cheeseAmt"]][1]
+    for topping in pizza["toppingList"]:
+        ingredients[topping] += 1
+    return ingredients
+
+
+def dict_engine(pizza_lists, prices):
+    '''Per order total and item demand, one dict update per ingredient'''
+    totals = []
+    demands = []
+    for pizza_list in pizza_lists:
+        total = 0.0
+        demand = dict.fromkeys(ITEMS, 0)
+        for pizza in pizza_list:
+            for name, amount in dict_ingredients(pizza).items():
+                total += prices[name] * amount
+                demand[name] += amount
+        totals.append(total)
+        demands.append(demand)
+    return totals, demands
+
+
+def matrix_engine(pizza_lists, prices):
+    '''Per order total and item demand, from one count matrix'''
+    counts, orders = encode(pizza_lists)
+    totals = order_totals(pizza_costs(counts, prices), orders, len(pizza_lists))
+    return totals, order_demand(counts, orders, len(pizza_lists))
+
+
+def test_matrix_engine_matches_dicts():
+    pizza_lists = make_orders(300) + [[]]
+    totals, demands = dict_engine(pizza_lists, PRICES)
+    matrix_totals, matrix_demands = matrix_engine(pizza_lists, PRICES)
+    for total, demand, matrix_total, matrix_demand in zip(
+            totals, demands, matrix_totals, matrix_demands):
+        assert abs(total - matrix_total) < 1e-9
+        assert demand == dict(zip(ITEMS, matrix_demand.tolist()))
+
+
+def test_ingredient_set():
+    pizza = {"crustType": "Traditional", "sauceType": "Spicy",
+             "cheeseAmt": "Extra", "toppingList": ["Onion", "Bacon"]}
+    counts, orders = encode([[pizza]])
+    assert ingredient_set(counts[0]) == {
+        ("Dough", 2), ("SpicySauce", 1), ("Cheese", 3), ("Onion", 1), ("Bacon", 1)}
+
+
+def test_unknown_ingredient_rejects_its_order_only():
+    pizza_lists = make_orders(3)
+    pizza_lists[1] = [dict(make_pizza(), toppingList=["Ham"])]
+    errors = {}
+    counts, orders = encode(pizza_lists, errors)
+    assert list(errors) == [1]
+    assert "Ham" in str(errors[1])
+    demand = order_demand(counts, orders, len(pizza_lists))
+    assert not demand[1].any()
+    assert demand[0].sum() > 0 and demand[2].sum() > 0
+    try:
+        encode(pizza_lists)
+    except ValueError:
+        pass
+    else:
+        assert False, "unknown ingredient accepted"
+
+
+def measure(engine, pizza_lists, repeat):
+    start = time.perf_counter()
+    for _ in range(repeat):
+        engine(pizza_lists, PRICES)
+    return (time.perf_counter() - start) / repeat
+
+
+def main():
+    for count, repeat in ((1, 2000), (100, 50), (1000, 10), (10000, 3)):
+        pizza_lists = make_orders(count)
+        dicts = measure(dict_engine, pizza_lists, repeat)
+        matrix = measure(matrix_engine, pizza_lists, repeat)
+        print("{:>6} orders   dicts {:>9.3f} ms   matrix {:>9.3f} ms   {:>5.1f}x".format(
+            count, dicts * 1000, matrix * 1000, dicts / matrix))
+
+
+if __name__ == "__main__":
+    main()
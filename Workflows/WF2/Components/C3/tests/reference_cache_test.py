@@ -0,0 +1,67 @@
+import asyncio
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from src.reference_cache import ReferenceCache  # noqa: E402
+
+__author__ = "Randeep Ahlawat"
+__version__ = "1.0.0"
+__maintainer__ = "Randeep Ahlawat"
+__email__ = "randeep.ahalwat@utdallas.edu"
+__status__ = "Development"
+
+'''Checks of the read-through cache of src/reference_cache.py.
+
+run from the C3 folder with `pipenv run python -m pytest tests/reference_cache_test.py`
+'''
+
+PRICES = {"Dough": 4.0, "Cheese": 1.0, "Pepperoni": 1.5}
+
+
+def make_cache(ttl=300):
+    reads = []
+
+    async def load_one(name):
+        reads.append(name)
+        return PRICES.get(name)
+
+    async def load_all():
+        reads.append("*")
+        return PRICES
+
+    return ReferenceCache(load_one, load_all, ttl), reads
+
+
+def test_prices_are_read_once():
+    cache, reads = make_cache()
+
+    async def price_pizzas():
+        for _ in range(100):
+            prices = await cache.all()
+            assert prices["Dough"] * 2 + prices["Cheese"] == 9.0
+            assert await cache.get("Pepperoni") == 1.5
+
+    asyncio.run(price_pizzas())
+    assert reads == ["*"]
+
+
+def test_missing_rows_are_not_cached():
+    cache, reads = make_cache()
+    asyncio.run(cache.get("Ham"))
+    asyncio.run(cache.get("Ham"))
+    assert reads == ["Ham", "Ham"]
+
+
+def test_invalidate_and_ttl():
+    cache, reads = make_cache()
+    asyncio.run(cache.get("Dough"))
+    cache.invalidate()
+    asyncio.run(cache.get("Dough"))
+    assert reads == ["Dough", "Dough"]
+
+    cache, reads = make_cache(ttl=-1)
+    asyncio.run(cache.all())
+    asyncio.run(cache.all())
+    assert reads == ["*", "*"]
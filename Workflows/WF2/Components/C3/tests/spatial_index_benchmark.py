@@ -0,0 +1,103 @@
+import asyncio
+import os
+import random
+import sys
+from time import perf_counter
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from src.routing import haversine  # noqa: E402
+from src.spatial_index import EntityIndex, KDTree  # noqa: E402
+
+__author__ = "Randeep Ahlawat"
+__version__ = "1.0.0"
+__maintainer__ = "Randeep Ahlawat"
+__email__ = "randeep.ahalwat@utdallas.edu"
+__status__ = "Development"
+
+'''Benchmark of picking the delivery entities closest to a store.
+
+Compares the KD-tree of src/spatial_index.py with ranking every entity by
+distance, for fleets of 5 to 5000 entities per store.
+
+run from the C3 folder with `pipenv run python tests/spatial_index_benchmark.py`
+or run the checks with
+`pipenv run python -m pytest tests/spatial_index_benchmark.py`
+'''
+
+STORE = (32.95, -96.75)
+
+
+def make_entities(count):
+    return [{"name": "entity" + str(i),
+             "latitude": STORE[0] + random.uniform(-0.2, 0.2),
+             "longitude": STORE[1] + random.uniform(-0.2, 0.2)}
+            for i in range(count)]
+
+
+def distance(entity, point):
+    return haversine((entity['latitude'], entity['longitude']), point)
+
+
+def brute_force(entities, point, k):
+    return sorted(entities, key=lambda entity: distance(entity, point))[:k]
+
+
+def make_tree(entities):
+    return KDTree([(entity['latitude'], entity['longitude']) for entity in entities],
+        entities)
+
+
+def test_nearest_matches_brute_force():
+    for count in (0, 1, 5, 100, 1000):
+        entities = make_entities(count)
+        tree = make_tree(entities)
+        for _ in range(20):
+            point = (STORE[0] + random.uniform(-0.3, 0.3),
+                     STORE[1] + random.uniform(-0.3, 0.3))
+            # the tree measures distances on a flat projection, which may
+            # swap entities within a fraction of a percent of each other
+            found = [distance(entity, point) for entity in tree.nearest(point, 5)]
+            best = [distance(entity, point) for entity in brute_force(entities, point, 5)]
+            assert len(found) == len(best)
+            assert all(abs(a - b) <= b * 0.005 for a, b in zip(found, best))
+
+
+def test_entity_index_refreshes():
+    loads = []
+
+    async def load(store_id):
+        loads.append(store_id)
+        return make_entities(10)
+
+    async def lookups():
+        index = EntityIndex(load, ttl=60)
+        first = await index.nearest("store", STORE, 3)
+        assert await index.nearest("store", STORE, 3) == first
+        index.invalidate("store")
+        await index.nearest("store", STORE, 3)
+
+    asyncio.run(lookups())
+    assert loads == ["store", "store"]
+
+
+def main():
+    for count in (5, 50, 500, 5000):
+        entities = make_entities(count)
+        tree = make_tree(entities)
+        points = [(STORE[0] + random.uniform(-0.1, 0.1),
+                   STORE[1] + random.uniform(-0.1, 0.1)) for _ in range(200)]
+        start = perf_counter()
+        for point in points:
+            brute_force(entities, point, 5)
+        brute = (perf_counter() - start) / len(points)
+        start = perf_counter()
+        for point in points:
+            tree.nearest(point, 5)
+        indexed = (perf_counter() - start) / len(points)
+        print("{:>5} entities   ranking all {:>9.1f} us   kd-tree {:>7.1f} us".format(
+            count, brute * 1e6, indexed * 1e6))
+
+
+if __name__ == "__main__":
+    main()
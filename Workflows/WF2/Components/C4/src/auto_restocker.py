@@ -1,3 +1,4 @@
+import asyncio
 import logging
 import uuid
 import json
@@ -9,12 +10,20 @@ from datetime import datetime, date, timedelta
 from cassandra.query import dict_factory
 from cassandra.policies import RoundRobinPolicy
 from cassandra.cluster import Cluster
+from cassandra.concurrent import execute_concurrent_with_args
 from quart import Quart, Response, request
-from quart.utils import run_sync
 import pandas as pd
-from fbprophet import Prophet
 import requests
 
+from src.batch import (accepted, forward_batch, merge_results, parse_batch,
+                       rejected, split_by_store)
+from src.forecast_jobs import ForecastJobs, QueueFull, forecast, forecast_items
+from src.forecasters import FORECASTERS, HoltWinters, Prophet, get_forecaster
+from src.http_client import ForwardingClient
+from src.model_cache import ModelCache
+from src.order_queue import OrderQueue, is_queued
+from src.recipe import ITEMS, encode, item_amounts, order_demand
+from src.tracker_buffer import TrackerBuffer
 
 __author__ = "Randeep Ahlawat"
 __version__ = "1.0.0"
@@ -41,6 +50,9 @@ logging.getLogger('quart.serving').setLevel(logging.WARNING)
 
 workflows = {}
 
+#Pooled HTTP client for forwarding orders
+http_client = ForwardingClient.from_env()
+
 history = {}
 
 #Connecting to Cassandra Cluster    
@@ -52,14 +64,12 @@ session = cluster.connect('pizza_grocery')
 count = 0
 while True:
 	try:
-		get_item_stock_query = session.prepare("Select * from stockTracker \
-			where storeID=? and itemName=? and dateSold<=?")
+		get_sales_query = session.prepare("Select dateSold, quantitiesSold \
+			from stockTrackerByDay where storeID=? and dateSold<=? limit ?")
 		get_current_stock_query = session.prepare("Select quantity from stock \
 			where storeID=? and itemName=?")
-		update_tracker_query = session.prepare("Update stockTracker \
-			set quantitySold=? where storeID=? and itemName=? and dateSold=?")
-		insert_tracker_query = session.prepare('Insert into stockTracker \
-			(storeID, itemName, quantitySold, dateSold) values (?, ?, ?, ?)')
+		insert_tracker_query = session.prepare('Insert into stockTrackerByDay \
+			(storeID, dateSold, quantitiesSold) values (?, ?, ?)')
 		
 	except:
 		count += 1
@@ -82,85 +92,108 @@ session.row_factory = pandas_factory
 
 
 async def _get_ingredients_dict():
-	return {
-		'Dough': 0,         'SpicySauce': 0,        'TraditionalSauce': 0,  'Cheese': 0,
-		'Pepperoni': 0,     'Sausage': 0,           'Beef': 0,              'Onion': 0,
-		'Chicken': 0,       'Peppers': 0,           'Olives': 0,            'Bacon': 0,
-		'Pineapple': 0,     'Mushrooms': 0
-	}
+	return dict.fromkeys(ITEMS, 0)
 
 async def _aggregate_ingredients(pizza_list, ingredients):
-	for pizza in pizza_list:
-		if pizza['crustType'] == 'Thin':
-			ingredients['Dough'] += 1
-		elif pizza['crustType'] == 'Traditional':
-            		ingredients['Dough'] += 2
-
-		if pizza['sauceType'] == 'Spicy':
-            		ingredients['SpicySauce'] += 1
-		elif pizza['sauceType'] == 'Traditional':
-			ingredients['TraditionalSauce'] += 1
-
-		if pizza['cheeseAmt'] == 'Light':
-			ingredients['Cheese'] += 1
-		elif pizza['cheeseAmt'] == 'Normal':
-			ingredients['Cheese'] += 2
-		elif pizza['cheeseAmt'] == 'Extra':
-			ingredients['Cheese'] += 3
-
-		for topping in pizza["toppingList"]:
-			ingredients[topping] += 1
+	counts, orders = encode([pizza_list])
+	for ingredient, quantity in item_amounts(order_demand(counts, orders, 1)[0]).items():
+		ingredients[ingredient] += quantity
 	return ingredients
 
 
-def _predict_item_stocks(storeId, item_name):
-	
-	values = [(key, value[item_name]) for key, value in history[storeId].items()]
-	df = pd.DataFrame(values, columns=['ds', 'y'])
-	m = Prophet()
-	m.fit(df)
-	future = m.make_future_dataframe(periods=1, freq='d', include_history=False)
-	date = future.iloc[0,0]
-	forecast = m.predict(future)
-	prediction = forecast['yhat'].tolist()
-	logger.info("FORECAST::\n\t{}".format(forecast.to_string().replace('\n', '\n\t')))
-	return prediction, date
-
-  
-async def _predict_stocks(store_id, item_name, history, days):	
-	
-	rows = session.execute(get_item_stock_query, (store_id, item_name, today))
+#Forecasting jobs, fitted in worker processes
+forecast_jobs = ForecastJobs.from_env()
+
+#Fitted models and forecasts of every store and item
+model_cache = ModelCache.from_env()
+
+#Forecaster of the workflows that do not select one
+default_forecaster = os.environ.get("FORECASTER", Prophet.name)
+
+
+def _forecaster(store_id):
+	return workflows.get(str(store_id), {}).get("forecaster", default_forecaster)
+
+
+def _select_sales(store_id, history):
+	'''(date, quantities) of the last history days the store sold on, with
+	   the quantity of every item of ITEMS'''
+
+	rows = session.execute(get_sales_query, (store_id, today, history))
 	df = rows._current_rows
-	df = df[['datesold','quantitysold']].sort_values(['datesold'], ascending=False)	
-	df = df.iloc[:history, :]
-	df = df.rename(columns={'datesold':'ds', 'quantitysold':'y'})	
-	m = Prophet()
-	m.fit(df)
-	future = m.make_future_dataframe(periods=days, freq='d', include_history=False)
-	forecast = m.predict(future)
-	predictions = forecast['yhat'].tolist()	
-	dates = forecast['ds'].tolist()
-	result = {date.strftime("%m/%d/%Y"): prediction for date, prediction in zip(dates, predictions)}
-	
-	return result
+	if df.empty:
+		return []
+	return list(zip(df['datesold'].tolist(), df['quantitiessold'].tolist()))
 
 
-async def _update_stock_tracker(ingredients, storeId, date):
+def _item_sales(values, item_name):
+	'''(date, quantity) of one item from (date, quantities) of every item'''
 
-	ingredient_list = ['Dough', 'TraditionalSauce']
-	
-	for ingredient in ingredient_list:
-		session.execute(update_tracker_query, (ingredients[ingredient], 
-			storeId, ingredient, date))
+	if item_name not in ITEMS:
+		raise ValueError("unknown item '{}'".format(item_name))
+	column = ITEMS.index(item_name)
+	return [(date, quantities[column]) for date, quantities in values]
 
 
-async def _insert_stock_tracker(ingredients, storeId, date):
-	
-	ingredient_list = ['Dough', 'TraditionalSauce']
-	
-	for ingredient in ingredient_list:
-		session.execute(insert_tracker_query, (storeId, ingredient,
-			ingredients[ingredient], date))
+def _submit_forecast(store_id, item_name, values, days, forecaster):
+	'''Queues the forecast of an item's sales over the next days from its
+	   sales values by the forecaster and returns the job ID. An item_name of
+	   None forecasts every item of ITEMS in one job, from (date, quantities)
+	   values. A forecast made before from the same sales is returned as a
+	   completed job, and a new model is fitted starting from the last model
+	   of the item.'''
+
+	key = ModelCache.key(store_id, item_name, values, days, forecaster)
+	result = model_cache.get(key)
+	if result is not None:
+		return forecast_jobs.completed(store_id, item_name, result)
+	params = model_cache.params(store_id, item_name, forecaster)
+	if item_name is None:
+		return forecast_jobs.submit(store_id, item_name, forecast_items, ITEMS, values, days,
+			params, forecaster, key=key, done=lambda value: model_cache.put(key, *value))
+	return forecast_jobs.submit(store_id, item_name, forecast, values, days,
+		params, forecaster, key=key, done=lambda value: model_cache.put(key, *value))
+
+
+def _forecast_batch(entries, days, forecaster):
+	'''Forecasts the sales over the next days of every (store_id, item_name,
+	   values) entry, fitting the ones not cached all at once in this thread.
+	   Returns the forecast of every entry, or None for an entry without
+	   sales.'''
+
+	keys = [ModelCache.key(store_id, item_name, values, days, forecaster)
+		for store_id, item_name, values in entries]
+	results = [model_cache.get(key) for key in keys]
+	missing = [i for i, result in enumerate(results) if result is None]
+	fitted = get_forecaster(forecaster).forecast_batch(
+		[entries[i][2] for i in missing], days)
+	for i, value in zip(missing, fitted):
+		if value is not None:
+			results[i] = model_cache.put(keys[i], *value)
+	return results
+
+
+async def _submit_prediction(store_id, item_name, history, days, forecaster=None):
+	'''Queues the forecast of an item's sales over the next days from its
+	   sales over the last history days, or of every item if item_name is
+	   None, and returns the job ID. The forecaster defaults to the one of the
+	   store's workflow.'''
+
+	values = await asyncio.get_event_loop().run_in_executor(None,
+		_select_sales, store_id, history)
+	if item_name is not None:
+		values = _item_sales(values, item_name)
+	return _submit_forecast(store_id, item_name, values, days,
+		forecaster or _forecaster(store_id))
+
+
+def _write_stock_tracker(rows):
+	execute_concurrent_with_args(session, insert_tracker_query, rows)
+
+
+#Daily sales of every item, written to stockTrackerByDay in batches
+tracker = TrackerBuffer.from_env(_write_stock_tracker, ITEMS)
+
 
 async def _get_next_component(store_id):
 	comp_list = workflows[store_id]["component-list"].copy()
@@ -171,54 +204,150 @@ async def _get_next_component(store_id):
 	return comp_list[next_comp_index]
 
 
-async def _get_component_url(component, store_id):
+async def _get_component_url(component, store_id, endpoint="order"):
 	comp_name = component +\
 		(str(workflows[store_id]["workflow-offset"]) if workflows[store_id]["method"] == "edge" else "")
 	url = "http://" + comp_name + ":"
 	if component == "order-verifier":
-		url += "1000/order"
+		url += "1000/"
 	elif component == "delivery-assigner":
-		url += "3000/order"
+		url += "3000/"
 	elif component == "restocker":
-		url += "5000/order"
+		url += "5000/"
 	elif component == "order-processor":
-		url += "6000/order"
-	return url
+		url += "6000/"
+	return url + endpoint
 
 
 async def _send_order_to_next_component(url, order):
 
 	cust_name = order["pizza-order"]["custName"]
-	def request_post():
-		return requests.post(url, json=json.dumps(order))
-	response = await run_sync(request_post)()
+	status_code, text = await http_client.post(url, order)
 	    
-	if response.status_code == 200:
+	if status_code == 200:
 		logging.info("Order from {} aggregated.\
 			Order sent to next component.".format(cust_name))		
 	else:
 		logging.info("Order from {} aggregated.\
 			Issue sending order to next component:".format(cust_name))
-		logging.info(response.text)
+		logging.info(text)
+
+	return Response(status=status_code, response=text)
+
+
+async def _process_store_batch(store_id, orders):
+	'''Aggregates the orders of one store into history and the stock tracker
+	buffer and forwards the orders.
+
+		Parameters:
+			store_id(string): Store ID of workflow.
+			orders(list): Order dictionaries of the store.
+		Returns:
+			results(list): Result of each order.
+	'''
+
+	storeID = uuid.UUID(store_id)
+	results = [None] * len(orders)
+	forward = []
+	order_dates = set()
+
+	#Ingredients of every order, aggregated at once
+	unknown = {}
+	counts, rows = encode([order.get('pizza-order', {}).get('pizzaList') for order in orders], unknown)
+	demand = order_demand(counts, rows, len(orders))
+
+	for index, order in enumerate(orders):
+		try:
+			if index in unknown:
+				raise unknown[index]
+			order_date = datetime.strptime(order['pizza-order']["orderDate"], '%Y-%m-%dT%H:%M:%S').date()
+			ingredients = item_amounts(demand[index])
+		except Exception as inst:
+			results[index] = rejected(400, "Request rejected, aggregation failed:  " + str(inst))
+			continue
+
+		if order_date not in history[store_id]:
+			history[store_id][order_date] = await _get_ingredients_dict()
+		for ingredient, quantity in ingredients.items():
+			history[store_id][order_date][ingredient] += quantity
+		tracker.add(storeID, order_date, demand[index])
+		order_dates.add(order_date)
+		forward.append(index)
+
+	logger.info("{} orders aggregated for store::{} over {} days".format(
+		len(forward), store_id, len(order_dates)))
+
+	component = await _get_next_component(store_id)
+
+	if component is None:
+		merge_results(results, forward, [accepted(orders[i]) for i in forward])
+		return results
+
+	forwarded = await forward_batch(
+		http_client.post,
+		await _get_component_url(component, store_id, "orders/batch"),
+		await _get_component_url(component, store_id),
+		[orders[index] for index in forward]
+	)
+	merge_results(results, forward, forwarded)
+	return results
+
 
-	return Response(status=response.status_code, response=response.text)
+async def _get_status_url(store_id, order_id):
+	component = await _get_next_component(store_id)
+	if component is None:
+		return None
+	return await _get_component_url(component, store_id, "orders/" + order_id + "/status")
+
+
+#Queue of the orders of queued workflows
+order_queue = OrderQueue(os.environ.get("QUEUE_PATH", "data/order-queue.db"),
+	workflows, _process_store_batch, _get_status_url, http_client.get)
 
 
 def periodic_auto_restock():
-	'''Function to periodically predict weekly sales for items'''
+	'''Function to periodically predict weekly sales of every item. The
+	   items of all the stores whose forecaster fits in batches are fitted
+	   together in one pass, and the items of every other store in one job
+	   per store, at once across the worker processes.'''
 	
 	logger.info("Weekly analysis of items initiating\n")
 	global today	
 	Timer(420.0, periodic_auto_restock).start()
-	items = ['Dough', 'TraditionalSauce']
-	for store_id in workflows:
-		for item in items:
-			prediction, date = _predict_item_stocks(store_id, item)
-			logger.info("Prediction for item::{}, for date::{} for store::{} ::".format(
-				item, date, store_id, prediction))
+	jobs = []
+	batches = {}
+	for store_id in list(workflows):
+		forecaster = _forecaster(store_id)
+		values = [(key, [value[item] for item in ITEMS]) for key, value in history[store_id].items()]
+		if forecaster == HoltWinters.name:
+			batches.setdefault(forecaster, []).extend(
+				(store_id, item, _item_sales(values, item)) for item in ITEMS)
+			continue
+		try:
+			jobs.append((store_id, _submit_forecast(store_id, None, values, 1, forecaster)))
+		except QueueFull as inst:
+			logger.info("Prediction for store::{} skipped: {}".format(store_id, inst))
+	results = {}
+	for forecaster, entries in batches.items():
+		for (store_id, item, values), result in zip(entries, _forecast_batch(entries, 1, forecaster)):
+			if result is not None:
+				results.setdefault(store_id, {})[item] = result
+	for store_id, job_id in jobs:
+		try:
+			results[store_id] = forecast_jobs.result(job_id)
+		except Exception as inst:
+			logger.info("Prediction for store::{} failed: {!r}".format(store_id, inst))
+	for store_id, result in results.items():
+		if not result:
+			continue
+		date = list(list(result.values())[0])[0]
+		predictions = {item: result[item][date] for item in ITEMS if item in result}
+		logger.info("Prediction for date::{} for store::{} ::{}".format(
+			date, store_id, predictions))
+		if store_id in workflows:
 			requests.post('http://' + workflows[store_id]['origin'] + ':8080/results',
-				json=json.dumps({"message": {"item": item, "prediction": prediction,
-				'date': date.strftime("%m/%d/%Y")}}))
+				json=json.dumps({"message": {"prediction": predictions, 'date': date}}))
+	for store_id in list(history):
 		history[store_id] = {}
 	today = today + timedelta(days=7)
 			
@@ -228,21 +357,31 @@ t.start()
 
 @app.route('/predict-stocks/<storeId>', methods=['GET'])
 async def predict_stocks(storeId):
-	'''REST API for requesting future sales of an item'''
+	'''REST API for requesting future sales of an item, or of every item'''
 
-	data = request.get_json()
+	data = await request.get_json()
 	data = json.loads(data)
 
-	logger.info("Received request by {} for predicting sales for" +
+	logger.info("Received request by {} for predicting sales for".format(storeId) +
 		"{} using {} days for the next {} days\n".format(
-			storeId, data['itemName'], data['history'], data['days']
+			data.get('itemName', "every item"), data['history'], data['days']
 	))
 
 	storeID = uuid.UUID(storeId)
 	
-	result = await _predict_stocks(storeID, data['itemName'], data['history'], data['days'])
+	try:
+		job_id = await _submit_prediction(storeID, data.get('itemName'), data['history'],
+			data['days'], get_forecaster(data.get('forecaster', _forecaster(storeId))).name)
+	except ValueError as inst:
+		return Response(status=422, response=str(inst) + "\n")
+	except QueueFull as inst:
+		return Response(status=503, response="Forecasting queue is full: " + str(inst) + "\n")
+	try:
+		result = await forecast_jobs.wait(job_id)
+	except Exception as inst:
+		return Response(status=500, response="Forecast failed: {!r}\n".format(inst))
 	logger.info("Predictions for item {}, for storeId {}::{}".format(
-		data['itemName'], storeId, result))
+		data.get('itemName', "every item"), storeId, result))
 
 	return Response(
 		status=200,
@@ -250,6 +389,56 @@ async def predict_stocks(storeId):
 	)
 
 
+@app.route('/forecast-jobs/<storeId>', methods=['POST'])
+async def submit_forecast_job(storeId):
+	'''REST API for queueing the forecast of future sales of an item, or of
+	   every item'''
+
+	data = await request.get_json()
+	data = json.loads(data)
+
+	try:
+		job_id = await _submit_prediction(uuid.UUID(storeId), data.get('itemName'),
+			data['history'], data['days'],
+			get_forecaster(data.get('forecaster', _forecaster(storeId))).name)
+	except ValueError as inst:
+		return Response(status=422, response=str(inst) + "\n")
+	except QueueFull as inst:
+		return Response(status=503, response="Forecasting queue is full: " + str(inst) + "\n")
+
+	logger.info("Forecast of {} for store::{} queued as job {}\n".format(
+		data.get('itemName', "every item"), storeId, job_id))
+	return Response(
+		status=202,
+		response=json.dumps(forecast_jobs.status(job_id))
+	)
+
+
+@app.route('/forecast-jobs/<jobId>', methods=['GET'])
+async def forecast_job_status(jobId):
+	'''REST API for the status, and result once completed, of a forecasting job'''
+
+	job = forecast_jobs.status(jobId)
+	if job is None:
+		return Response(status=404, response="Forecasting job does not exist!\n")
+	return Response(
+		status=200,
+		response=json.dumps(job)
+	)
+
+
+@app.route('/forecast-jobs/<jobId>', methods=['DELETE'])
+async def cancel_forecast_job(jobId):
+	'''REST API for cancelling a queued forecasting job'''
+
+	if forecast_jobs.status(jobId) is None:
+		return Response(status=404, response="Forecasting job does not exist!\n")
+	if not forecast_jobs.cancel(jobId):
+		return Response(status=409, response="Forecasting job is running or over!\n")
+	logger.info("Forecasting job {} cancelled\n".format(jobId))
+	return Response(status=204, response="Forecasting job cancelled\n")
+
+
 @app.route('/order', methods=['POST'])
 async def get_order():
 	'''REST API for storing order'''
@@ -258,25 +447,28 @@ async def get_order():
 	order = await request.get_json()
 	order = json.loads(order)
 	storeId = order['pizza-order']['storeId']
+
+	if is_queued(workflows.get(storeId, {})):
+		await order_queue.put(storeId, [order])
+		logger.info("Order {} queued.".format(order['orderId']))
+		return Response(
+			status=202,
+			response=json.dumps({"orderId": order['orderId'], "status": "queued"})
+		)
+
 	storeID = uuid.UUID(storeId)
 	pizza_list = order['pizza-order']['pizzaList']
 	order_date = datetime.strptime(order['pizza-order']["orderDate"], '%Y-%m-%dT%H:%M:%S').date()
 
 	logger.info("Received order from {} for aggregation by stock-analyzer\n".format(order['pizza-order']['custName']))
 
-	new_date = False
-		
 	if order_date not in history[storeId]:
 		history[storeId][order_date] = await _get_ingredients_dict()		
-		new_date = True
-			
-	history[storeId][order_date] = await _aggregate_ingredients(pizza_list, history[storeId][order_date])
-	
-	
-	if new_date:		
-		await _insert_stock_tracker(history[storeId][order_date], storeID, order_date)
-	else:
-		await _update_stock_tracker(history[storeId][order_date], storeID, order_date)
+
+	ingredients = await _aggregate_ingredients(pizza_list, await _get_ingredients_dict())
+	for ingredient, quantity in ingredients.items():
+		history[storeId][order_date][ingredient] += quantity
+	tracker.add(storeID, order_date, [ingredients[item] for item in ITEMS])
 
 	
 	component = await _get_next_component(storeId)
@@ -298,6 +490,70 @@ async def get_order():
 	)
 
 
+@app.route('/orders/batch', methods=['POST'])
+async def get_order_batch():
+	'''REST API for storing a batch of orders'''
+
+	try:
+		orders = parse_batch(await request.get_data())
+	except ValueError as inst:
+		logger.info("Batch rejected, {}\n".format(inst))
+		return Response(
+			status=400,
+			response="Request rejected, batch is malformed:  " + str(inst)
+		)
+
+	logger.info("Received batch of {} orders for aggregation by stock-analyzer\n".format(len(orders)))
+
+	results, stores = split_by_store(orders, workflows)
+	store_ids = list(stores)
+	store_results = await asyncio.gather(*[
+		order_queue.submit(workflows[store_id], store_id,
+			[orders[i] for i in stores[store_id]])
+		for store_id in store_ids
+	])
+	for store_id, partial in zip(store_ids, store_results):
+		merge_results(results, stores[store_id], partial)
+
+	return Response(
+		status=200,
+		response=json.dumps({"results": results})
+	)
+
+
+@app.route('/orders/<orderId>/status', methods=['GET'])
+async def order_status(orderId):
+	'''REST API for the status of an order of a queued workflow'''
+
+	status = await order_queue.lookup(orderId)
+	if status is None:
+		logger.info("Order {} was not queued by stock-analyzer\n".format(orderId))
+		return Response(
+			status=404,
+			response="Order was not queued by stock-analyzer!\n"
+		)
+	return Response(
+		status=200,
+		response=json.dumps(status)
+	)
+
+
+@app.before_serving
+async def startup():
+	await http_client.start()
+	order_queue.start()
+	tracker.start()
+
+
+@app.after_serving
+async def shutdown():
+	await order_queue.stop()
+	#write the daily sales not written yet
+	await tracker.stop()
+	await http_client.close()
+	forecast_jobs.shutdown()
+
+
 @app.route('/workflow-requests/<storeId>', methods=['PUT'])
 async def register_workflow(storeId):
 	'''REST API for registering workflow to stock-analyzer service'''
@@ -322,6 +578,12 @@ async def register_workflow(storeId):
 		logging.info("Workflow-request rejected, cass is a required workflow component\n")
 		return Response(status=422, response="workflow-request rejected, cass is a required workflow component\n")
 
+	if data.get("forecaster", default_forecaster) not in FORECASTERS:
+		logging.info("Workflow-request rejected, unknown forecaster {}\n".format(
+			data.get("forecaster", default_forecaster)))
+		return Response(status=422, response="workflow-request rejected, forecaster must be one of " +
+			", ".join(sorted(FORECASTERS)) + "\n")
+
 	workflows[storeId] = data
 	history[storeId] = {}
 
@@ -347,6 +609,9 @@ async def teardown_workflow(storeId):
 	
 	del workflows[storeId]
 	del history[storeId]    
+	model_cache.invalidate(storeId)
+	await tracker.flush()
+	tracker.forget(uuid.UUID(storeId))
 
 	logger.info('Store::{} deleted!!\n'.format(storeId))
 	return Response(
@@ -394,6 +659,12 @@ async def update_workflow(storeId):
         logging.info("Workflow-request rejected, cass is a required workflow component\n")
         return Response(status=422, response="workflow-request rejected, cass is a required workflow component\n")
 
+    if data.get("forecaster", default_forecaster) not in FORECASTERS:
+        logging.info("Workflow-request rejected, unknown forecaster {}\n".format(
+            data.get("forecaster", default_forecaster)))
+        return Response(status=422, response="workflow-request rejected, forecaster must be one of " +
+            ", ".join(sorted(FORECASTERS)) + "\n")
+
     workflows[storeId] = data
 
     logging.info("Workflow updated for {}\n".format(storeId))
@@ -0,0 +1,257 @@
+import asyncio
+import collections
+import hashlib
+import multiprocessing
+import os
+import threading
+import time
+import uuid
+from concurrent.futures import CancelledError, ProcessPoolExecutor
+
+from src.forecasters import get_forecaster
+
+__author__ = "Randeep Ahlawat"
+__version__ = "1.0.0"
+__maintainer__ = "Randeep Ahlawat"
+__email__ = "randeep.ahalwat@utdallas.edu"
+__status__ = "Development"
+
+'''Forecasting jobs of the stock analyzer, run in a pool of worker processes so
+fitting a model never blocks the event loop serving orders.'''
+
+
+def forecast(values, days, init=None, forecaster='prophet'):
+	'''Fits a model of the forecaster to the quantities sold on past days and
+	   forecasts the following days. Runs in a worker process.
+
+		Parameters:
+			values(list): (date, quantity) of every past day.
+			days(int): Number of days to forecast.
+			init(dict): Parameters of an earlier fit of the item, which the
+				fit starts from instead of from scratch.
+			forecaster(str): Name of the forecaster, see src/forecasters.py.
+		Returns:
+			result(dict): Quantity forecast for each day, by date.
+			params(dict): Fitted parameters.
+	'''
+
+	return get_forecaster(forecaster).forecast(values, days, init)
+
+
+def forecast_items(items, values, days, init=None, forecaster='prophet'):
+	'''Fits a model of the forecaster to the quantities of every item sold on
+	   past days, all items at once, and forecasts the following days. Runs
+	   in a worker process.
+
+		Parameters:
+			items(list): Names of the items.
+			values(list): (date, quantities) of every past day, quantities
+				holding the quantity of every item of items, in order.
+			days(int): Number of days to forecast.
+			init(list): Parameters of an earlier fit of every item, or None.
+			forecaster(str): Name of the forecaster, see src/forecasters.py.
+		Returns:
+			result(dict): Forecast of each item, by item name.
+			params(list): Fitted parameters of every item.
+	'''
+
+	series = [[(date, quantities[i]) for date, quantities in values] for i in range(len(items))]
+	fitted = get_forecaster(forecaster).forecast_batch(series, days, init)
+	result = {item: value[0] for item, value in zip(items, fitted) if value is not None}
+	return result, [None if value is None else value[1] for value in fitted]
+
+
+def _set_finished(future):
+	if not future.done():
+		future.set_result(None)
+
+
+class QueueFull(Exception):
+	'''Raised when a job is submitted while capacity jobs are waiting or running'''
+
+
+class ForecastJobs(object):
+	'''Bounded queue of forecasting jobs, at most one per query of a store
+	   and item, run by a pool of worker processes. Workers are spawned rather than
+	   forked, so they do not inherit the Cassandra driver's threads.'''
+
+	def __init__(self, workers=None, capacity=64, keep=1000):
+		self.workers = workers
+		self.capacity = capacity
+		self.keep = keep
+		self._executor = None
+		self._jobs = collections.OrderedDict()
+		self._futures = {}
+		self._active = {}
+		self._finished = {}
+		#(loop, asyncio future) of the jobs awaited from an event loop
+		self._waiters = {}
+		self._lock = threading.Lock()
+
+	@classmethod
+	def from_env(cls):
+		workers = os.environ.get("FORECAST_WORKERS")
+		return cls(int(workers) if workers else None,
+			int(os.environ.get("FORECAST_QUEUE_SIZE", "64")))
+
+	def _pool(self):
+		if self._executor is None:
+			self._executor = ProcessPoolExecutor(self.workers,
+				mp_context=multiprocessing.get_context("spawn"))
+		return self._executor
+
+	def submit(self, store_id, item_name, func, *args, key=None, done=None):
+		'''Queues func(*args) as the job of the store and item and returns its
+		   ID. If a job of the same query is already queued or running, its ID
+		   is returned instead. The query is key if given, which holds
+		   everything the result depends on, such as a ModelCache key, or else
+		   the store, item, func and args. The result of the job is what
+		   done(value) returns if done is given, or func's value.'''
+
+		if key is None:
+			key = (str(store_id), item_name, func.__name__,
+				hashlib.sha1(repr(args).encode()).hexdigest())
+		with self._lock:
+			if key in self._active:
+				return self._active[key]
+			if len(self._active) >= self.capacity:
+				raise QueueFull("{} forecasting jobs already queued".format(len(self._active)))
+			job_id = str(uuid.uuid4())
+			self._jobs[job_id] = {
+				"jobId": job_id,
+				"storeId": str(store_id),
+				"itemName": item_name,
+				"status": "queued",
+				"submitted": time.time()
+			}
+			self._active[key] = job_id
+			future = self._pool().submit(func, *args)
+			self._futures[job_id] = future
+			self._finished[job_id] = threading.Event()
+			self._trim()
+		future.add_done_callback(lambda future: self._done(job_id, key, future, done))
+		return job_id
+
+	def completed(self, store_id, item_name, result):
+		'''Records a job of the store and item whose result is already known,
+		   such as a cached forecast, and returns its ID'''
+
+		job_id = str(uuid.uuid4())
+		now = time.time()
+		with self._lock:
+			self._jobs[job_id] = {
+				"jobId": job_id,
+				"storeId": str(store_id),
+				"itemName": item_name,
+				"status": "completed",
+				"submitted": now,
+				"finished": now,
+				"result": result
+			}
+			self._trim()
+		return job_id
+
+	def _trim(self):
+		#forget the oldest finished jobs beyond keep
+		finished = [job_id for job_id, job in self._jobs.items() if job_id not in self._futures]
+		for job_id in finished[:max(0, len(self._jobs) - self.keep)]:
+			del self._jobs[job_id]
+
+	def _done(self, job_id, key, future, done):
+		error = None
+		if future.cancelled():
+			status = "cancelled"
+		elif future.exception() is not None:
+			status = "failed"
+			error = future.exception()
+		else:
+			status = "completed"
+			try:
+				value = future.result()
+				result = value if done is None else done(value)
+			except Exception as inst:
+				status = "failed"
+				error = inst
+		with self._lock:
+			job = self._jobs.get(job_id)
+			self._futures.pop(job_id, None)
+			if self._active.get(key) == job_id:
+				del self._active[key]
+			if job is not None:
+				job["finished"] = time.time()
+				job["status"] = status
+				if status == "failed":
+					job["error"] = repr(error)
+					job["exception"] = error
+				elif status == "completed":
+					job["result"] = result
+			self._finished.pop(job_id).set()
+			waiter = self._waiters.pop(job_id, None)
+		if waiter is not None:
+			loop, finished = waiter
+			loop.call_soon_threadsafe(_set_finished, finished)
+
+	def status(self, job_id):
+		'''Returns the job, or None if there is no such job'''
+
+		with self._lock:
+			job = self._jobs.get(job_id)
+			if job is None:
+				return None
+			future = self._futures.get(job_id)
+			if future is not None and future.running():
+				job["status"] = "running"
+			job = dict(job)
+		job.pop("exception", None)
+		return job
+
+	def cancel(self, job_id):
+		'''Cancels a queued job. Returns False if the job is running or over.'''
+
+		with self._lock:
+			future = self._futures.get(job_id)
+		return future is not None and future.cancel()
+
+	def _result(self, job_id):
+		with self._lock:
+			job = self._jobs[job_id]
+		if job["status"] == "cancelled":
+			raise CancelledError()
+		if job["status"] == "failed":
+			raise job["exception"]
+		return job["result"]
+
+	def result(self, job_id, timeout=None):
+		'''Waits for the job and returns its result, from a thread'''
+
+		with self._lock:
+			finished = self._finished.get(job_id)
+		if finished is not None:
+			finished.wait(timeout)
+		return self._result(job_id)
+
+	async def wait(self, job_id):
+		'''Waits for the job and returns its result, from the event loop'''
+
+		with self._lock:
+			finished = None
+			if job_id in self._finished:
+				if job_id not in self._waiters:
+					loop = asyncio.get_event_loop()
+					self._waiters[job_id] = (loop, loop.create_future())
+				finished = self._waiters[job_id][1]
+		if finished is not None:
+			#shielded, so a waiter that is cancelled leaves the others waiting
+			await asyncio.shield(finished)
+		return self._result(job_id)
+
+	def shutdown(self):
+		'''Cancels the queued jobs and stops the workers once the running
+		   jobs are over'''
+
+		with self._lock:
+			futures = list(self._futures.values())
+		for future in futures:
+			future.cancel()
+		if self._executor is not None:
+			self._executor.shutdown(wait=False)
@@ -0,0 +1,205 @@
+import datetime
+import itertools
+
+import numpy as np
+
+__author__ = "Randeep Ahlawat"
+__version__ = "1.0.0"
+__maintainer__ = "Randeep Ahlawat"
+__email__ = "randeep.ahalwat@utdallas.edu"
+__status__ = "Development"
+
+'''Forecasters of the stock analyzer. Every forecaster fits the quantities of
+   an item sold on past days and forecasts the following days, through
+   forecast(values, days, init) for one item and forecast_batch(series, days,
+   inits) for many at once. FORECASTERS holds them by the name a workflow
+   selects them with.'''
+
+
+def _day(value):
+	'''Day number of a date, datetime, Cassandra Date or ISO date string'''
+
+	return int(np.datetime64(str(value)[:10], 'D').astype(np.int64))
+
+
+def _date(day):
+	return np.datetime64(day, 'D').astype(datetime.date).strftime("%m/%d/%Y")
+
+
+def _daily(values):
+	'''Quantity sold on every day from the first to the last date of values,
+	   a day without sales having sold nothing, and the last day'''
+
+	days = np.array([_day(date) for date, quantity in values], dtype=np.int64)
+	quantities = np.array([quantity for date, quantity in values], dtype=np.float64)
+	sold = np.zeros(days.max() - days.min() + 1)
+	np.add.at(sold, days - days.min(), quantities)
+	return sold, int(days.max())
+
+
+class Prophet(object):
+	'''Facebook Prophet, imported by the first fit so the processes that
+	   never fit a Prophet model do not pay for its import'''
+
+	name = 'prophet'
+
+	@staticmethod
+	def _fit(df, init):
+		from fbprophet import Prophet
+
+		m = Prophet()
+		if init is None:
+			m.fit(df)
+		else:
+			m.fit(df, init=init)
+		return m
+
+	def forecast(self, values, days, init=None):
+		'''Fits a Prophet model to the quantities sold on past days and
+		   forecasts the following days.
+
+			Parameters:
+				values(list): (date, quantity) of every past day.
+				days(int): Number of days to forecast.
+				init(dict): Parameters of an earlier fit of the item, which
+					the fit starts from instead of from scratch.
+			Returns:
+				result(dict): Quantity forecast for each day, by date.
+				params(dict): Fitted parameters.
+		'''
+
+		import pandas as pd
+
+		df = pd.DataFrame(values, columns=['ds', 'y'])
+		try:
+			m = self._fit(df, init)
+		except Exception:
+			if init is None:
+				raise
+			#the earlier parameters do not fit this history, start over
+			m = self._fit(df, None)
+		future = m.make_future_dataframe(periods=days, freq='d', include_history=False)
+		forecast = m.predict(future)
+		result = {date.strftime("%m/%d/%Y"): prediction
+			for date, prediction in zip(forecast['ds'].tolist(), forecast['yhat'].tolist())}
+		params = {name: float(m.params[name][0][0]) for name in ('k', 'm', 'sigma_obs')}
+		params.update({name: m.params[name][0] for name in ('delta', 'beta')})
+		return result, params
+
+	def forecast_batch(self, series, days, inits=None):
+		'''Forecasts of every (date, quantity) list of series, one fit each,
+		   starting from the parameters of inits if given. An empty list gets
+		   None.'''
+
+		inits = inits or [None] * len(series)
+		return [self.forecast(values, days, init) if values else None
+			for values, init in zip(series, inits)]
+
+
+class HoltWinters(object):
+	'''Additive Holt-Winters exponential smoothing with a weekly season.
+
+	   Every series of a batch is laid out as a row of one matrix, ending on
+	   the same column, and smoothed with every (alpha, beta, gamma) of the
+	   grid at once, a step per day across all rows and the whole grid. Each
+	   series keeps the smoothing factors with the least squared one day
+	   ahead error, so a batch of any size is fitted in one pass over its
+	   longest history.'''
+
+	name = 'holt-winters'
+
+	def __init__(self, season=7, alphas=(0.1, 0.2, 0.4, 0.6, 0.8),
+			betas=(0.0, 0.05, 0.15), gammas=(0.05, 0.15, 0.3, 0.5)):
+		self.season = season
+		self.grid = np.array(list(itertools.product(alphas, betas, gammas))).T
+
+	def forecast(self, values, days, init=None):
+		'''Fits the quantities sold on past days and forecasts the following
+		   days, returning the forecast for each day by date and the
+		   smoothing factors. The grid search is cheap, so init is unused.'''
+
+		if not values:
+			raise ValueError("no sales to fit")
+		return self.forecast_batch([values], days)[0]
+
+	def forecast_batch(self, series, days, inits=None):
+		'''Forecasts of every (date, quantity) list of series, in order, as
+		   (result, params) tuples. An empty list gets None, and inits is
+		   unused.'''
+
+		fitted = [i for i, values in enumerate(series) if values]
+		results = [None] * len(series)
+		if not fitted:
+			return results
+
+		m = self.season
+		daily = [_daily(series[i]) for i in fitted]
+		lengths = np.array([len(sold) for sold, last in daily])
+		length = lengths.max()
+		rows = np.arange(len(daily))
+
+		#right aligned, so the last day of every series is the last column
+		sold = np.full((len(daily), length), np.nan)
+		for row, (quantities, last) in enumerate(daily):
+			sold[row, length - len(quantities):] = quantities
+		first = length - lengths
+
+		#a series with two seasons starts from the mean and trend of its
+		#first two weeks, a shorter one from its first day without a season
+		whole = lengths >= 2 * m
+		window = sold[rows[:, None], np.minimum(first[:, None] + np.arange(2 * m), length - 1)]
+		mean = window[:, :m].mean(axis=1)
+		level = np.where(whole, mean, window[:, 0])
+		trend = np.where(whole, (window[:, m:].mean(axis=1) - mean) / m, 0.0)
+		season = np.zeros((len(daily), m))
+		season[rows[:, None], (first[:, None] + np.arange(m)) % m] = np.where(
+			whole[:, None], window[:, :m] - mean[:, None], 0.0)
+		begin = np.where(whole, first + m, first + 1)
+
+		alpha, beta, gamma = self.grid
+		shape = (len(daily), self.grid.shape[1])
+		level = np.broadcast_to(level[:, None], shape).copy()
+		trend = np.broadcast_to(trend[:, None], shape).copy()
+		season = np.broadcast_to(season[:, None, :], shape + (m,)).copy()
+		errors = np.zeros(shape)
+
+		for t in range(begin.min(), length):
+			active = (t >= begin)[:, None]
+			y = np.where(active, sold[:, t, None], 0.0)
+			last_season = season[:, :, t % m]
+			error = y - (level + trend + last_season)
+			errors += np.where(active, error * error, 0.0)
+			new_level = alpha * (y - last_season) + (1 - alpha) * (level + trend)
+			new_trend = beta * (new_level - level) + (1 - beta) * trend
+			new_season = gamma * (y - new_level) + (1 - gamma) * last_season
+			level = np.where(active, new_level, level)
+			trend = np.where(active, new_trend, trend)
+			season[:, :, t % m] = np.where(active, new_season, last_season)
+
+		best = errors.argmin(axis=1)
+		ahead = np.arange(1, days + 1)
+		predictions = (level[rows, best][:, None] + trend[rows, best][:, None] * ahead +
+			season[rows, best][:, (length - 1 + ahead) % m])
+		#nothing sells fewer than none
+		predictions = np.maximum(predictions, 0.0)
+
+		for row, i in enumerate(fitted):
+			last = daily[row][1]
+			result = {_date(last + day): prediction
+				for day, prediction in zip(ahead.tolist(), predictions[row].tolist())}
+			params = dict(zip(('alpha', 'beta', 'gamma'), self.grid[:, best[row]].tolist()))
+			results[i] = (result, params)
+		return results
+
+
+#Forecasters by the name a workflow's forecaster field selects
+FORECASTERS = {forecaster.name: forecaster for forecaster in (Prophet(), HoltWinters())}
+
+
+def get_forecaster(name):
+	'''Returns the forecaster of a name, raising ValueError for an unknown one'''
+
+	if name not in FORECASTERS:
+		raise ValueError("unknown forecaster '{}', expected one of {}".format(
+			name, ", ".join(sorted(FORECASTERS))))
+	return FORECASTERS[name]
@@ -0,0 +1,92 @@
+import collections
+import hashlib
+import os
+import threading
+
+__author__ = "Randeep Ahlawat"
+__version__ = "1.0.0"
+__maintainer__ = "Randeep Ahlawat"
+__email__ = "randeep.ahalwat@utdallas.edu"
+__status__ = "Development"
+
+'''Cache of the fitted models and forecasts of the stock analyzer'''
+
+
+class ModelCache(object):
+	'''Keeps the parameters of the last model fitted for every store and item,
+	   with the last date of the history it was fitted to, so the next fit
+	   starts from them, and the forecasts of the last size queries, so a
+	   query repeated over the same sales is answered without a fit.'''
+
+	def __init__(self, size=256):
+		self.size = size
+		self.hits = 0
+		self.misses = 0
+		self._params = {}
+		self._forecasts = collections.OrderedDict()
+		self._lock = threading.Lock()
+
+	@classmethod
+	def from_env(cls):
+		return cls(int(os.environ.get("FORECAST_CACHE_SIZE", "256")))
+
+	@staticmethod
+	def key(store_id, item_name, values, days, forecaster='prophet'):
+		'''Key of the forecast of the next days from the sales values by a
+		   forecaster, which changes with the last date of the history or any
+		   quantity in it'''
+
+		digest = hashlib.sha1(repr(sorted(values)).encode()).hexdigest()
+		last_date = max(date for date, quantity in values) if values else None
+		return (str(store_id), item_name, forecaster, days, str(last_date), digest)
+
+	def get(self, key):
+		'''Returns the cached forecast of key, or None'''
+
+		with self._lock:
+			result = self._forecasts.get(key)
+			if result is None:
+				self.misses += 1
+				return None
+			self._forecasts.move_to_end(key)
+			self.hits += 1
+			return result
+
+	def params(self, store_id, item_name, forecaster='prophet'):
+		'''Returns the parameters of the last model of the store and item
+		   fitted by the forecaster, or None'''
+
+		with self._lock:
+			entry = self._params.get((str(store_id), item_name, forecaster))
+			return None if entry is None else entry[1]
+
+	def put(self, key, result, params):
+		'''Keeps the forecast of key and the parameters of its model'''
+
+		store_id, item_name, forecaster, days, last_date, digest = key
+		with self._lock:
+			self._forecasts[key] = result
+			self._forecasts.move_to_end(key)
+			while len(self._forecasts) > self.size:
+				self._forecasts.popitem(last=False)
+			self._params[(store_id, item_name, forecaster)] = (last_date, params)
+		return result
+
+	def invalidate(self, store_id):
+		'''Drops the models and forecasts of a store'''
+
+		store_id = str(store_id)
+		with self._lock:
+			for key in [key for key in self._forecasts if key[0] == store_id]:
+				del self._forecasts[key]
+			for key in [key for key in self._params if key[0] == store_id]:
+				del self._params[key]
+
+	def stats(self):
+		with self._lock:
+			return {
+				"hits": self.hits,
+				"misses": self.misses,
+				"forecasts": len(self._forecasts),
+				"models": len(self._params)
+			}
@@ -0,0 +1,143 @@
+"""Pizza recipes as count matrices
+
+Components turn pizzas into the items they use to price them, to check and
+restock a store's stock, and to track its daily usage. The recipe engine
+encodes the pizzas of one order or of a whole batch as a NumPy matrix with a
+row per pizza and a column per item of ITEMS, holding the amount of the item
+the pizza uses. The cost of every pizza is then the product of the matrix
+and a price vector, and order totals and the items each order needs are
+sums of its rows, so pricing thousands of pizzas takes a few array
+operations rather than a dict update per ingredient.
+"""
+import itertools
+
+import numpy as np
+
+__author__ = "Chris Scott"
+__version__ = "1.0.0"
+__maintainer__ = "Chris Scott"
+__email__ = "cms190009@utdallas.edu"
+__status__ = "Development"
+
+# Every item, in column order
+ITEMS = [
+    'Dough',        'SpicySauce',   'TraditionalSauce', 'Cheese',
+    'Pepperoni',    'Sausage',      'Beef',             'Onion',
+    'Chicken',      'Peppers',      'Olives',           'Bacon',
+    'Pineapple',    'Mushrooms'
+]
+COLUMNS = {name: column for column, name in enumerate(ITEMS)}
+
+# (item, amount) used by each crust, sauce and cheese amount
+CRUSTS = {"Thin": ("Dough", 1), "Traditional": ("Dough", 2)}
+SAUCES = {"Spicy": ("SpicySauce", 1), "Traditional": ("TraditionalSauce", 1)}
+CHEESES = {
+    "None": ("Cheese", 0),  "Light": ("Cheese", 1),
+    "Normal": ("Cheese", 2), "Extra": ("Cheese", 3)
+}
+
+# Column of each topping, one of which is used per topping listed
+TOPPINGS = {name: COLUMNS[name] for name in ITEMS[4:]}
+
+
+def _base_rows():
+    bases = dict()
+    rows = list()
+    for crust, sauce, cheese in itertools.product(CRUSTS, SAUCES, CHEESES):
+        row = np.zeros(len(ITEMS), dtype=np.int64)
+        for name, amount in (CRUSTS[crust], SAUCES[sauce], CHEESES[cheese]):
+            row[COLUMNS[name]] += amount
+        bases[(crust, sauce, cheese)] = len(rows)
+        rows.append(row)
+    return bases, np.array(rows)
+
+
+# Row of every crust, sauce and cheese combination, and its index
+_BASES, _BASE_ROWS = _base_rows()
+
+
+def _parse(pizza_list):
+    bases = list()
+    toppings = list()
+    for row, pizza in enumerate(pizza_list):
+        key = (pizza["crustType"], pizza["sauceType"], pizza["cheeseAmt"])
+        if key not in _BASES:
+            raise ValueError("unknown crust, sauce or cheese amount {}".format(key))
+        bases.append(_BASES[key])
+        for topping in pizza["toppingList"]:
+            if topping not in TOPPINGS:
+                raise ValueError("unknown ingredient '{}'".format(topping))
+            toppings.append(row * len(ITEMS) + TOPPINGS[topping])
+    return bases, toppings
+
+
+def encode(pizza_lists, errors=None):
+    """Returns the count matrix of the pizzas of a batch of orders, and the
+    order of every row
+
+    pizza_lists holds the pizzaList of every order. Rows are in order, and
+    an order without pizzas has no rows. An unknown ingredient raises
+    ValueError, and a malformed pizza KeyError or TypeError, unless errors is
+    a dict, in which case the order gets no rows and errors[order] is set to
+    the exception.
+    """
+    bases = list()
+    orders = list()
+    toppings = list()
+
+    for order, pizza_list in enumerate(pizza_lists):
+        try:
+            order_bases, order_toppings = _parse(pizza_list)
+        except (KeyError, TypeError, ValueError) as inst:
+            if errors is None:
+                raise
+            errors[order] = inst
+            continue
+        # topping cells of the order, shifted past the rows before it
+        offset = len(bases) * len(ITEMS)
+        toppings.extend(cell + offset for cell in order_toppings)
+        bases.extend(order_bases)
+        orders.extend([order] * len(order_bases))
+
+    counts = _BASE_ROWS[np.array(bases, dtype=np.intp)]
+    if toppings:
+        counts += np.bincount(toppings, minlength=counts.size).reshape(counts.shape)
+    return counts, np.array(orders, dtype=np.intp)
+
+
+def price_vector(prices):
+    """Price of every item of ITEMS from a dict of prices by name. An item
+    without a price costs nothing."""
+    return np.array([prices.get(name, 0.0) for name in ITEMS], dtype=np.float64)
+
+
+def pizza_costs(counts, prices):
+    """Cost of every pizza of a count matrix"""
+    return counts @ price_vector(prices)
+
+
+def order_totals(costs, orders, order_count):
+    """Total cost of each of order_count orders from the cost of every pizza"""
+    return np.bincount(orders, weights=costs, minlength=order_count)
+
+
+def order_demand(counts, orders, order_count):
+    """Amount of every item each of order_count orders needs, one row per
+    order"""
+    # rows are in order, so an order's demand is the difference of the
+    # running sums at its first row and past its last
+    sums = np.zeros((len(counts) + 1, len(ITEMS)), dtype=counts.dtype)
+    np.cumsum(counts, axis=0, out=sums[1:])
+    order_range = np.arange(order_count)
+    return (sums[np.searchsorted(orders, order_range, side="right")] -
+            sums[np.searchsorted(orders, order_range, side="left")])
+
+
+def ingredient_set(row):
+    """The (item, amount) set of a pizza, as stored in the pizzas table"""
+    return {(ITEMS[column], int(row[column])) for column in np.flatnonzero(row)}
+
+
+def item_amounts(row):
+    """The amount of every item of a row, as a dict by name"""
+    return dict(zip(ITEMS, row.tolist()))
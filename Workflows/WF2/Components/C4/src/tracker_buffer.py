@@ -0,0 +1,118 @@
+import asyncio
+import logging
+import os
+
+import numpy as np
+
+__author__ = "Randeep Ahlawat"
+__version__ = "1.0.0"
+__maintainer__ = "Randeep Ahlawat"
+__email__ = "randeep.ahalwat@utdallas.edu"
+__status__ = "Development"
+
+'''Write-behind buffer of the daily quantities sold by every store, written to
+stockTrackerByDay in batches instead of once per order.'''
+
+logger = logging.getLogger(__name__)
+
+
+class TrackerBuffer(object):
+	'''Adds up the items of the orders of each store and day in memory, as a
+	   vector of the quantity of every item of items, and writes the vectors
+	   that changed every interval seconds, or once size orders are waiting,
+	   whichever comes first.
+
+	   write(rows) stores (storeID, dateSold, quantitiesSold) rows, one per
+	   store and day, and blocks, so it runs in the loop's executor.'''
+
+	def __init__(self, write, items, interval=5.0, size=500):
+		self.write = write
+		self.items = items
+		self.interval = interval
+		self.size = size
+		self.writes = 0
+		self._totals = {}
+		self._dirty = set()
+		self._pending = 0
+		self._task = None
+		self._flush_due = False
+		#flushes are made one at a time, so older totals never overwrite newer
+		self._lock = None
+
+	@classmethod
+	def from_env(cls, write, items):
+		return cls(write, items,
+			float(os.environ.get("TRACKER_FLUSH_INTERVAL", "5")),
+			int(os.environ.get("TRACKER_FLUSH_SIZE", "500")))
+
+	def add(self, store_id, day, amounts):
+		'''Adds the quantity of every item of an order of the store, sold on
+		   day, in the order of items, to its totals'''
+
+		totals = self._totals.get((store_id, day))
+		if totals is None:
+			totals = self._totals[(store_id, day)] = np.zeros(len(self.items))
+		totals += amounts
+		self._dirty.add((store_id, day))
+		self._pending += 1
+		if self._pending >= self.size and not self._flush_due:
+			self._flush_due = True
+			asyncio.ensure_future(self.flush())
+
+	def totals(self, store_id, day):
+		'''The totals of the store and day by item name, or None'''
+
+		totals = self._totals.get((store_id, day))
+		return None if totals is None else dict(zip(self.items, totals.tolist()))
+
+	async def flush(self):
+		'''Writes the totals of the store days changed since the last flush'''
+
+		if self._lock is None:
+			self._lock = asyncio.Lock()
+		async with self._lock:
+			dirty, self._dirty = self._dirty, set()
+			self._pending = 0
+			self._flush_due = False
+			rows = [(store_id, day, self._totals[(store_id, day)].tolist())
+				for store_id, day in dirty]
+			if not rows:
+				return
+			try:
+				await asyncio.get_event_loop().run_in_executor(None, self.write, rows)
+			except asyncio.CancelledError:
+				#stopped before the write was made, the next flush makes it
+				self._dirty |= dirty
+				raise
+			except Exception as inst:
+				#written with the next flush
+				self._dirty |= dirty
+				logger.info("Stock tracker flush failed: {!r}".format(inst))
+			else:
+				self.writes += len(rows)
+
+	def forget(self, store_id):
+		'''Drops the totals of a store, once they are written'''
+
+		for key in [key for key in self._totals if key[0] == store_id]:
+			if key not in self._dirty:
+				del self._totals[key]
+
+	async def _run(self):
+		while True:
+			await asyncio.sleep(self.interval)
+			await self.flush()
+
+	def start(self):
+		self._task = asyncio.ensure_future(self._run())
+
+	async def stop(self):
+		'''Stops flushing on an interval and writes what is left'''
+
+		if self._task is not None:
+			self._task.cancel()
+			try:
+				await self._task
+			except asyncio.CancelledError:
+				pass
+		await self.flush()
@@ -0,0 +1,136 @@
+import asyncio
+import concurrent.futures
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from src.forecast_jobs import ForecastJobs, QueueFull  # noqa: E402
+
+__author__ = "Randeep Ahlawat"
+__version__ = "1.0.0"
+__maintainer__ = "Randeep Ahlawat"
+__email__ = "randeep.ahalwat@utdallas.edu"
+__status__ = "Development"
+
+'''Checks of the forecasting job queue of src/forecast_jobs.py, with a stand-in
+for the model fit.
+
+run from the C4 folder with `python -m pytest tests/forecast_jobs_test.py`
+'''
+
+
+def fit(seconds, value):
+	'''Busy for the given seconds, the way fitting a model is'''
+
+	end = time.time() + seconds
+	while time.time() < end:
+		pass
+	if value is None:
+		raise ValueError("no sales")
+	return {"12/01/2020": value}
+
+
+def test_jobs_run_in_parallel_off_the_loop():
+	jobs = ForecastJobs(workers=2)
+	try:
+		fit_time = 1.0
+		job_ids = [jobs.submit("store", item, fit, fit_time, index)
+			for index, item in enumerate(['Dough', 'TraditionalSauce'])]
+
+		async def serve():
+			ticks = 0
+			waiting = asyncio.ensure_future(asyncio.gather(*[jobs.wait(job_id) for job_id in job_ids]))
+			while not waiting.done():
+				await asyncio.sleep(0.01)
+				ticks += 1
+			return ticks, await waiting
+
+		start = time.time()
+		ticks, results = asyncio.run(serve())
+		elapsed = time.time() - start
+		assert results == [{"12/01/2020": 0}, {"12/01/2020": 1}]
+		#the loop kept running while the models were fitted
+		assert ticks > 20
+		#workers take a while to spawn, yet two fits take less than twice one
+		assert elapsed < 2 * fit_time + 1.5
+		assert jobs.status(job_ids[0])["status"] == "completed"
+	finally:
+		jobs.shutdown()
+
+
+def test_waiting_holds_no_executor_thread():
+	jobs = ForecastJobs(workers=1)
+	try:
+		job_id = jobs.submit("store", "Dough", fit, 1.0, 3)
+
+		async def serve():
+			loop = asyncio.get_event_loop()
+			loop.set_default_executor(concurrent.futures.ThreadPoolExecutor(1))
+			waiters = [asyncio.ensure_future(jobs.wait(job_id)) for _ in range(50)]
+			await asyncio.sleep(0.1)
+			#the one executor thread is still free while every request waits
+			assert not any(waiter.done() for waiter in waiters)
+			assert await asyncio.wait_for(loop.run_in_executor(None, sum, [1, 2]), 0.5) == 3
+			#a request that gives up leaves the others waiting
+			waiters[0].cancel()
+			return await asyncio.gather(*waiters[1:])
+
+		assert asyncio.run(serve()) == [{"12/01/2020": 3}] * 49
+		assert asyncio.run(jobs.wait(job_id)) == {"12/01/2020": 3}
+	finally:
+		jobs.shutdown()
+
+
+def test_one_job_per_query_and_bounded_queue():
+	jobs = ForecastJobs(workers=1, capacity=3)
+	try:
+		first = jobs.submit("store", 'Dough', fit, 0.5, 1)
+		assert jobs.submit("store", 'Dough', fit, 0.5, 1) == first
+		#another query of the same item is another job, with its own result
+		other = jobs.submit("store", 'Dough', fit, 0.5, 2)
+		assert other != first
+		keyed = jobs.submit("store", 'Dough', fit, 0, 5, key=("store", 'Dough', 14))
+		assert jobs.submit("store", 'Dough', fit, 0, 6, key=("store", 'Dough', 14)) == keyed
+		try:
+			jobs.submit("store", 'Cheese', fit, 0.5, 4)
+		except QueueFull:
+			pass
+		else:
+			assert False, "queue is not bounded"
+		assert jobs.result(first) == {"12/01/2020": 1}
+		assert jobs.result(other) == {"12/01/2020": 2}
+		assert jobs.result(keyed) == {"12/01/2020": 5}
+		assert not jobs.cancel(first)
+	finally:
+		jobs.shutdown()
+
+
+def test_queued_job_is_cancelled():
+	jobs = ForecastJobs(workers=1)
+	try:
+		running = jobs.submit("store", 'Dough', fit, 0.5, 1)
+		queued = jobs.submit("store", 'TraditionalSauce', fit, 0.5, 3)
+		assert jobs.cancel(queued) or jobs.status(queued)["status"] != "queued"
+		assert jobs.result(running) == {"12/01/2020": 1}
+		time.sleep(0.1)
+		assert jobs.status(queued)["status"] in ("cancelled", "completed")
+	finally:
+		jobs.shutdown()
+
+
+def test_failed_job():
+	jobs = ForecastJobs(workers=1)
+	try:
+		job_id = jobs.submit("store", 'Dough', fit, 0, None)
+		try:
+			jobs.result(job_id)
+		except ValueError:
+			pass
+		time.sleep(0.1)
+		job = jobs.status(job_id)
+		assert job["status"] == "failed"
+		assert "no sales" in job["error"]
+	finally:
+		jobs.shutdown()
@@ -0,0 +1,168 @@
+import datetime
+import importlib.util
+import math
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from src.forecast_jobs import forecast_items  # noqa: E402
+from src.forecasters import FORECASTERS, HoltWinters, get_forecaster  # noqa: E402
+from src.recipe import ITEMS  # noqa: E402
+
+__author__ = "Randeep Ahlawat"
+__version__ = "1.0.0"
+__maintainer__ = "Randeep Ahlawat"
+__email__ = "randeep.ahalwat@utdallas.edu"
+__status__ = "Development"
+
+'''Accuracy and latency of the forecasters of src/forecasters.py.
+
+Holds out the last week of the daily sales of a number of stores and items,
+forecasts it with every forecaster from the days before, and prints the mean
+absolute percentage error and the time taken, one series at a time and, for
+Holt-Winters, the whole batch at once. Then times the forecast of every item
+of a store against that of a single item.
+
+run from the C4 folder with `python tests/forecasters_benchmark.py`, which
+needs fbprophet to time Prophet, or run the checks with
+`python -m pytest tests/forecasters_benchmark.py`
+'''
+
+START = datetime.date(2020, 6, 1)
+WEEK = 7
+
+
+def make_sales(days, level=40.0, slope=0.2, swing=10.0, noise=3.0, start=START):
+	'''Daily sales with a trend, a weekly cycle and noise'''
+
+	return [(start + datetime.timedelta(days=day),
+		level + day * slope + swing * math.sin(2 * math.pi * day / 7) + random.gauss(0, noise))
+		for day in range(days)]
+
+
+def make_series(count, days):
+	return [make_sales(days, level=random.uniform(20, 80), slope=random.uniform(-0.1, 0.3),
+		swing=random.uniform(2, 15)) for _ in range(count)]
+
+
+def error(result, actual):
+	'''Mean absolute percentage error of a forecast over the held out days'''
+
+	forecast = [result[date.strftime("%m/%d/%Y")] for date, quantity in actual]
+	return sum(abs(f - quantity) / quantity for f, (date, quantity) in zip(forecast, actual)) / len(actual)
+
+
+def test_weekly_cycle_is_learned():
+	random.seed(4)
+	values = make_sales(63, noise=1.0)
+	result, params = get_forecaster('holt-winters').forecast(values[:-WEEK], WEEK)
+	assert error(result, values[-WEEK:]) < 0.08
+	assert set(params) == {'alpha', 'beta', 'gamma'}
+	#a weekly cycle is better than the mean of the history
+	mean = sum(quantity for date, quantity in values[:-WEEK]) / (len(values) - WEEK)
+	assert error(result, values[-WEEK:]) < error(
+		{date.strftime("%m/%d/%Y"): mean for date, quantity in values}, values[-WEEK:])
+
+
+def test_batch_matches_one_at_a_time():
+	random.seed(5)
+	holt_winters = HoltWinters()
+	#different lengths, last dates, gaps and one series too short for a season
+	series = [make_sales(40), make_sales(25, start=START + datetime.timedelta(days=3)),
+		make_sales(30)[::2], make_sales(5), []]
+	batch = holt_winters.forecast_batch(series, 3)
+	assert batch[-1] is None
+	for values, (result, params) in zip(series[:-1], batch):
+		alone, alone_params = holt_winters.forecast(values, 3)
+		assert alone_params == params
+		assert list(result) == list(alone)
+		assert all(abs(result[date] - alone[date]) < 1e-9 for date in result)
+	last = series[1][-1][0]
+	assert list(batch[1][0]) == [(last + datetime.timedelta(days=day)).strftime("%m/%d/%Y")
+		for day in (1, 2, 3)]
+
+
+def test_missing_days_sold_nothing():
+	values = [(START + datetime.timedelta(days=day), 10.0) for day in range(0, 42, 2)]
+	result, params = get_forecaster('holt-winters').forecast(values, WEEK)
+	#every other day sells 10, so a day sells 5 on average
+	assert all(0.0 <= prediction <= 10.0 for prediction in result.values())
+	assert 4.0 < sum(result.values()) / WEEK < 6.0
+
+
+def test_every_item_of_a_store_at_once():
+	random.seed(6)
+	sales = [make_sales(35, level=level) for level in range(10, 10 + 2 * len(ITEMS), 2)]
+	values = [(day[0][0], [quantity for date, quantity in day]) for day in zip(*sales)]
+	#an item never sold is forecast to sell little
+	values = [(date, quantities[:-1] + [0.0]) for date, quantities in values]
+	result, params = forecast_items(ITEMS, values, 3, forecaster='holt-winters')
+	assert list(result) == ITEMS and len(params) == len(ITEMS)
+	for item, item_sales in zip(ITEMS[:-1], sales):
+		alone, alone_params = get_forecaster('holt-winters').forecast(item_sales, 3)
+		assert result[item] == alone
+	assert max(result[ITEMS[-1]].values()) < 1e-9
+	assert forecast_items(ITEMS, [], 3, forecaster='holt-winters') == ({}, [None] * len(ITEMS))
+
+
+def test_unknown_forecaster():
+	assert sorted(FORECASTERS) == ['holt-winters', 'prophet']
+	try:
+		get_forecaster('arima')
+	except ValueError:
+		pass
+	else:
+		assert False, "unknown forecaster accepted"
+
+
+def measure(func, *args):
+	start = time.perf_counter()
+	result = func(*args)
+	return time.perf_counter() - start, result
+
+
+def report(name, series, seconds, results):
+	errors = [error(result, values[-WEEK:]) for values, (result, params) in zip(series, results)]
+	print("{:<26} {:>4} series   {:>9.1f} ms   {:>7.2f} ms/series   MAPE {:>5.1f}%".format(
+		name, len(series), seconds * 1000, seconds * 1000 / len(series),
+		100 * sum(errors) / len(errors)))
+
+
+def main():
+	random.seed(1)
+	series = make_series(200, 90)
+	history = [values[:-WEEK] for values in series]
+	holt_winters = get_forecaster('holt-winters')
+
+	seconds, results = measure(holt_winters.forecast_batch, history, WEEK)
+	report("holt-winters, one batch", series, seconds, results)
+	seconds, results = measure(lambda: [holt_winters.forecast(values, WEEK) for values in history])
+	report("holt-winters, one by one", series, seconds, results)
+
+	#a store's sales of every item, one vector per day
+	store = [(day[0][0], [quantity for date, quantity in day]) for day in zip(*series[:len(ITEMS)])]
+	one, _ = measure(lambda: [forecast_items(ITEMS[:1], store, WEEK, forecaster='holt-winters')
+		for _ in range(100)])
+	every, _ = measure(lambda: [forecast_items(ITEMS, store, WEEK, forecaster='holt-winters')
+		for _ in range(100)])
+	print("holt-winters, store of {:>2} items   {:>7.2f} ms, one item {:>7.2f} ms".format(
+		len(ITEMS), every * 10, one * 10))
+
+	if importlib.util.find_spec("fbprophet") is None:
+		print("fbprophet is not installed, Prophet is not timed")
+		return
+	#Prophet takes seconds per fit, time a sample
+	sample = series[:20]
+	prophet = get_forecaster('prophet')
+	start = time.perf_counter()
+	prophet.forecast(history[0], WEEK)
+	print("{:<26} {:>9.1f} ms".format("prophet, import and fit", (time.perf_counter() - start) * 1000))
+	seconds, results = measure(prophet.forecast_batch, [values[:-WEEK] for values in sample], WEEK)
+	report("prophet, one by one", sample, seconds, results)
+
+
+if __name__ == "__main__":
+	main()
@@ -0,0 +1,108 @@
+import datetime
+import math
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from src.forecast_jobs import ForecastJobs, forecast  # noqa: E402
+from src.model_cache import ModelCache  # noqa: E402
+
+__author__ = "Randeep Ahlawat"
+__version__ = "1.0.0"
+__maintainer__ = "Randeep Ahlawat"
+__email__ = "randeep.ahalwat@utdallas.edu"
+__status__ = "Development"
+
+'''Benchmark of forecasting with the model cache of src/model_cache.py.
+
+Times, through the forecasting job queue, a first forecast fitted from
+scratch, the same query repeated, and a forecast after one more day of sales,
+fitted from scratch and starting from the cached model.
+
+run from the C4 folder with `python tests/model_cache_benchmark.py`, which
+needs fbprophet, or run the checks with
+`python -m pytest tests/model_cache_benchmark.py`
+'''
+
+START = datetime.datetime(2020, 6, 1)
+
+
+def make_sales(days):
+	'''Daily sales with a trend, a weekly cycle and noise'''
+
+	return [(START + datetime.timedelta(days=day),
+		40 + day * 0.2 + 10 * math.sin(2 * math.pi * day / 7) + random.gauss(0, 3))
+		for day in range(days)]
+
+
+def predict(jobs, cache, values, days, warm=True):
+	'''Forecast of the store's Dough sales, the way the stock analyzer asks for it'''
+
+	key = ModelCache.key("store", 'Dough', values, days)
+	result = cache.get(key)
+	if result is not None:
+		return result
+	params = cache.params("store", 'Dough') if warm else None
+	job_id = jobs.submit("store", 'Dough', forecast, values, days, params,
+		key=key, done=lambda value: cache.put(key, *value))
+	return jobs.result(job_id)
+
+
+def test_repeat_query_is_cached():
+	cache = ModelCache(size=2)
+	values = make_sales(30)
+	key = ModelCache.key("store", 'Dough', values, 7)
+	assert cache.get(key) is None
+	cache.put(key, {"07/01/2020": 50.0}, {"k": 0.1})
+	assert cache.get(ModelCache.key("store", 'Dough', list(values), 7)) == {"07/01/2020": 50.0}
+	assert cache.params("store", 'Dough') == {"k": 0.1}
+	#a new day, or a changed quantity, is a new query
+	assert ModelCache.key("store", 'Dough', make_sales(31), 7) != key
+	assert ModelCache.key("store", 'Dough', values[:-1] + [(values[-1][0], 0)], 7) != key
+	assert ModelCache.key("store", 'Dough', values, 8) != key
+	cache.invalidate("store")
+	assert cache.get(key) is None and cache.params("store", 'Dough') is None
+
+
+def test_cache_is_bounded():
+	cache = ModelCache(size=2)
+	keys = [ModelCache.key("store", 'Dough', make_sales(days), 7) for days in (10, 11, 12)]
+	for key in keys:
+		cache.put(key, {}, {})
+	assert cache.get(keys[0]) is None
+	assert cache.get(keys[2]) == {}
+
+
+def measure(func, *args, **kwargs):
+	start = time.perf_counter()
+	result = func(*args, **kwargs)
+	return time.perf_counter() - start, result
+
+
+def main():
+	jobs = ForecastJobs(workers=1)
+	cache = ModelCache()
+	values = make_sales(120)
+	#spawn the worker and import Prophet there first
+	predict(jobs, ModelCache(), make_sales(30), 7)
+
+	cold, _ = measure(predict, jobs, cache, values, 7)
+	repeat, _ = measure(predict, jobs, cache, values, 7)
+	more = values + make_sales(121)[-1:]
+	refit_cold, _ = measure(predict, jobs, ModelCache(), more, 7)
+	refit_warm, _ = measure(predict, jobs, cache, more, 7)
+	jobs.shutdown()
+
+	print("first forecast             {:>9.1f} ms".format(cold * 1000))
+	print("repeated query             {:>9.3f} ms   {:>8.0f}x faster".format(
+		repeat * 1000, cold / repeat))
+	print("one more day, from scratch {:>9.1f} ms".format(refit_cold * 1000))
+	print("one more day, warm start   {:>9.1f} ms".format(refit_warm * 1000))
+	print(cache.stats())
+
+
+if __name__ == "__main__":
+	main()
@@ -0,0 +1,86 @@
+import asyncio
+import datetime
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from src.tracker_buffer import TrackerBuffer  # noqa: E402
+
+__author__ = "Randeep Ahlawat"
+__version__ = "1.0.0"
+__maintainer__ = "Randeep Ahlawat"
+__email__ = "randeep.ahalwat@utdallas.edu"
+__status__ = "Development"
+
+'''Checks of the write-behind stock tracker buffer of src/tracker_buffer.py.
+
+run from the C4 folder with `python -m pytest tests/tracker_buffer_test.py`
+'''
+
+ITEMS = ['Dough', 'TraditionalSauce', 'Cheese']
+DAY = datetime.date(2020, 12, 1)
+
+
+class StockTracker(object):
+	'''Stands in for the stockTrackerByDay table'''
+
+	def __init__(self, fail=0):
+		self.rows = {}
+		self.writes = 0
+		self.fail = fail
+
+	def write(self, rows):
+		if self.fail:
+			self.fail -= 1
+			raise RuntimeError("unavailable")
+		self.writes += 1
+		for store_id, day, quantities in rows:
+			self.rows[(store_id, day)] = quantities
+
+
+def test_orders_are_written_on_flush():
+	table = StockTracker()
+	buffer = TrackerBuffer(table.write, ITEMS)
+
+	async def orders():
+		for _ in range(100):
+			buffer.add("store", DAY, [2, 1, 3])
+		assert table.writes == 0
+		await buffer.flush()
+
+	asyncio.run(orders())
+	assert table.writes == 1
+	assert table.rows == {("store", DAY): [200, 100, 300]}
+	assert buffer.totals("store", DAY) == {'Dough': 200, 'TraditionalSauce': 100, 'Cheese': 300}
+
+
+def test_size_threshold_flushes():
+	table = StockTracker()
+	buffer = TrackerBuffer(table.write, ITEMS, interval=60, size=10)
+
+	async def orders():
+		for _ in range(25):
+			buffer.add("store", DAY, [1, 0, 0])
+			await asyncio.sleep(0)
+		await asyncio.sleep(0.05)
+
+	asyncio.run(orders())
+	assert table.writes == 2
+	assert table.rows[("store", DAY)] == [20, 0, 0]
+
+
+def test_stop_writes_everything_even_after_failure():
+	table = StockTracker(fail=1)
+	buffer = TrackerBuffer(table.write, ITEMS, interval=0.01)
+
+	async def serve():
+		buffer.start()
+		buffer.add("store", DAY, [2, 0, 0])
+		await asyncio.sleep(0.05)
+		buffer.add("store", DAY + datetime.timedelta(days=1), [5, 0, 1])
+		await buffer.stop()
+
+	asyncio.run(serve())
+	assert table.rows[("store", DAY)] == [2, 0, 0]
+	assert table.rows[("store", DAY + datetime.timedelta(days=1))] == [5, 0, 1]
@@ -13,6 +13,7 @@ restocked. If stock quantity for any item is below 10, then that item is restock
 to a quantity of 50.
 """
 
+import asyncio
 import json
 import logging
 import os
@@ -20,11 +21,17 @@ import threading
 import time
 import uuid
 
-import jsonschema
-import requests
 from cassandra.cluster import Cluster
+from cassandra.concurrent import execute_concurrent_with_args
 from quart import Quart, Response, request
-from quart.utils import run_sync
+
+from src.batch import (accepted, forward_batch, merge_results, parse_batch,
+                       rejected, split_by_store)
+from src.http_client import ForwardingClient
+from src.order_queue import OrderQueue, is_queued
+from src.recipe import encode, item_amounts, order_demand
+from src.stock_ledger import StockLedger
+from src.validation import SchemaValidator
 
 __author__ = "Carla Vazquez, Chris Scott"
 __version__ = "2.0.0"
@@ -40,18 +47,7 @@ session = cluster.connect('pizza_grocery')
 # prepared statements
 while True:
     try:
-        get_quantity = session.prepare('\
-            SELECT quantity \
-            FROM stock  \
-            WHERE storeID = ? AND itemName = ?\
-        ')
-        add_stock_prepared = session.prepare('\
-            UPDATE stock \
-            SET quantity = ?  \
-            WHERE storeID = ? AND itemName = ?\
-        ')
         get_stores = session.prepare("SELECT storeID FROM stores")
-        get_items = session.prepare("SELECT name FROM items")
         select_stock_prepared = session.prepare('SELECT * FROM stock WHERE storeID=?')
         update_stock_prepared = session.prepare('\
             UPDATE stock \
@@ -68,29 +64,22 @@ logging.basicConfig(
     level=logging.INFO,
     format='%(asctime)s - %(levelname)s - %(message)s'
 )
-logging.getLogger('requests').setLevel(logging.WARNING)
+logging.getLogger('aiohttp').setLevel(logging.WARNING)
 logging.getLogger('quart.app').setLevel(logging.WARNING)
 logging.getLogger('quart.serving').setLevel(logging.WARNING)
 
 # create Quart app
 app = Quart(__name__)
 
-# Open jsonschema for workflow-request
-with open("src/workflow-request.schema.json", "r") as workflow_schema:
-    workflow_schema = json.loads(workflow_schema.read())
-
-# Global pizza items/ingredients dict
-items_dict = {
-    'Dough': 0,         'SpicySauce': 0,        'TraditionalSauce': 0,
-    'Cheese': 0,        'Pepperoni': 0,         'Sausage': 0,
-    'Beef': 0,          'Onion': 0,             'Chicken': 0,
-    'Peppers': 0,           'Olives': 0,            'Bacon': 0,
-    'Pineapple': 0,     'Mushrooms': 0
-}
+# Compile jsonschema for workflow-request
+workflow_validator = SchemaValidator("src/workflow-request.schema.json")
 
 # Global workflows dict
 workflows = dict()
 
+# Pooled HTTP client for forwarding orders
+http_client = ForwardingClient.from_env()
+
 
 ###############################################################################
 #                           Helper Functions
@@ -105,103 +94,124 @@ async def get_next_component(store_id):
     return comp_list[next_comp_index]
 
 
-async def get_component_url(component, store_id):
+async def get_component_url(component, store_id, endpoint="order"):
     comp_name = component +\
         (str(workflows[store_id]["workflow-offset"]) if workflows[store_id]["method"] == "edge" else "")
     url = "http://" + comp_name + ":"
     if component == "order-verifier":
-        url += "1000/order"
+        url += "1000/"
     elif component == "delivery-assigner":
-        url += "3000/order"
+        url += "3000/"
     elif component == "stock-analyzer":
-        url += "4000/order"
+        url += "4000/"
     elif component == "order-processor":
-        url += "6000/order"
-    return url
+        url += "6000/"
+    return url + endpoint
 
 
 async def send_order_to_next_component(url, order):
     # send order to next component
-    def request_post():
-        return requests.post(url, json=json.dumps(order))
+    status_code, text = await http_client.post(url, order)
 
-    r = await run_sync(request_post)()
-        
-    return Response(status=r.status_code, response=r.text)
+    return Response(status=status_code, response=text)
+
+
+# Stored quantity of every item of a store
+def select_stock(store_uuid):
+    rows = session.execute(select_stock_prepared, (store_uuid,))
+    return {row.itemname: row.quantity for row in rows}
 
 
-# Decrement a store's stock for the order about to be placed
-async def decrement_stock(store_uuid, instock_dict, required_dict):
+# Store (quantity, storeID, itemName) stock rows
+def update_stock(rows):
+    execute_concurrent_with_args(session, update_stock_prepared, rows)
+
+
+# The restocker's stock of every store, written back in batches
+stock_ledger = StockLedger(
+    select_stock, update_stock, float(os.environ.get("STOCK_FLUSH_INTERVAL", "0.5"))
+)
 
-    def update_stock_prepared_execute():
-        session.execute(update_stock_prepared, (quantity, store_uuid, item_name))
 
-    for item_name in required_dict:
-        quantity = instock_dict[item_name] - required_dict[item_name]
-        await run_sync(update_stock_prepared_execute)()
+# Fill a batch of orders from a store's stock, in batch order, restocking
+# the items the store is short of. Returns the restock list and error
+# message of each order
+async def fill_orders(store_uuid, pizza_lists):
+    # Aggregate the ingredients of every order at once
+    unknown = dict()
+    counts, orders = encode(pizza_lists, unknown)
+    demand = order_demand(counts, orders, len(pizza_lists))
 
+    restock_lists = await stock_ledger.fill(store_uuid, [
+        None if index in unknown else item_amounts(required)
+        for index, required in enumerate(demand)
+    ])
 
-# Aggregate all ingredients for a given order
-async def aggregate_ingredients(pizza_list):
-    ingredients = items_dict.copy()
+    return [
+        (None, str(unknown[index])) if index in unknown else (restock_list, None)
+        for index, restock_list in enumerate(restock_lists)
+    ]
 
-    # Loop through each pizza in pizza_list and aggregate the required ingredients
-    for pizza in pizza_list:
-        if pizza['crustType'] == 'Thin':
-            ingredients['Dough'] += 1
-        elif pizza['crustType'] == 'Traditional':
-            ingredients['Dough'] += 2
 
-        if pizza['sauceType'] == 'Spicy':
-            ingredients['SpicySauce'] += 1
-        elif pizza['sauceType'] == 'Traditional':
-            ingredients['TraditionalSauce'] += 1
+# check stock for and forward the orders of one store, returns their results
+async def process_store_batch(store_id, orders):
+    results = [None] * len(orders)
+    forward = []
 
-        if pizza['cheeseAmt'] == 'Light':
-            ingredients['Cheese'] += 1
-        elif pizza['cheeseAmt'] == 'Normal':
-            ingredients['Cheese'] += 2
-        elif pizza['cheeseAmt'] == 'Extra':
-            ingredients['Cheese'] += 3
+    try:
+        restock_lists = await fill_orders(
+            uuid.UUID(store_id),
+            [order["pizza-order"]["pizzaList"] for order in orders]
+        )
+    except Exception as inst:
+        error_mess = "Request rejected, restock failed:  " + str(inst)
+        logging.info("Store " + store_id + ": " + error_mess)
+        return [rejected(400, error_mess) for order in orders]
 
-        for topping in pizza["toppingList"]:
-            ingredients[topping] += 1
+    for index, (order, (restock_list, mess)) in enumerate(zip(orders, restock_lists)):
+        if mess is not None:
+            results[index] = rejected(
+                400, "Request rejected, restock failed:  " + mess)
+            continue
+        order.update({"stock": {"status": "sufficient", "restocked": restock_list}})
+        forward.append(index)
 
-    return ingredients
+    logging.info("Store " + store_id + ": Sufficient stock for " +
+                 str(len(forward)) + " of " + str(len(orders)) + " orders.")
 
+    next_comp = await get_next_component(store_id)
 
-# Check stock at a given store to determine if order can be filled
-async def check_stock(store_uuid, order_dict):
-    instock_dict = items_dict.copy()
-    required_dict = await aggregate_ingredients(order_dict["pizzaList"])
-    restock_list = list()   # restock_list will be empty if no items need restocking
+    if next_comp is None:
+        merge_results(results, forward, [accepted(orders[i]) for i in forward])
+        return results
 
-    def check_stock_execute():
-        return session.execute(select_stock_prepared, (store_uuid,))
+    forwarded = await forward_batch(
+        http_client.post,
+        await get_component_url(next_comp, store_id, "orders/batch"),
+        await get_component_url(next_comp, store_id),
+        [orders[index] for index in forward]
+    )
+    merge_results(results, forward, forwarded)
+    return results
 
-    rows = await run_sync(check_stock_execute)()
-    for row in rows:
-        if row.quantity < required_dict[row.itemname]:
-            quantity_difference = \
-                required_dict[row.itemname] - instock_dict[row.itemname]
-            restock_list.append(
-                {"item-name": row.itemname, "quantity": quantity_difference}
-            )
-        instock_dict[row.itemname] = row.quantity
 
-    return instock_dict, required_dict, restock_list
+# status URL of an order at the next component, once it is forwarded there
+async def get_status_url(store_id, order_id):
+    next_comp = await get_next_component(store_id)
+    if next_comp is None:
+        return None
+    return await get_component_url(next_comp, store_id, "orders/" + order_id + "/status")
 
 
 async def verify_workflow(data):
-    global workflow_schema
-    valid = True
-    mess = None
-    try:
-        jsonschema.validate(instance=data, schema=workflow_schema)
-    except Exception as inst:
-        valid = False
-        mess = inst.args[0]
-    return valid, mess
+    return workflow_validator.validate(data)
+
+
+# Queue of the orders of queued workflows
+order_queue = OrderQueue(
+    os.environ.get("QUEUE_PATH", "data/order-queue.db"),
+    workflows, process_store_batch, get_status_url, http_client.get
+)
 
 
 ###############################################################################
@@ -220,6 +230,14 @@ async def restocker():
         logging.info(message)
         return Response(status=422, response=message)
 
+    if is_queued(workflows[order["pizza-order"]["storeId"]]):
+        await order_queue.put(order["pizza-order"]["storeId"], [order])
+        logging.info("Order " + order["orderId"] + " queued.")
+        return Response(
+            status=202,
+            response=json.dumps({"orderId": order["orderId"], "status": "queued"})
+        )
+
     cust_name = order["pizza-order"]["custName"]
     store_id = order["pizza-order"]["storeId"]
     store_uuid = uuid.UUID(store_id)
@@ -227,34 +245,14 @@ async def restocker():
     logging.info("Store " + store_id + ":")
     logging.info("Checking stock for order from " + cust_name + ".")
 
-    valid = True
-    mess = None
-
-    def add_stock_prepared_execute():
-        return session.execute(
-                    add_stock_prepared,
-                    (new_quantity, store_uuid, item_dict["item-name"])
-                )
-
     try:
-        # check stock
-        instock_dict, required_dict, restock_list = \
-            await check_stock(store_uuid, order["pizza-order"])
-        # restock, if needed
-        if restock_list:
-            # perform restock
-            for item_dict in restock_list:
-                new_quantity = \
-                    item_dict["quantity"] + instock_dict[item_dict["item-name"]] + 10
-                instock_dict[item_dict["item-name"]] = new_quantity
-                await run_sync(add_stock_prepared_execute)()
-        # decrement stock
-        await decrement_stock(store_uuid, instock_dict, required_dict)
+        restock_list, mess = (await fill_orders(
+            store_uuid, [order["pizza-order"]["pizzaList"]]))[0]
     except Exception as inst:
-        valid = False
-        mess = inst.args[0]
+        restock_list = None
+        mess = str(inst)
 
-    if not valid:
+    if restock_list is None:
         # failure of some kind, return error message
         error_mess = "Request rejected, restock failed:  " + mess
         logging.info(error_mess)
@@ -292,6 +290,61 @@ async def restocker():
     return Response(status=200, response=json.dumps(order))
         
 
+# the batch endpoint, stock is checked once per store
+@app.route('/orders/batch', methods=['POST'])
+async def restock_batch():
+    logging.info("{:*^74}".format(" POST /orders/batch "))
+    try:
+        orders = parse_batch(await request.get_data())
+    except ValueError as inst:
+        error_mess = "Request rejected, batch is malformed:  " + str(inst)
+        logging.info(error_mess)
+        return Response(status=400, response=error_mess)
+
+    logging.info("Checking stock for " + str(len(orders)) + " orders.")
+
+    results, stores = split_by_store(orders, workflows)
+    store_ids = list(stores)
+    store_results = await asyncio.gather(*[
+        order_queue.submit(
+            workflows[store_id], store_id, [orders[i] for i in stores[store_id]])
+        for store_id in store_ids
+    ])
+    for store_id, partial in zip(store_ids, store_results):
+        merge_results(results, stores[store_id], partial)
+
+    return Response(status=200, response=json.dumps({"results": results}))
+
+
+# status of an order of a queued workflow
+@app.route("/orders/<orderId>/status", methods=["GET"])
+async def order_status(orderId):
+    logging.info("{:*^74}".format(" GET /orders/" + orderId + "/status "))
+    status = await order_queue.lookup(orderId)
+    if status is None:
+        return Response(
+            status=404,
+            response="Order was not queued by the restocker.\n"
+        )
+    return Response(status=200, response=json.dumps(status))
+
+
+# open the http client and start the consumer of the order queue and the
+# stock ledger with the server, and stop them with it
+@app.before_serving
+async def startup():
+    await http_client.start()
+    order_queue.start()
+    stock_ledger.start()
+
+
+@app.after_serving
+async def shutdown():
+    await order_queue.stop()
+    await stock_ledger.stop()
+    await http_client.close()
+
+
 # if workflow-request is valid and does not exist, create it
 @app.route("/workflow-requests/<storeId>", methods=['PUT'])
 async def setup_workflow(storeId):
@@ -369,6 +422,8 @@ async def teardown_workflow(storeId):
         )
     else:
         del workflows[storeId]
+        await stock_ledger.flush()
+        stock_ledger.forget(uuid.UUID(storeId))
         logging.info("Restocker stopped for {}".format(storeId))
         return Response(status=204, response="restocker stopped")
 
@@ -407,29 +462,19 @@ async def health_check():
 #                    Periodic Scan DB Stock for Restock
 ###############################################################################
 
-# scan the database for items that are out of stock or close to it
+# scan the stock for items that are out of stock or close to it
 def scan_out_of_stock():
     # gets a list of active store workflows
-    stores = workflows.keys()
+    stores = list(workflows.keys())
 
     # loops through said stores
     for store_id in stores:
         store_uuid = uuid.UUID(store_id)
-        # gets a list of all items
-        items = session.execute(get_items)
-        # loops through said items
-        for item in items:
-            # if the item exsists at the store
-            quantity = session.execute(get_quantity, (store_uuid, item.name))
-            quantity_row = quantity.one()
-            if quantity_row is not None:
-                # and it is low in quantity
-                if quantity_row.quantity < 10.0:
-                    # restock it
-                    new_quantity = 50
-                    session.execute(add_stock_prepared, (new_quantity, store_uuid, item.name))
-                    logging.info("Store " + store_id + " Daily Scan:")
-                    logging.info(item.name + " restocked to " + str(new_quantity))
+        # restocks the items low in quantity through the stock ledger, which
+        # writes them with its next flush
+        for item_name in stock_ledger.top_up(store_uuid, 10, 50):
+            logging.info("Store " + store_id + " Daily Scan:")
+            logging.info(item_name + " restocked to 50")
     # if app.config["ENV"] == "production":
     threading.Timer(60, scan_out_of_stock).start()
 
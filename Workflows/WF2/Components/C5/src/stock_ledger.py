@@ -0,0 +1,171 @@
+"""Stock ledger of the restocker
+
+Filling an order used to read a store's stock, then write each item's new
+quantity back, so two orders of the same store filled at once could both
+read the same quantities and one decrement was lost. The StockLedger is the
+single writer of the stock of the stores this restocker serves. It keeps
+every store's stock in memory, fills orders against it under a lock, so
+concurrent orders are applied one after the other, and writes the items that
+changed back every interval seconds. Orders filled between two flushes cost
+one write per item they changed, however many orders there were.
+"""
+import asyncio
+import logging
+import threading
+
+__author__ = "Chris Scott"
+__version__ = "1.0.0"
+__maintainer__ = "Chris Scott"
+__email__ = "cms190009@utdallas.edu"
+__status__ = "Development"
+
+# An item short of an order is restocked to what the order needs plus this
+RESTOCK_MARGIN = 10
+
+
+class StockLedger(object):
+    """Stock of every store by item name
+
+    read(store_uuid) returns the stored quantity of every item of a store as
+    a dict, and write(rows) stores (quantity, store_uuid, item_name) rows.
+    Both block, so they run in the loop's executor.
+    """
+
+    def __init__(self, read, write, interval=0.5):
+        self.read = read
+        self.write = write
+        self.interval = interval
+        self.writes = 0
+        self._stock = dict()
+        self._dirty = dict()
+        self._lock = threading.Lock()
+        self._task = None
+        # reads in flight, shared by the orders waiting on them
+        self._loading = dict()
+
+    async def _run_blocking(self, func, *args):
+        return await asyncio.get_event_loop().run_in_executor(None, func, *args)
+
+    def _set(self, store_uuid, quantities):
+        with self._lock:
+            # stock already in memory is newer than what was read
+            if store_uuid not in self._stock:
+                self._stock[store_uuid] = dict(quantities)
+            return self._stock[store_uuid]
+
+    async def load(self, store_uuid):
+        """Reads the stock of a store, unless it is in memory already"""
+        if store_uuid not in self._loading:
+            self._loading[store_uuid] = asyncio.ensure_future(
+                self._run_blocking(self.read, store_uuid))
+        try:
+            quantities = await asyncio.shield(self._loading[store_uuid])
+        finally:
+            self._loading.pop(store_uuid, None)
+        return self._set(store_uuid, quantities)
+
+    def load_blocking(self, store_uuid):
+        """Reads the stock of a store, from a thread other than the loop's"""
+        return self._set(store_uuid, self.read(store_uuid))
+
+    def quantities(self, store_uuid):
+        """A copy of the stock of a store, or None if it is not loaded"""
+        with self._lock:
+            stock = self._stock.get(store_uuid)
+            return None if stock is None else dict(stock)
+
+    def _change(self, store_uuid, item_name, quantity):
+        self._stock[store_uuid][item_name] = quantity
+        self._dirty.setdefault(store_uuid, set()).add(item_name)
+
+    async def fill(self, store_uuid, required_dicts):
+        """Takes the items each order of required_dicts needs from the store's
+        stock, in order, first restocking the items the store is short of.
+        An order that is None is skipped. Returns the restock list of each
+        order."""
+        if store_uuid not in self._stock:
+            await self.load(store_uuid)
+
+        restock_lists = list()
+        with self._lock:
+            stock = self._stock[store_uuid]
+            for required_dict in required_dicts:
+                if required_dict is None:
+                    restock_lists.append(None)
+                    continue
+                restock_list = list()
+                for item_name, quantity in required_dict.items():
+                    if item_name in stock and stock[item_name] < quantity:
+                        restock_list.append(
+                            {"item-name": item_name, "quantity": quantity}
+                        )
+                        stock[item_name] += quantity + RESTOCK_MARGIN
+                    if quantity:
+                        self._change(store_uuid, item_name, stock.get(item_name, 0) - quantity)
+                restock_lists.append(restock_list)
+
+        return restock_lists
+
+    def top_up(self, store_uuid, below, level):
+        """Restocks to level the items of a store with fewer than below.
+        Returns their names."""
+        if store_uuid not in self._stock:
+            self.load_blocking(store_uuid)
+
+        with self._lock:
+            stock = self._stock[store_uuid]
+            low = [item_name for item_name, quantity in stock.items() if quantity < below]
+            for item_name in low:
+                self._change(store_uuid, item_name, level)
+        return low
+
+    def forget(self, store_uuid):
+        """Drops the stock of a store once its changes are written"""
+        with self._lock:
+            if not self._dirty.get(store_uuid):
+                self._stock.pop(store_uuid, None)
+
+    async def flush(self):
+        """Writes the items changed since the last flush"""
+        with self._lock:
+            rows = [
+                (self._stock[store_uuid][item_name], store_uuid, item_name)
+                for store_uuid, item_names in self._dirty.items()
+                for item_name in item_names
+            ]
+            self._dirty = dict()
+        if not rows:
+            return
+        try:
+            await self._run_blocking(self.write, rows)
+        except asyncio.CancelledError:
+            # stopped before the write was made, the next flush makes it
+            self._redo(rows)
+            raise
+        except Exception as inst:
+            logging.info("Stock flush failed, retrying: " + str(inst))
+            self._redo(rows)
+            return
+        self.writes += len(rows)
+
+    def _redo(self, rows):
+        with self._lock:
+            for quantity, store_uuid, item_name in rows:
+                self._dirty.setdefault(store_uuid, set()).add(item_name)
+
+    async def _run(self):
+        while True:
+            await asyncio.sleep(self.interval)
+            await self.flush()
+
+    def start(self):
+        self._task = asyncio.ensure_future(self._run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+        await self.flush()
@@ -0,0 +1,106 @@
+"""Checks of the stock ledger of src/stock_ledger.py.
+
+run from the C5 folder with `pipenv run python -m pytest tests/stock_ledger_test.py`
+"""
+import asyncio
+import os
+import random
+import sys
+import threading
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from src.stock_ledger import RESTOCK_MARGIN, StockLedger  # noqa: E402
+
+__author__ = "Chris Scott"
+__version__ = "1.0.0"
+__maintainer__ = "Chris Scott"
+__email__ = "cms190009@utdallas.edu"
+__status__ = "Development"
+
+
+class StockTable(object):
+    """Stands in for the stock table, with a delay on every round trip"""
+
+    def __init__(self, stock, delay=0.002):
+        self.stock = dict(stock)
+        self.delay = delay
+        self.reads = 0
+        self.writes = 0
+
+    def read(self, store_uuid):
+        time.sleep(self.delay)
+        self.reads += 1
+        return dict(self.stock)
+
+    def write(self, rows):
+        time.sleep(self.delay)
+        for quantity, store_uuid, item_name in rows:
+            self.stock[item_name] = quantity
+            self.writes += 1
+
+
+def test_concurrent_orders_lose_no_decrement():
+    table = StockTable({"Dough": 5000, "Cheese": 5000})
+    ledger = StockLedger(table.read, table.write, interval=0.01)
+    orders = [{"Dough": random.randint(1, 4), "Cheese": random.randint(0, 6)}
+              for _ in range(500)]
+
+    async def rush():
+        ledger.start()
+        await asyncio.gather(*[ledger.fill("store", [order]) for order in orders])
+        await ledger.stop()
+
+    asyncio.run(rush())
+    assert table.stock["Dough"] == 5000 - sum(order["Dough"] for order in orders)
+    assert table.stock["Cheese"] == 5000 - sum(order["Cheese"] for order in orders)
+    assert table.reads == 1
+    assert table.writes < len(orders)
+
+
+def test_short_items_are_restocked():
+    table = StockTable({"Dough": 3, "Cheese": 50})
+    ledger = StockLedger(table.read, table.write)
+
+    async def fill():
+        restock_lists = await ledger.fill("store", [{"Dough": 4, "Cheese": 2}, None])
+        await ledger.flush()
+        return restock_lists
+
+    assert asyncio.run(fill()) == [[{"item-name": "Dough", "quantity": 4}], None]
+    assert table.stock == {"Dough": 3 + RESTOCK_MARGIN, "Cheese": 48}
+
+
+def test_top_up_from_another_thread():
+    table = StockTable({"Dough": 8, "Cheese": 50})
+    ledger = StockLedger(table.read, table.write)
+    low = []
+    scan = threading.Thread(target=lambda: low.extend(ledger.top_up("store", 10, 50)))
+    scan.start()
+    scan.join()
+    assert low == ["Dough"]
+    assert ledger.quantities("store") == {"Dough": 50, "Cheese": 50}
+    asyncio.run(ledger.flush())
+    assert table.stock["Dough"] == 50
+
+
+def test_failed_flush_is_retried():
+    table = StockTable({"Dough": 10})
+    failures = [RuntimeError("unavailable")]
+
+    def write(rows):
+        if failures:
+            raise failures.pop()
+        table.write(rows)
+
+    ledger = StockLedger(table.read, write)
+
+    async def fill():
+        await ledger.fill("store", [{"Dough": 2}])
+        await ledger.flush()
+        assert table.stock["Dough"] == 10
+        await ledger.flush()
+
+    asyncio.run(fill())
+    assert table.stock["Dough"] == 8
@@ -7,6 +7,7 @@ into the database. The request is then sent to the next component in the workflo
 one exists.
 """
 
+import asyncio
 import json
 import logging
 import os
@@ -14,12 +15,20 @@ import time
 import uuid
 from datetime import datetime
 
-import jsonschema
-import requests
+import numpy as np
 from cassandra.cluster import Cluster
 from quart import Quart, Response, request
 from quart.utils import run_sync
 
+from src.batch import (accepted, forward_batch, merge_results, parse_batch,
+                       rejected, split_by_store)
+from src.cass_async import execute_all
+from src.http_client import ForwardingClient
+from src.order_queue import OrderQueue, is_queued
+from src.recipe import encode, ingredient_set, pizza_costs
+from src.reference_cache import ReferenceCache
+from src.validation import SchemaValidator
+
 __author__ = "Chris Scott"
 __version__ = "1.0.0"
 __maintainer__ = "Chris Scott"
@@ -35,6 +44,7 @@ session = cluster.connect('pizza_grocery')
 while True:
     try:
         select_items_prepared = session.prepare('SELECT * FROM items WHERE name=?')
+        select_all_items_prepared = session.prepare('SELECT * FROM items')
         insert_customers_prepared = session.prepare('\
             INSERT INTO customers (customerName, latitude, longitude) \
             VALUES (?, ?, ?)\
@@ -69,163 +79,145 @@ while True:
 # Create Quart app
 app = Quart(__name__)
 
-# Open jsonschema for workflow-request
-with open("src/workflow-request.schema.json", "r") as workflow_schema:
-    workflow_schema = json.loads(workflow_schema.read())
+# Compile jsonschema for workflow-request
+workflow_validator = SchemaValidator("src/workflow-request.schema.json")
 
 # Logging
 logging.basicConfig(
     level=logging.INFO, 
     format='%(asctime)s - %(levelname)s - %(message)s'
 )
-logging.getLogger('requests').setLevel(logging.WARNING)
+logging.getLogger('aiohttp').setLevel(logging.WARNING)
 logging.getLogger('quart.app').setLevel(logging.WARNING)
 logging.getLogger('quart.serving').setLevel(logging.WARNING)
 
 # Global workflows dict
 workflows = dict()
 
+# Pooled HTTP client for forwarding orders
+http_client = ForwardingClient.from_env()
+
 
 ###############################################################################
 #                           Helper Functions
 ###############################################################################
 
-# Calculate pizza price based on ingredients
-async def calc_pizza_cost(ingredient_set):
-    cost = 0.0
+# Price of an item, or None if there is no such item
+async def select_item_price(name):
 
-    for ingredient in ingredient_set:
+    def select_items():
+        return session.execute(select_items_prepared, (name,))
 
-        def select_items():
-            return session.execute(select_items_prepared, (ingredient[0],))
+    for (name, price) in await run_sync(select_items)():
+        return price
+    return None
 
-        result = await run_sync(select_items)()
 
-        for (name, price) in result:
-            cost += price * ingredient[1] 
+# Price of every item, by name
+async def select_item_prices():
 
-    return cost
+    def select_all_items():
+        return session.execute(select_all_items_prepared)
 
+    rows = await run_sync(select_all_items)()
 
-# Insert an order's pizza(s) into 'pizzas' table
-async def insert_pizzas(pizza_list):
-    pizza_uuid_set = set()
+    return {name: price for (name, price) in rows}
 
-    for pizza in pizza_list:
-        pizza_uuid = uuid.uuid4()
-        pizza_uuid_set.add(pizza_uuid)
-        ingredient_set = set()
-
-        if pizza["crustType"] == "Thin":
-            ingredient_set.add(("Dough", 1))
-        elif pizza["crustType"] == "Traditional":
-            ingredient_set.add(("Dough", 2))
-
-        if pizza["sauceType"] == "Spicy":
-            ingredient_set.add(("SpicySauce", 1))
-        elif pizza["sauceType"] == "Traditional":
-            ingredient_set.add(("TraditionalSauce", 1))
-
-        if pizza["cheeseAmt"] == "Light":
-            ingredient_set.add(("Cheese", 1))
-        elif pizza["cheeseAmt"] == "Normal":
-            ingredient_set.add(("Cheese", 2))
-        elif pizza["cheeseAmt"] == "Extra":
-            ingredient_set.add(("Cheese", 3))
-
-        for topping in pizza["toppingList"]:
-            ingredient_set.add((topping, 1))
-        
-        cost = await calc_pizza_cost(ingredient_set)
-
-        def insert_pizza():
-            session.execute(insert_pizzas_prepared, (pizza_uuid, ingredient_set, cost))
-
-        await run_sync(insert_pizza)()
-    
-    return pizza_uuid_set
 
+# Item prices, read once and kept
+item_cache = ReferenceCache.from_env(select_item_price, select_item_prices)
 
-# Insert order info into DB
-async def create_order(order_dict):
-    order_uuid = uuid.UUID(order_dict["orderId"])
-    store_uuid = uuid.UUID(order_dict["storeId"])
-    pay_uuid = uuid.UUID(order_dict["paymentToken"])
-    cust_name = order_dict["custName"]
-    cust_lat = order_dict["custLocation"]["lat"]
-    cust_lon = order_dict["custLocation"]["lon"]
-    placed_at = datetime.strptime(order_dict["orderDate"], '%Y-%m-%dT%H:%M:%S')
-
-    valid = True
-    mess = None
-
-    # Insert customer information into 'customers' table
-    def insert_customers():
-        session.execute(insert_customers_prepared, (cust_name, cust_lat, cust_lon))
 
+# Insert order info into DB, with all of the order's inserts sent at once so
+# they take about as long as the slowest one
+async def create_order(order_dict):
     try:
-        await run_sync(insert_customers)()
+        counts, _ = encode([order_dict["pizzaList"]])
+        costs = pizza_costs(counts, await get_item_prices()).tolist()
+        statements = order_statements(order_dict, counts, costs)
     except Exception as inst:
-        valid = False
-        mess = inst.args[0]
-        return valid, mess
+        return False, inst.args[0]
 
-    # Insert order payment information into 'payments' table
-    def insert_payments():
-        session.execute(insert_payments_prepared, (pay_uuid, order_dict["paymentTokenType"]))
+    for success, result in await execute_all(session, statements):
+        if not success:
+            return False, str(result)
 
-    try:
-        await run_sync(insert_payments)()
-    except Exception as inst:
-        valid = False
-        mess = inst.args[0]
-        return valid, mess
+    return True, None
 
-    # Insert the ordered pizzas into 'pizzas' table
-    try:
-        pizza_uuid_set = await insert_pizzas(order_dict["pizzaList"])
-    except Exception as inst:
-        valid = False
-        mess = inst.args[0]
-        return valid, mess
-
-    # Insert order into 'orderTable' table
-    def insert_order_table():
-        session.execute(
-            insert_order_prepared, 
-            (order_uuid, store_uuid, cust_name, "", pizza_uuid_set, None, pay_uuid, placed_at, True, -1)
-        )
 
-    try:
-        await run_sync(insert_order_table)()
-    except Exception as inst:
-        valid = False
-        mess = inst.args[0]
-        return valid, mess
-    
-    # Insert order into 'orderByStore' table
-    def insert_order_by_store():
-        session.execute(insert_order_by_store_prepared, (store_uuid, placed_at, order_uuid))
+# Price of every item, by name
+async def get_item_prices():
+    return await item_cache.all()
 
-    try:
-        await run_sync(insert_order_by_store)()
-    except Exception as inst:
-        valid = False
-        mess = inst.args[0]
-        return valid, mess
 
-    # Insert order into 'orderByCustomer' table
-    def insert_order_by_customer():
-        session.execute(insert_order_by_customer_prepared, (cust_name, placed_at, order_uuid))
+# The statements create_order executes for an order, with their parameters,
+# given the count matrix rows and costs of its pizzas
+def order_statements(order_dict, counts, costs):
+    order_uuid = uuid.UUID(order_dict["orderId"])
+    store_uuid = uuid.UUID(order_dict["storeId"])
+    pay_uuid = uuid.UUID(order_dict["paymentToken"])
+    cust_name = order_dict["custName"]
+    cust_lat = order_dict["custLocation"]["lat"]
+    cust_lon = order_dict["custLocation"]["lon"]
+    placed_at = datetime.strptime(order_dict["orderDate"], '%Y-%m-%dT%H:%M:%S')
 
-    try:
-        await run_sync(insert_order_by_customer)()
-    except Exception as inst:
-        valid = False
-        mess = inst.args[0]
-        return valid, mess
-    
-    return valid, mess
+    statements = [
+        (insert_customers_prepared, (cust_name, cust_lat, cust_lon)),
+        (insert_payments_prepared, (pay_uuid, order_dict["paymentTokenType"]))
+    ]
+
+    pizza_uuid_set = set()
+    for row, cost in zip(counts, costs):
+        pizza_uuid = uuid.uuid4()
+        pizza_uuid_set.add(pizza_uuid)
+        statements.append(
+            (insert_pizzas_prepared, (pizza_uuid, ingredient_set(row), cost)))
+
+    statements.extend([
+        (insert_order_prepared,
+            (order_uuid, store_uuid, cust_name, "", pizza_uuid_set, None, pay_uuid, placed_at, True, -1)),
+        (insert_order_by_store_prepared, (store_uuid, placed_at, order_uuid)),
+        (insert_order_by_customer_prepared, (cust_name, placed_at, order_uuid))
+    ])
+
+    return statements
+
+
+# Insert a batch of orders into DB, with the pizzas of every order priced at
+# once and all inserts executed concurrently. Returns an error message, or
+# None, per order
+async def create_orders(order_dicts):
+    errors = [None] * len(order_dicts)
+    statements = []
+    owners = []
+
+    unknown = dict()
+    counts, orders = encode(
+        [order_dict.get("pizzaList") for order_dict in order_dicts], unknown)
+    costs = pizza_costs(counts, await get_item_prices()).tolist()
+    # first row of every order, and past the last
+    bounds = np.searchsorted(orders, np.arange(len(order_dicts) + 1)).tolist()
+
+    for index, order_dict in enumerate(order_dicts):
+        if index in unknown:
+            errors[index] = str(unknown[index])
+            continue
+        first, last = bounds[index], bounds[index + 1]
+        try:
+            queries = order_statements(order_dict, counts[first:last], costs[first:last])
+        except Exception as inst:
+            errors[index] = str(inst)
+            continue
+        statements.extend(queries)
+        owners.extend([index] * len(queries))
+
+    results = await execute_all(session, statements)
+
+    for index, (success, result) in zip(owners, results):
+        if not success and errors[index] is None:
+            errors[index] = str(result)
+
+    return errors
 
 
 async def get_next_component(store_id):
@@ -237,42 +229,83 @@ async def get_next_component(store_id):
     return comp_list[next_comp_index]
 
 
-async def get_component_url(component, store_id):
+async def get_component_url(component, store_id, endpoint="order"):
     comp_name = component +\
         (str(workflows[store_id]["workflow-offset"]) if workflows[store_id]["method"] == "edge" else "")
     url = "http://" + comp_name + ":"
     if component == "order-verifier":
-        url += "1000/order"
+        url += "1000/"
     elif component == "delivery-assigner":
-        url += "3000/order"
+        url += "3000/"
     elif component == "stock-analyzer":
-        url += "4000/order"
+        url += "4000/"
     elif component == "restocker":
-        url += "5000/order"
-    return url
+        url += "5000/"
+    return url + endpoint
 
 
 async def send_order_to_next_component(url, order):
     # send order to next component
-    def request_post():
-        return requests.post(url, json=json.dumps(order))
-    
-    r = await run_sync(request_post)()
+    status_code, text = await http_client.post(url, order)
 
-    return Response(status=r.status_code, response=r.text)
+    return Response(status=status_code, response=text)
+
+
+# process and forward the orders of one store, returns their results
+async def process_store_batch(store_id, orders):
+    results = [None] * len(orders)
+    forward = []
+
+    for order in orders:
+        order["pizza-order"]["orderId"] = str(uuid.uuid4())
+
+    errors = await create_orders([order["pizza-order"] for order in orders])
+
+    for index, (order, mess) in enumerate(zip(orders, errors)):
+        if mess is not None:
+            results[index] = rejected(
+                400, "Request rejected, order processing failed:  " + mess)
+            continue
+        order.update({"processor": "accepted"})
+        forward.append(index)
+
+    logging.info("Store " + store_id + ": " + str(len(forward)) + " of " +
+                 str(len(orders)) + " orders are processed.")
+
+    next_comp = await get_next_component(store_id)
+
+    if next_comp is None:
+        merge_results(results, forward, [accepted(orders[i]) for i in forward])
+        return results
+
+    forwarded = await forward_batch(
+        http_client.post,
+        await get_component_url(next_comp, store_id, "orders/batch"),
+        await get_component_url(next_comp, store_id),
+        [orders[index] for index in forward]
+    )
+    merge_results(results, forward, forwarded)
+    return results
+
+
+# status URL of an order at the next component, once it is forwarded there
+async def get_status_url(store_id, order_id):
+    next_comp = await get_next_component(store_id)
+    if next_comp is None:
+        return None
+    return await get_component_url(next_comp, store_id, "orders/" + order_id + "/status")
 
 
 # validate workflow-request against schema
 async def verify_workflow(data):
-    global workflow_schema
-    valid = True
-    mess = None
-    try:
-        jsonschema.validate(instance=data, schema=workflow_schema)
-    except Exception as inst:
-        valid = False
-        mess = inst.args[0]
-    return valid, mess
+    return workflow_validator.validate(data)
+
+
+# Queue of the orders of queued workflows
+order_queue = OrderQueue(
+    os.environ.get("QUEUE_PATH", "data/order-queue.db"),
+    workflows, process_store_batch, get_status_url, http_client.get
+)
 
 
 ###############################################################################
@@ -291,6 +324,14 @@ async def process_order():
         logging.info(message)
         return Response(status=422, response=message)
 
+    if is_queued(workflows[order["pizza-order"]["storeId"]]):
+        await order_queue.put(order["pizza-order"]["storeId"], [order])
+        logging.info("Order " + order["orderId"] + " queued.")
+        return Response(
+            status=202,
+            response=json.dumps({"orderId": order["orderId"], "status": "queued"})
+        )
+
     order["pizza-order"]["orderId"] = str(uuid.uuid4())
     order_id = order["pizza-order"]["orderId"]
     store_id = order["pizza-order"]["storeId"]
@@ -339,6 +380,59 @@ async def process_order():
     return Response(status=200, response=json.dumps(order))
 
 
+# process a batch of pizza-orders, store by store
+@app.route('/orders/batch', methods=['POST'])
+async def process_batch():
+    logging.info("{:*^74}".format(" POST /orders/batch "))
+    try:
+        orders = parse_batch(await request.get_data())
+    except ValueError as inst:
+        error_mess = "Request rejected, batch is malformed:  " + str(inst)
+        logging.info(error_mess)
+        return Response(status=400, response=error_mess)
+
+    logging.info("Processing " + str(len(orders)) + " orders.")
+
+    results, stores = split_by_store(orders, workflows)
+    store_ids = list(stores)
+    store_results = await asyncio.gather(*[
+        order_queue.submit(
+            workflows[store_id], store_id, [orders[i] for i in stores[store_id]])
+        for store_id in store_ids
+    ])
+    for store_id, partial in zip(store_ids, store_results):
+        merge_results(results, stores[store_id], partial)
+
+    return Response(status=200, response=json.dumps({"results": results}))
+
+
+# status of an order of a queued workflow
+@app.route("/orders/<orderId>/status", methods=["GET"])
+async def order_status(orderId):
+    logging.info("{:*^74}".format(" GET /orders/" + orderId + "/status "))
+    status = await order_queue.lookup(orderId)
+    if status is None:
+        return Response(
+            status=404,
+            response="Order was not queued by the order processor.\n"
+        )
+    return Response(status=200, response=json.dumps(status))
+
+
+# open the http client and start the consumer of the order queue with the
+# server, and stop both with it
+@app.before_serving
+async def startup():
+    await http_client.start()
+    order_queue.start()
+
+
+@app.after_serving
+async def shutdown():
+    await order_queue.stop()
+    await http_client.close()
+
+
 # if workflow-request is valid and does not exist, create it
 @app.route("/workflow-requests/<storeId>", methods=['PUT'])
 async def setup_workflow(storeId):
@@ -371,6 +465,12 @@ async def setup_workflow(storeId):
 
     workflows[storeId] = data
 
+    # read the item prices in bulk, before the first order
+    try:
+        await item_cache.load()
+    except Exception as inst:
+        logging.info("Item prices could not be loaded: " + str(inst))
+
     logging.info("Workflow started for {}".format(storeId))
     
     return Response(
@@ -403,6 +503,7 @@ async def update_workflow(storeId):
         )
 
     workflows[storeId] = data
+    item_cache.invalidate()
 
     logging.info("Workflow updated for {}".format(storeId))
 
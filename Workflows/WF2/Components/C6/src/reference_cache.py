@@ -0,0 +1,86 @@
+"""Read-through cache of reference tables
+
+The stores and items tables only change when a workflow is registered or
+updated, yet components read them for every order, and items once for every
+ingredient of every pizza. A ReferenceCache keeps their rows in memory, so
+those reads cost no database round trip. Rows are read again once they are
+older than REFERENCE_CACHE_TTL seconds (default 300), or when the cache is
+invalidated by a workflow update.
+"""
+import os
+import time
+
+__author__ = "Chris Scott"
+__version__ = "1.0.0"
+__maintainer__ = "Chris Scott"
+__email__ = "cms190009@utdallas.edu"
+__status__ = "Development"
+
+
+class ReferenceCache(object):
+    """Rows of a table by key
+
+    load_one(key) returns the row of a key, or None if there is none, and
+    load_all() every row as a dict by key. Both are coroutines.
+    """
+
+    def __init__(self, load_one, load_all=None, ttl=300.0):
+        self.load_one = load_one
+        self.load_all = load_all
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self._rows = dict()
+        self._expires = dict()
+        # when the rows of the last bulk load expire
+        self._loaded = 0.0
+
+    @classmethod
+    def from_env(cls, load_one, load_all=None):
+        return cls(load_one, load_all,
+                   float(os.environ.get("REFERENCE_CACHE_TTL", "300")))
+
+    async def get(self, key):
+        """Returns the row of key, reading it if it is not cached"""
+        if self._expires.get(key, 0.0) < time.monotonic():
+            self.misses += 1
+            return await self.refresh(key)
+        self.hits += 1
+        return self._rows[key]
+
+    async def all(self):
+        """Returns every row as a dict by key, which callers must not change"""
+        if self._loaded < time.monotonic():
+            self.misses += 1
+            await self.load()
+        else:
+            self.hits += 1
+        return self._rows
+
+    async def refresh(self, key):
+        row = await self.load_one(key)
+        if row is None:
+            self._rows.pop(key, None)
+            self._expires.pop(key, None)
+            return None
+        self._rows[key] = row
+        self._expires[key] = time.monotonic() + self.ttl
+        return row
+
+    async def load(self):
+        """Reads every row in bulk"""
+        rows = await self.load_all()
+        expires = time.monotonic() + self.ttl
+        self._rows = dict(rows)
+        self._expires = dict((key, expires) for key in self._rows)
+        self._loaded = expires
+
+    def invalidate(self, key=None):
+        """Drops the row of key, or every row"""
+        if key is None:
+            self._rows = dict()
+            self._expires = dict()
+            self._loaded = 0.0
+        else:
+            self._expires.pop(key, None)
+            self._loaded = 0.0
@@ -0,0 +1,71 @@
+"""Compiled jsonschema validators
+
+jsonschema.validate builds a new validator and checks the schema against its
+meta-schema on every call. A SchemaValidator does both once, when the module
+loads its schema. If fastjsonschema is installed, data is first run through
+a generated validator, and the full jsonschema validator only runs on data
+that fails it, to produce the usual error message.
+"""
+import json
+
+import jsonschema
+
+try:
+    import fastjsonschema
+except ImportError:
+    fastjsonschema = None
+
+__author__ = "Chris Scott"
+__version__ = "1.0.0"
+__maintainer__ = "Chris Scott"
+__email__ = "cms190009@utdallas.edu"
+__status__ = "Development"
+
+
+def _formats(schema):
+    # every format named anywhere in the schema
+    found = set()
+    if isinstance(schema, dict):
+        if isinstance(schema.get("format"), str):
+            found.add(schema["format"])
+        for value in schema.values():
+            found |= _formats(value)
+    elif isinstance(schema, list):
+        for value in schema:
+            found |= _formats(value)
+    return found
+
+
+def _any_value(value):
+    return True
+
+
+class SchemaValidator(object):
+    """Validates data against the jsonschema stored at path"""
+
+    def __init__(self, path):
+        with open(path, "r") as schema_file:
+            self.schema = json.loads(schema_file.read())
+        validator_class = jsonschema.validators.validator_for(self.schema)
+        validator_class.check_schema(self.schema)
+        self._validator = validator_class(self.schema)
+        self._fast = None
+        if fastjsonschema is not None:
+            # jsonschema.validate never checked formats, so neither do we
+            formats = dict(
+                (name, _any_value) for name in _formats(self.schema))
+            self._fast = fastjsonschema.compile(self.schema, formats=formats)
+
+    def validate(self, data):
+        """Returns whether data is valid and, if not, the error message"""
+        if self._fast is not None:
+            try:
+                self._fast(data)
+                return True, None
+            except fastjsonschema.JsonSchemaException:
+                pass
+        error = jsonschema.exceptions.best_match(
+            self._validator.iter_errors(data))
+        if error is None:
+            return True, None
+        return False, error.message
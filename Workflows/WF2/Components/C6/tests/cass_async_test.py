@@ -0,0 +1,125 @@
+"""Checks of the asyncio bridge to the Cassandra driver of src/cass_async.py.
+
+run from the C6 folder with `pipenv run python -m pytest tests/cass_async_test.py`
+"""
+import asyncio
+import os
+import sys
+import threading
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from src.cass_async import execute, execute_all  # noqa: E402
+
+__author__ = "Chris Scott"
+__version__ = "1.0.0"
+__maintainer__ = "Chris Scott"
+__email__ = "cms190009@utdallas.edu"
+__status__ = "Development"
+
+
+class ResponseFuture(object):
+    """Stands in for the driver's ResponseFuture. It completes on a timer
+    thread, the way the driver's event thread completes it, or right away
+    if the query is already answered, calling the callbacks on the thread
+    that adds them."""
+
+    def __init__(self, session, query, delay):
+        self.session = session
+        self.query = query
+        self.delay = delay
+        self._callbacks = None
+        self._outcome = None
+        self._lock = threading.Lock()
+        if delay is None:
+            self._complete()
+        else:
+            threading.Timer(delay, self._complete).start()
+
+    def _complete(self):
+        self.session.finished()
+        if self.query.startswith("fail"):
+            outcome = (False, RuntimeError(self.query))
+        else:
+            outcome = (True, [{"query": self.query}])
+        with self._lock:
+            self._outcome = outcome
+            callbacks = self._callbacks
+        if callbacks is not None:
+            self._call(callbacks)
+
+    def _call(self, callbacks):
+        succeeded, value = self._outcome
+        callbacks[0 if succeeded else 1](value)
+
+    def add_callbacks(self, callback, errback):
+        with self._lock:
+            self._callbacks = (callback, errback)
+            done = self._outcome is not None
+        if done:
+            self._call(self._callbacks)
+
+
+class Session(object):
+    """Stands in for the session, counting the queries in flight"""
+
+    def __init__(self, delays):
+        self.delays = delays
+        self.in_flight = 0
+        self.most_in_flight = 0
+        self.sent = []
+        self._lock = threading.Lock()
+
+    def execute_async(self, query, parameters=None):
+        with self._lock:
+            self.in_flight += 1
+            self.most_in_flight = max(self.most_in_flight, self.in_flight)
+            self.sent.append(query)
+        return ResponseFuture(self, query, self.delays.get(query, 0.01))
+
+    def finished(self):
+        with self._lock:
+            self.in_flight -= 1
+
+
+def test_results_keep_the_order_of_the_statements():
+    # the first statement is answered last
+    session = Session({"q0": 0.1, "q1": 0.05})
+    statements = [("q" + str(i), (i,)) for i in range(5)]
+    results = asyncio.run(execute_all(session, statements))
+    assert results == [(True, [{"query": "q" + str(i)}]) for i in range(5)]
+
+
+def test_a_failure_does_not_cancel_the_others():
+    session = Session({})
+    statements = [("q0", None), ("fail1", None), ("q2", None)]
+    results = asyncio.run(execute_all(session, statements))
+    assert results[0] == (True, [{"query": "q0"}])
+    assert results[1][0] is False
+    assert isinstance(results[1][1], RuntimeError)
+    assert results[2] == (True, [{"query": "q2"}])
+    assert session.sent == ["q0", "fail1", "q2"]
+
+
+def test_concurrency_is_bounded():
+    session = Session({})
+    statements = [("q" + str(i), None) for i in range(20)]
+    results = asyncio.run(execute_all(session, statements, concurrency=3))
+    assert all(succeeded for succeeded, rows in results)
+    assert session.most_in_flight == 3
+
+
+def test_already_completed_future_resolves():
+    # the callbacks are called as soon as they are added, on the loop's thread
+    session = Session({"q0": None, "fail1": None})
+
+    async def run():
+        rows = await asyncio.wait_for(execute(session, "q0"), 1)
+        results = await asyncio.wait_for(
+            execute_all(session, [("q0", None), ("fail1", None)]), 1)
+        return rows, results
+
+    rows, results = asyncio.run(run())
+    assert rows == [{"query": "q0"}]
+    assert results[0] == (True, [{"query": "q0"}])
+    assert results[1][0] is False
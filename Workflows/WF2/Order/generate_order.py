@@ -95,6 +95,9 @@ def send_order(q, url, print_results):
                 print(json.dumps(json.loads(r.text), sort_keys=True, indent=4))
             else:
                 print("SUCCESS!")
+        elif r.status_code == 202:
+            # queued workflow, the order is processed in the background
+            print("QUEUED! Order ID: {}".format(json.loads(r.text)["orderId"]))
         elif r.status_code == 208:
             # order processing failed
             if print_results:
@@ -113,6 +116,45 @@ def send_order(q, url, print_results):
         q.task_done()
 
 
+# send a day of pizza-orders to first component in a single request
+def send_batch(url, orders, print_results):
+    order_dicts = [order.generate_order() for order in orders]
+
+    print("\nSending batch of {} pizza-orders".format(len(order_dicts)))
+
+    r = requests.post(url, json=json.dumps(order_dicts))
+
+    if r.status_code != 200:
+        print("FAILURE! Response:")
+        print("Status Code: {}".format(r.status_code))
+        print("Text: {}".format(r.text))
+        return
+
+    for result in json.loads(r.text)["results"]:
+        if result["status-code"] == 200:
+            if print_results:
+                print("SUCCESS! Response:")
+                print(json.dumps(result["order"], sort_keys=True, indent=4))
+            else:
+                print("SUCCESS!")
+        elif result["status-code"] == 202:
+            # queued workflow, the order is processed in the background
+            print("QUEUED! Order ID: {}".format(result["order"]["orderId"]))
+        elif "order" in result:
+            # order processing failed after it was accepted
+            if print_results:
+                print("FAILURE! Response:")
+                print(json.dumps(result["order"], sort_keys=True, indent=4))
+            else:
+                print("FAILURE! Error Message:")
+                print(json.dumps(result["order"]["error"], sort_keys=True, indent=4))
+        else:
+            # order rejected by the first component
+            print("FAILURE! Response:")
+            print("Status Code: {}".format(result["status-code"]))
+            print("Text: {}".format(result["text"]))
+
+
 # gets workflow information and forms URL for 1st component and cass
 def get_component_urls(store_id):
     wkf_manager_url = cluster_url + ":8080/workflow-requests/" + store_id
@@ -202,11 +244,33 @@ if __name__ == "__main__":
     if answer == "y":
         print_results = True
 
+    # Prompt user for batch mode, sending each day's orders in one request
+    batch_mode = False
+
+    answer = input("\nWould you like to send each day's orders as one batch (y/n)? ")
+
+    while (answer != "y") and (answer != "n"):
+        answer = input("Invalid input. Type y or n: ")
+
+    if answer == "y":
+        batch_mode = True
+
     print("\n*** Pizza Order Generator Script - Generating Orders ***")
 
     first_comp_url, cass_url = get_component_urls(store_id)
     store_lat, store_lon = get_store_coordinates(store_id, cass_url)   
     
+    if batch_mode:
+        batch_url = first_comp_url[:-len("/order")] + "/orders/batch"
+        for day in range(num_days):
+            date_str = (start_date + timedelta(days=day)).isoformat()
+            orders = [
+                PizzaOrder(store_id, store_lat, store_lon, date_str, max_pizzas)
+                for _ in range(orders_per_day)
+            ]
+            send_batch(batch_url, orders, print_results)
+        exit()
+
     total_orders = num_days * orders_per_day
     q = Queue(total_orders)
 